@@ -0,0 +1,211 @@
+# ai_models/batch_inference.py
+import hashlib
+import os
+import threading
+import weakref
+from collections import OrderedDict
+
+import torch
+
+from ai_models.registry import forward_pass
+
+MAX_LENGTH = 256
+BATCH_SIZE = int(os.getenv("SAFENET_BATCH_SIZE", "32"))
+# Padded batches kept for reuse by the next classifier with the same tokenizer
+PADDED_CACHE_SIZE = 8
+
+# ============================================
+# 🔥 LONG-TEXT SETTINGS
+# ============================================
+# Score comments longer than MAX_LENGTH tokens as overlapping windows
+# instead of only their first MAX_LENGTH tokens
+LONG_TEXT = os.getenv("SAFENET_LONG_TEXT", "1").lower() in ("1", "true", "yes")
+WINDOW_STRIDE = int(os.getenv("SAFENET_WINDOW_STRIDE", "64"))      # tokens shared by neighbouring windows
+MAX_WINDOWS = int(os.getenv("SAFENET_MAX_WINDOWS", "8"))           # per comment; spread over the whole text
+WINDOW_POOLING = os.getenv("SAFENET_WINDOW_POOLING", "max")        # "max" | "attention"
+ATTENTION_TEMPERATURE = 0.1
+
+if MAX_WINDOWS < 2:
+    # The first and last window are always kept
+    raise ValueError(f"SAFENET_MAX_WINDOWS must be at least 2, got {MAX_WINDOWS}")
+
+_signatures = weakref.WeakKeyDictionary()
+_padded = OrderedDict()
+_padded_lock = threading.Lock()
+
+
+def tokenizer_signature(tokenizer):
+    """
+    Hash of everything that decides what a tokenizer produces: vocabulary,
+    normalizer / pre-tokenizer pipeline, special tokens and padding. Two
+    tokenizers with the same signature give identical input_ids and
+    attention_mask, so their tokenizations can be shared.
+    """
+    try:
+        return _signatures[tokenizer]
+    except (KeyError, TypeError):
+        pass
+
+    h = hashlib.sha256()
+    backend = getattr(tokenizer, "backend_tokenizer", None)
+    if backend is not None:
+        # Fast tokenizers: the serialized pipeline includes the vocab
+        h.update(backend.to_str().encode())
+    else:
+        h.update(type(tokenizer).__name__.encode())
+        h.update(repr(sorted(tokenizer.get_vocab().items())).encode())
+        h.update(repr(sorted((k, repr(v)) for k, v in getattr(tokenizer, "init_kwargs", {}).items())).encode())
+    h.update(repr((
+        list(getattr(tokenizer, "model_input_names", [])),
+        getattr(tokenizer, "pad_token_id", None),
+        getattr(tokenizer, "padding_side", "right"),
+        getattr(tokenizer, "all_special_ids", None),
+    )).encode())
+    signature = h.hexdigest()[:16]
+
+    try:
+        _signatures[tokenizer] = signature
+    except TypeError:
+        pass
+    return signature
+
+
+def tokenize(tokenizer, texts, max_length=MAX_LENGTH):
+    """
+    Unpadded per-text features ({"input_ids": [...], "attention_mask": [...]}) for `texts`.
+    With LONG_TEXT, a text longer than `max_length` tokens gets a list of
+    such dicts instead: overlapping windows covering the whole text.
+    """
+    if not texts:
+        return []
+    if LONG_TEXT and getattr(tokenizer, "is_fast", False):
+        return _tokenize_windows(tokenizer, texts, max_length)
+
+    enc = tokenizer(list(texts), truncation=True, padding=False, max_length=max_length)
+    return [
+        {key: enc[key][i] for key in enc.keys()}
+        for i in range(len(texts))
+    ]
+
+
+def window_tag():
+    """The long-text settings that change scores, for verdict cache tags."""
+    if not LONG_TEXT:
+        return "truncate"
+    pooling = f"attention@{ATTENTION_TEMPERATURE:g}" if WINDOW_POOLING == "attention" else WINDOW_POOLING
+    return f"windows={MAX_WINDOWS},stride={WINDOW_STRIDE},{pooling}"
+
+
+def _tokenize_windows(tokenizer, texts, max_length):
+    enc = tokenizer(list(texts), truncation=True, padding=False, max_length=max_length,
+                    stride=min(WINDOW_STRIDE, max_length // 2), return_overflowing_tokens=True)
+    keys = [k for k in enc.keys() if k != "overflow_to_sample_mapping"]
+
+    windows = [[] for _ in texts]
+    for row, i in enumerate(enc["overflow_to_sample_mapping"]):
+        windows[i].append({key: enc[key][row] for key in keys})
+
+    features = []
+    for w in windows:
+        if len(w) > MAX_WINDOWS:
+            # Keep the first and last window and spread the rest evenly, so
+            # benign padding at either end cannot push content out of reach
+            step = (len(w) - 1) / (MAX_WINDOWS - 1)
+            w = [w[round(k * step)] for k in range(MAX_WINDOWS)]
+        features.append(w[0] if len(w) == 1 else w)
+    return features
+
+
+def _pool(window_probs):
+    """
+    One probability row from the rows of a comment's windows. Column 0 is
+    the benign class for every classifier here, so `max` keeps the window
+    that looks most harmful, and `attention` averages the windows weighted
+    towards the harmful ones.
+    """
+    harm = 1 - window_probs[:, 0]
+    if WINDOW_POOLING == "attention":
+        weights = torch.softmax(harm / ATTENTION_TEMPERATURE, dim=0)
+        return (weights[:, None] * window_probs).sum(dim=0)
+    return window_probs[int(torch.argmax(harm))]
+
+
+def pad(tokenizer, features):
+    """
+    tokenizer.pad(features) as tensors. When the features are shared
+    between compatible tokenizers (same signature), the padded tensors are
+    reused too, so the next classifier gets the very same input_ids /
+    attention_mask instead of padding again.
+    """
+    key = (tokenizer_signature(tokenizer), tuple(id(f) for f in features))
+    with _padded_lock:
+        hit = _padded.get(key)
+        if hit is not None:
+            _padded.move_to_end(key)
+            return hit[1]
+
+    batch = tokenizer.pad(features, return_tensors="pt")
+    with _padded_lock:
+        # Keep the feature dicts alive with the entry so their ids stay unique
+        _padded[key] = (features, batch)
+        while len(_padded) > PADDED_CACHE_SIZE:
+            _padded.popitem(last=False)
+    return batch
+
+
+def predict_proba_batch(tokenizer, model, texts, max_length=MAX_LENGTH, batch_size=None,
+                        features=None):
+    """
+    Run one classifier over many texts and return softmax probabilities
+    as a [len(texts), num_labels] tensor, in the same order as `texts`.
+
+    Texts are tokenized once without padding, sorted by token length and
+    padded per chunk (dynamic padding), so a batch of short comments is
+    not padded up to the longest post in the request.
+
+    Long texts arrive as several windows; all windows of all texts go
+    through the same length-sorted chunks, and each text's window rows are
+    pooled back into one (see _pool).
+
+    `features` may carry tokenize() output already computed by the caller
+    (None entries are tokenized here).
+    """
+    if not texts:
+        return torch.empty((0, model.config.num_labels))
+
+    # Read at call time: threads.apply() may set an autotuned value
+    batch_size = batch_size or BATCH_SIZE
+    features = list(features) if features is not None else [None] * len(texts)
+    missing = [i for i, f in enumerate(features) if f is None]
+    for i, f in zip(missing, tokenize(tokenizer, [texts[i] for i in missing], max_length)):
+        features[i] = f
+
+    # Flatten to one row per window; `owner[r]` is the text a row belongs to
+    rows, owner = [], []
+    for i, f in enumerate(features):
+        for window in (f if isinstance(f, list) else [f]):
+            rows.append(window)
+            owner.append(i)
+
+    order = sorted(range(len(rows)), key=lambda r: len(rows[r]["input_ids"]))
+    row_probs = [None] * len(rows)
+
+    with forward_pass(), torch.no_grad():
+        for start in range(0, len(order), batch_size):
+            chunk = order[start:start + batch_size]
+            batch = pad(tokenizer, [rows[r] for r in chunk])
+            logits = model(**batch).logits.float()
+            chunk_probs = torch.softmax(logits, dim=1)
+            for n, r in enumerate(chunk):
+                row_probs[r] = chunk_probs[n]
+
+    if len(rows) == len(texts):
+        return torch.stack(row_probs)
+
+    per_text = [[] for _ in texts]
+    for r, i in enumerate(owner):
+        per_text[i].append(row_probs[r])
+    return torch.stack([
+        p[0] if len(p) == 1 else _pool(torch.stack(p))
+        for p in per_text
+    ])
@@ -0,0 +1,142 @@
+# ai_models/compiled.py
+import logging
+import os
+import threading
+import warnings
+from types import SimpleNamespace
+
+import torch
+
+logger = logging.getLogger(__name__)
+
+# ============================================
+# 🔥 SETTINGS
+# ============================================
+# "off" (default, eager), "trace" (TorchScript graph per length bucket) or
+# "compile" (torch.compile; the buckets bound how often it recompiles, and
+# the batch dimension is dynamic)
+MODE = os.getenv("SAFENET_COMPILE", "off").lower()
+MODES = ("off", "trace", "compile")
+# Padded sequence lengths; a batch is padded up to the smallest bucket that fits
+BUCKETS = sorted(int(x) for x in os.getenv("SAFENET_COMPILE_BUCKETS", "16,32,64,128,256").split(",") if x.strip())
+
+_stats_lock = threading.Lock()
+_stats = {}
+
+
+def enabled():
+    return MODE in ("trace", "compile")
+
+
+def bucket_for(length):
+    """Smallest bucket >= length (longer inputs keep their own length)."""
+    for bucket in BUCKETS:
+        if length <= bucket:
+            return bucket
+    return length
+
+
+def _pad_to(tensor, length, value):
+    extra = length - tensor.shape[1]
+    if extra <= 0:
+        return tensor
+    return torch.nn.functional.pad(tensor, (0, extra), value=value)
+
+
+class CompiledClassifier(torch.nn.Module):
+    """
+    Drop-in for a sequence classifier at inference time: `model(**encoded).logits`.
+    Inputs are right-padded (masked) to their length bucket and run through
+    a graph built once per bucket, so short comments skip most of eager
+    PyTorch's per-op Python dispatch. A bucket whose graph fails to build
+    or run falls back to the eager model.
+    """
+
+    def __init__(self, name, model, mode=None):
+        super().__init__()
+        from ai_models.onnx_backend import _LogitsOnly
+
+        self.name = name
+        self.mode = mode or MODE
+        self.model = model
+        self.config = model.config
+        self.pad_token_id = getattr(model.config, "pad_token_id", None) or 0
+        self._logits_only = _LogitsOnly(model).eval()
+        self._graphs = {}
+        self._compiled = None
+        self._lock = threading.Lock()
+
+    def _graph(self, bucket, input_ids, attention_mask):
+        graph = self._graphs.get(bucket)
+        if graph is not None:
+            return graph
+
+        with self._lock:
+            if bucket not in self._graphs:
+                try:
+                    if self.mode == "trace":
+                        with warnings.catch_warnings():
+                            warnings.simplefilter("ignore", torch.jit.TracerWarning)
+                            warnings.simplefilter("ignore", FutureWarning)
+                            graph = torch.jit.trace(self._logits_only, (input_ids, attention_mask),
+                                                    check_trace=False, strict=False)
+                    else:
+                        # One compiled module for every bucket (one guard set per shape)
+                        if self._compiled is None:
+                            self._compiled = torch.compile(self._logits_only, dynamic=False)
+                        graph = self._compiled
+                    _count(self.name, "graphs")
+                except Exception as e:
+                    logger.warning("Could not %s %s for length %d, running eager: %s", self.mode, self.name, bucket, e)
+                    graph = self._logits_only
+                    _count(self.name, "eager_buckets")
+                self._graphs[bucket] = graph
+            return self._graphs[bucket]
+
+    def forward(self, input_ids, attention_mask, **_):
+        bucket = bucket_for(input_ids.shape[1])
+        input_ids = _pad_to(input_ids, bucket, self.pad_token_id)
+        attention_mask = _pad_to(attention_mask, bucket, 0)
+
+        if self.mode == "compile" and input_ids.shape[0] > 1:
+            # One graph per bucket for every batch size >= 2; without this each
+            # new batch size recompiles on the request path. (Size 1 is always
+            # specialized and gets its own graph; warmup builds both.)
+            torch._dynamo.mark_dynamic(input_ids, 0)
+            torch._dynamo.mark_dynamic(attention_mask, 0)
+
+        graph = self._graph(bucket, input_ids, attention_mask)
+        try:
+            with torch.no_grad():
+                logits = graph(input_ids, attention_mask)
+        except Exception as e:
+            if graph is self._logits_only:
+                raise
+            logger.warning("Compiled %s failed for length %d, running eager from now on: %s", self.name, bucket, e)
+            self._graphs[bucket] = self._logits_only
+            _count(self.name, "eager_buckets")
+            with torch.no_grad():
+                logits = self._logits_only(input_ids, attention_mask)
+
+        _count(self.name, f"len{bucket}")
+        return SimpleNamespace(logits=logits)
+
+
+def wrap(name, model):
+    """The model behind a compiled path when SAFENET_COMPILE is on, else unchanged."""
+    if MODE not in MODES:
+        raise ValueError(f"Unknown SAFENET_COMPILE {MODE!r}, expected one of {MODES}")
+    if not enabled():
+        return model
+    return CompiledClassifier(name, model)
+
+
+def _count(name, key):
+    with _stats_lock:
+        counts = _stats.setdefault(name, {})
+        counts[key] = counts.get(key, 0) + 1
+
+
+def stats():
+    with _stats_lock:
+        return {"mode": MODE, "buckets": BUCKETS, "models": {name: dict(c) for name, c in _stats.items()}}
@@ -1,18 +1,15 @@
 # ai_models/drug_embeddings.py
 import os
-import joblib
+import threading
 import numpy as np
-from pinecone import Pinecone, ServerlessSpec
-from sentence_transformers import SentenceTransformer
+from .local_index import use_local, get_local_index
 from .drug_keywords import DRUG_KEYWORDS
+from .keyword_matcher import KeywordMatcher
+from . import embedder
+from .registry import registry
 
 BASE = os.path.dirname(__file__)
 
-# =====================
-# EMBEDDING MODEL
-# =====================
-EMBEDDER = SentenceTransformer("all-MiniLM-L6-v2")
-
 # =====================
 # PINECONE INITIALIZATION
 # =====================
@@ -20,12 +17,25 @@ PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 INDEX_NAME = os.getenv("PINECONE_INDEX", "safenet-blocklist")     # 🔥 FIXED
 
 pc = None
-index = None
 
-if not PINECONE_API_KEY:
-    print("❌ PINECONE_API_KEY missing! Pinecone disabled.")
-else:
+
+def connect_index():
+    """Open the blocklist index (None when Pinecone is unavailable)."""
+    global pc
+
+    if use_local():
+        from .pinecone_utils import bootstrap_from_slang_words
+
+        # Same index name as pinecone_utils → same shared in-process index
+        print(f"✅ Using local vector index: {INDEX_NAME}")
+        return get_local_index(INDEX_NAME, bootstrap=bootstrap_from_slang_words)
+
+    if not PINECONE_API_KEY:
+        print("❌ PINECONE_API_KEY missing! Pinecone disabled.")
+        return None
+
     try:
+        from pinecone import Pinecone, ServerlessSpec
         pc = Pinecone(api_key=PINECONE_API_KEY)
 
         # Create index if missing
@@ -39,26 +49,74 @@ else:
                 spec=ServerlessSpec(cloud="aws", region="us-east-1")
             )
 
-        index = pc.Index(INDEX_NAME)
         print(f"✅ Connected to Pinecone index: {INDEX_NAME}")
+        return pc.Index(INDEX_NAME)
 
     except Exception as e:
         print("❌ ERROR initializing Pinecone:", e)
-        index = None
+        return None
 
 
 # =====================
-# LOGISTIC MODEL
+# LAZY SINGLETONS
+# Embedder, index and logistic head are created on first use, not at
+# import, so Django commands and URL loading stay fast.
 # =====================
-CLASSIFIER = joblib.load(os.path.join(BASE, "embedding_logistic.pkl"))
+_UNSET = object()
+_index = _UNSET
+_init_lock = threading.Lock()
+
+
+def _load_classifier():
+    import joblib
+    return joblib.load(os.path.join(BASE, "embedding_logistic.pkl"))
+
+
+registry.register("drug_logistic", _load_classifier, precision_aware=False)
+
+
+def get_embedder():
+    # Same MiniLM instance as pinecone_utils
+    return embedder.get_model()
+
+
+def get_index():
+    """The blocklist index, or None when Pinecone is unavailable."""
+    global _index
+    if _index is _UNSET:
+        with _init_lock:
+            if _index is _UNSET:
+                _index = connect_index()
+    return _index
+
+
+def get_classifier():
+    return registry.get("drug_logistic")
+
+
+def reset_index():
+    """Drop the index client (e.g. after fork); the next use reconnects."""
+    global _index
+    _index = _UNSET
+
+
+def __getattr__(name):
+    # Keep the old module attributes working for existing callers
+    if name == "EMBEDDER":
+        return get_embedder()
+    if name == "index":
+        return get_index()
+    if name == "CLASSIFIER":
+        return get_classifier()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 # =====================
 # EMBEDDING UTILITIES
 # =====================
 def get_embedding(text):
-    """Generate a 384-dim embedding vector."""
-    return EMBEDDER.encode(text).tolist()
+    """Generate a 384-dim embedding vector (cached, see embedder)."""
+    return embedder.encode(text).tolist()
 
 
 # =====================
@@ -66,6 +124,7 @@ def get_embedding(text):
 # =====================
 def get_retrieval_features(text, k=5):
     """Return similarity features from Pinecone filtered only for drug tokens."""
+    index = get_index()
     if not index:
         return {"avg_score": 0, "pct_drug_neighbors": 0, "min_distance": 1}
 
@@ -94,34 +153,39 @@ def get_retrieval_features(text, k=5):
     }
 
 
+# =====================
+# KEYWORD MATCHERS
+# =====================
+SALE_WORDS = [
+    "buy", "sell", "supply",
+    "dealer", "dm", "message me",
+    "hit me up", "asap", "plug"
+]
+
+KEYWORD_MATCHER = KeywordMatcher(DRUG_KEYWORDS)
+SALE_MATCHER = KeywordMatcher({w: 1.0 for w in SALE_WORDS})
+
+
+def add_drug_keywords(weights):
+    """Add moderator keywords ({phrase: weight}) to the keyword matcher."""
+    DRUG_KEYWORDS.update(weights)
+    KEYWORD_MATCHER.add(weights)
+
+
 # =====================
 # CONTEXT BOOST
 # =====================
 def context_boost(text):
     """Detect sale or transactional language."""
-    text = text.lower()
-    sale_words = [
-        "buy", "sell", "supply",
-        "dealer", "dm", "message me",
-        "hit me up", "asap", "plug"
-    ]
-
-    for w in sale_words:
-        if w in text:
-            return 1.0
-
-    return 0.0
+    return 1.0 if SALE_MATCHER.contains_any(text) else 0.0
 
 
 # =====================
 # KEYWORD BOOST
 # =====================
 def keyword_boost(text):
-    text_lower = text.lower()
-    for k, score in DRUG_KEYWORDS.items():
-        if k in text_lower:
-            return score
-    return 0.0
+    """Weight of the strongest drug keyword in the text."""
+    return KEYWORD_MATCHER.max_weight(text)
 
 
 # =====================
@@ -137,7 +201,7 @@ def predict_drug_probability(text):
     """
     emb = np.array(get_embedding(text)).reshape(1, -1)
 
-    logistic_prob = CLASSIFIER.predict_proba(emb)[0][1]
+    logistic_prob = get_classifier().predict_proba(emb)[0][1]
 
     retrieval = get_retrieval_features(text)
     pinecone_score = retrieval["pct_drug_neighbors"]
@@ -154,11 +218,40 @@ def predict_drug_probability(text):
     return float(min(max(final_prob, 0), 1))
 
 
+# =====================
+# FAST (NO PINECONE) DRUG SCORE
+# =====================
+def cheap_drug_scores(texts, embeddings=None):
+    """
+    Pinecone-free drug probability for many texts: the same blend as
+    predict_drug_probability without the retrieval term, renormalized.
+    One batched embedder call for the whole list, or none if the caller
+    passes the MiniLM `embeddings` it already has.
+    """
+    if not texts:
+        return []
+
+    embs = embeddings if embeddings is not None else embedder.encode_many(texts)
+    logistic = get_classifier().predict_proba(np.asarray(embs).reshape(len(texts), -1))[:, 1]
+
+    scores = []
+    for text, logistic_prob in zip(texts, logistic):
+        blended = (
+            0.40 * logistic_prob +
+            0.20 * keyword_boost(text) +
+            0.05 * context_boost(text)
+        ) / 0.65
+        scores.append(float(min(max(blended, 0), 1)))
+
+    return scores
+
+
 # =====================
 # STORE DRUG TERM IN PINECONE
 # =====================
 def add_drug_vector(word, user="system"):
     """Add a drug-related keyword to the blocklist index."""
+    index = get_index()
     if not index:
         return {"error": "Pinecone not available"}
 
@@ -182,6 +275,7 @@ def add_drug_vector(word, user="system"):
 # DELETE DRUG TERM
 # =====================
 def delete_drug_vector(word):
+    index = get_index()
     if not index:
         return {"error": "Pinecone not available"}
 
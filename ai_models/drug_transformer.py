@@ -1,48 +1,59 @@
-import os
-import torch
-from transformers import AutoTokenizer, AutoModelForSequenceClassification
-from ai_models.hf_settings import HF_TOKEN, repo
+from ai_models.model_manifest import MODELS
+from ai_models.model_loader import load_classifier
+from ai_models.registry import registry
+from ai_models.batch_inference import predict_proba_batch
+from ai_models.micro_batcher import run_batched
 
-LOCAL_DIR = os.path.join(os.path.dirname(__file__), "saved_drug_transformer_best")
-HF_REPO = repo("drug-transformer-best")
+LOCAL_DIR = MODELS["drug"]["local_dir"]
+HF_REPO = MODELS["drug"]["repo"]
 
-_tokenizer = None
-_model = None
 
+def _load(precision):
+    return load_classifier("Drug", HF_REPO, LOCAL_DIR, precision=precision)
 
-def load_drug_model():
-    global _tokenizer, _model
 
-    if _tokenizer and _model:
-        return _tokenizer, _model
+registry.register("drug", _load)
 
-    try:
-        print("Loading Drug Model from HuggingFace…")
-        _tokenizer = AutoTokenizer.from_pretrained(HF_REPO, use_auth_token=HF_TOKEN)
-        _model = AutoModelForSequenceClassification.from_pretrained(HF_REPO, use_auth_token=HF_TOKEN)
-    except Exception:
-        print("⚠ HF download failed — using LOCAL model.")
 
-        _tokenizer = AutoTokenizer.from_pretrained(LOCAL_DIR, local_files_only=True)
-        _model = AutoModelForSequenceClassification.from_pretrained(LOCAL_DIR, local_files_only=True)
-
-    _model.eval()
-    return _tokenizer, _model
+def load_drug_model(precision=None):
+    """precision: "fp32", "int8" or "bf16" (default: SAFENET_PRECISION)."""
+    return registry.get("drug", precision)
 
 
 def predict_drug_transformer(text):
-    if not text or not isinstance(text, str):
-        return {"drug": 0.0, "not_drug": 1.0, "safe": True}
+    return predict_drug_transformer_batch([text])[0]
 
-    tokenizer, model = load_drug_model()
-    inputs = tokenizer(text, truncation=True, padding=True, max_length=256, return_tensors="pt")
 
-    with torch.no_grad():
-        logits = model(**inputs).logits
+def predict_drug_transformer_batch(texts, features=None):
+    """
+    Score many texts in one padded forward pass. Empty/non-str entries are safe.
+    `features`: optional pre-tokenized inputs (batch_inference.tokenize) for the texts.
+    """
+    results = [{"drug": 0.0, "not_drug": 1.0, "safe": True} for _ in texts]
+    valid = [i for i, t in enumerate(texts) if t and isinstance(t, str)]
+    if not valid:
+        return results
+
+    scored = run_batched(
+        "drug", _predict_drug_transformer_batch,
+        [texts[i] for i in valid],
+        [features[i] for i in valid] if features is not None else None,
+    )
+    for i, res in zip(valid, scored):
+        results[i] = res
 
-    probs = torch.softmax(logits, dim=1)[0]
-    return {
-        "drug": round(probs[1].item(), 4),
-        "not_drug": round(probs[0].item(), 4),
-        "safe": probs[0].item() > 0.5
-    }
+    return results
+
+
+def _predict_drug_transformer_batch(texts, features=None):
+    tokenizer, model = load_drug_model()
+    probs = predict_proba_batch(tokenizer, model, texts, features=features)
+
+    return [
+        {
+            "drug": round(p[1].item(), 4),
+            "not_drug": round(p[0].item(), 4),
+            "safe": p[0].item() > 0.5
+        }
+        for p in probs
+    ]
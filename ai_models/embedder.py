@@ -0,0 +1,135 @@
+# ai_models/embedder.py
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from ai_models.registry import forward_pass, registry
+
+# ============================================
+# 🔥 SETTINGS
+# ============================================
+MODEL_NAME = "all-MiniLM-L6-v2"
+DIMENSION = 384
+# Embeddings kept per process (float32, ~1.5 KB each)
+CACHE_SIZE = int(os.getenv("SAFENET_EMBED_CACHE", "20000"))
+
+
+def _load_model():
+    from ai_models.onnx_backend import load_sentence_transformer
+    return load_sentence_transformer(MODEL_NAME)
+
+
+# The one MiniLM instance of the process, shared by the blocklist, drug
+# retrieval and span checks
+registry.register("minilm", _load_model, precision_aware=False)
+
+
+def get_model():
+    return registry.get("minilm")
+
+
+def normalize(text):
+    # MiniLM-L6-v2 is uncased and ignores runs of whitespace, so these
+    # variants embed identically and can share one cache entry
+    return " ".join(str(text).split()).lower()
+
+
+def text_hash(text):
+    return hashlib.blake2b(normalize(text).encode("utf-8"), digest_size=16).digest()
+
+
+class EmbeddingCache:
+    """LRU of embeddings keyed by the hash of the normalized text."""
+
+    def __init__(self, max_size=CACHE_SIZE):
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, keys):
+        found = {}
+        with self._lock:
+            for key in keys:
+                vector = self._data.get(key)
+                if vector is not None:
+                    self._data.move_to_end(key)
+                    found[key] = vector
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, items):
+        if not self.max_size:
+            return
+        with self._lock:
+            self._data.update(items)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+
+cache = EmbeddingCache()
+_counters_lock = threading.Lock()
+_counters = {"calls": 0, "texts": 0, "encoded": 0}
+
+
+def encode_many(texts, cache=cache):
+    """
+    Embeddings for `texts` as a [len(texts), DIMENSION] float32 array, in order.
+    Inputs are normalized and deduplicated; cached ones are reused and the
+    rest go through a single batched encoder call.
+    """
+    texts = list(texts)
+    if not texts:
+        return np.zeros((0, DIMENSION), dtype=np.float32)
+
+    keys = [text_hash(t) for t in texts]
+    distinct = list(dict.fromkeys(keys))
+    found = cache.get_many(distinct)
+
+    missing = [k for k in distinct if k not in found]
+    if missing:
+        text_for = dict(zip(keys, texts))
+        model = get_model()
+        with forward_pass():
+            vectors = model.encode([normalize(text_for[k]) for k in missing])
+        fresh = {k: np.asarray(v, dtype=np.float32) for k, v in zip(missing, vectors)}
+        cache.put_many(fresh)
+        found.update(fresh)
+
+    with _counters_lock:
+        _counters["calls"] += 1
+        _counters["texts"] += len(texts)
+        _counters["encoded"] += len(missing)
+
+    return np.stack([found[k] for k in keys])
+
+
+def encode(text):
+    """Embedding of one text (cached)."""
+    return encode_many([text])[0]
+
+
+def stats():
+    with _counters_lock:
+        counters = dict(_counters)
+    return {**counters, "cache": cache.stats()}
@@ -0,0 +1,305 @@
+# ai_models/local_index.py
+import fcntl
+import logging
+import os
+import threading
+
+import numpy as np
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# ============================================
+# 🔥 SETTINGS
+# ============================================
+# "pinecone" (default) or "local"
+BACKEND = os.getenv("SAFENET_VECTOR_BACKEND", "pinecone").lower()
+# "float32" (default) or "int8" (4x smaller matrix, approximate scores)
+DTYPE = os.getenv("SAFENET_LOCAL_INDEX_DTYPE", "float32").lower()
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def use_local():
+    return BACKEND == "local"
+
+
+def _matches_filter(column, condition):
+    """Vectorized Pinecone-style metadata filter for one key."""
+    if isinstance(condition, dict):
+        mask = np.ones(len(column), dtype=bool)
+        for op, value in condition.items():
+            if op == "$eq":
+                mask &= column == value
+            elif op == "$ne":
+                mask &= column != value
+            elif op == "$in":
+                mask &= np.isin(column, list(value))
+            elif op == "$nin":
+                mask &= ~np.isin(column, list(value))
+            else:
+                raise ValueError(f"Unsupported filter operator: {op}")
+        return mask
+    return column == condition
+
+
+class LocalIndex:
+    """
+    In-process stand-in for a Pinecone index (cosine metric): same
+    upsert / query / delete / fetch / describe_index_stats surface, backed
+    by one contiguous matrix of unit vectors and exact top-k search.
+
+    When `path` is set the index is snapshotted there after every change
+    (under a file lock) and reloaded when another worker has written a
+    newer snapshot, so all workers on a host see the same blocklist.
+    """
+
+    def __init__(self, dimension=384, dtype=DTYPE, path=None, bootstrap=None):
+        self.dimension = dimension
+        self.dtype = dtype
+        self.path = path
+        self.bootstrap = bootstrap
+
+        self._lock = threading.RLock()
+        self._matrix = np.zeros((0, dimension), dtype=self._storage_dtype)
+        self._ids = []
+        self._rows = {}
+        self._metadata = []
+        self._columns = {}
+        self._snapshot_mtime = None
+        self._bootstrapped = False
+
+        if self.path and os.path.exists(self.path):
+            self._load()
+
+    @property
+    def _storage_dtype(self):
+        return np.int8 if self.dtype == "int8" else np.float32
+
+    # ------------------------------------------------------------------
+    # Encoding
+    # ------------------------------------------------------------------
+    def _encode(self, vectors):
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dimension)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.maximum(norms, 1e-12)
+        if self.dtype == "int8":
+            return np.round(vectors * 127).astype(np.int8)
+        return vectors
+
+    def _scores(self, matrix, queries):
+        if self.dtype == "int8":
+            return (matrix.astype(np.int32) @ queries.astype(np.int32).T).T / (127.0 * 127.0)
+        return queries @ matrix.T
+
+    # ------------------------------------------------------------------
+    # Pinecone surface
+    # ------------------------------------------------------------------
+    def upsert(self, vectors=None, namespace=None, **kwargs):
+        items = []
+        for v in vectors or []:
+            if isinstance(v, dict):
+                items.append((v["id"], v["values"], v.get("metadata") or {}))
+            else:
+                items.append((v[0], v[1], v[2] if len(v) > 2 else {}))
+
+        with self._shared_write():
+            encoded = self._encode([values for _, values, _ in items])
+            new_rows = []
+            for (vid, _, meta), vec in zip(items, encoded):
+                row = self._rows.get(vid)
+                if row is None:
+                    self._rows[vid] = len(self._ids)
+                    self._ids.append(vid)
+                    self._metadata.append(dict(meta))
+                    new_rows.append(vec)
+                else:
+                    self._matrix[row] = vec
+                    self._metadata[row] = dict(meta)
+            if new_rows:
+                self._matrix = np.vstack([self._matrix, np.stack(new_rows)])
+            self._columns.clear()
+
+        return {"upserted_count": len(items)}
+
+    def delete(self, ids=None, delete_all=False, namespace=None, filter=None, **kwargs):
+        with self._shared_write():
+            if delete_all:
+                keep = []
+            else:
+                drop = set(ids or [])
+                if filter:
+                    mask = self._filter_mask(filter)
+                    drop |= {self._ids[i] for i in np.flatnonzero(mask)}
+                keep = [i for i, vid in enumerate(self._ids) if vid not in drop]
+
+            self._matrix = self._matrix[keep] if keep else np.zeros((0, self.dimension), dtype=self._storage_dtype)
+            self._ids = [self._ids[i] for i in keep]
+            self._metadata = [self._metadata[i] for i in keep]
+            self._rows = {vid: row for row, vid in enumerate(self._ids)}
+            self._columns.clear()
+
+        return {}
+
+    def query(self, vector=None, top_k=10, include_metadata=False, filter=None, namespace=None,
+              include_values=False, **kwargs):
+        return {"matches": self.query_batch([vector], top_k, include_metadata, filter)[0]}
+
+    def query_batch(self, vectors, top_k=10, include_metadata=False, filter=None):
+        """Exact top-k for many query vectors in one matrix multiply."""
+        self._refresh()
+        with self._lock:
+            if not self._ids:
+                return [[] for _ in vectors]
+
+            scores = self._scores(self._matrix, self._encode(vectors))
+            allowed = len(self._ids)
+            if filter:
+                mask = self._filter_mask(filter)
+                allowed = int(mask.sum())
+                scores[:, ~mask] = -np.inf
+            if not allowed:
+                return [[] for _ in vectors]
+
+            k = min(top_k, allowed)
+            out = []
+            for row_scores in scores:
+                top = np.argpartition(-row_scores, k - 1)[:k]
+                top = top[np.argsort(-row_scores[top])]
+                out.append([
+                    {
+                        "id": self._ids[j],
+                        "score": float(row_scores[j]),
+                        "metadata": dict(self._metadata[j]) if include_metadata else {},
+                    }
+                    for j in top
+                ])
+            return out
+
+    def fetch(self, ids, namespace=None, **kwargs):
+        self._refresh()
+        with self._lock:
+            return {"vectors": {
+                vid: {"id": vid, "metadata": dict(self._metadata[self._rows[vid]])}
+                for vid in ids if vid in self._rows
+            }}
+
+    def list(self, prefix=None, limit=100, namespace=None, **kwargs):
+        """Pages of vector ids starting with `prefix` (Pinecone's index.list)."""
+        self._refresh()
+        with self._lock:
+            ids = [vid for vid in self._ids if prefix is None or vid.startswith(prefix)]
+        for start in range(0, len(ids), limit):
+            yield ids[start:start + limit]
+
+    def describe_index_stats(self, **kwargs):
+        self._refresh()
+        with self._lock:
+            return {"dimension": self.dimension, "total_vector_count": len(self._ids)}
+
+    # ------------------------------------------------------------------
+    # Filters
+    # ------------------------------------------------------------------
+    def _column(self, key):
+        if key not in self._columns:
+            self._columns[key] = np.array([m.get(key) for m in self._metadata], dtype=object)
+        return self._columns[key]
+
+    def _filter_mask(self, filter):
+        # Masks are cached per filter until the next write (the call sites use a handful of filters)
+        cache_key = ("__mask__", repr(sorted(filter.items())))
+        if cache_key not in self._columns:
+            mask = np.ones(len(self._ids), dtype=bool)
+            for key, condition in filter.items():
+                mask &= _matches_filter(self._column(key), condition)
+            self._columns[cache_key] = mask
+        return self._columns[cache_key]
+
+    # ------------------------------------------------------------------
+    # Snapshots shared between workers
+    # ------------------------------------------------------------------
+    def _refresh(self):
+        if self.path:
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+            except FileNotFoundError:
+                mtime = None
+            if mtime is not None and mtime != self._snapshot_mtime:
+                with self._lock:
+                    self._load()
+
+        if not self._bootstrapped:
+            self._bootstrapped = True
+            if self.bootstrap and not self._ids and not (self.path and os.path.exists(self.path)):
+                try:
+                    self.bootstrap(self)
+                except Exception:
+                    logger.exception("local index bootstrap failed")
+
+    def _load(self):
+        with np.load(self.path, allow_pickle=True) as data:
+            matrix = data["matrix"]
+            self._ids = list(data["ids"])
+            self._metadata = list(data["metadata"])
+
+        # Snapshot written with the other DTYPE setting — re-encode
+        if matrix.dtype != self._storage_dtype:
+            if matrix.dtype == np.int8:
+                matrix = matrix.astype(np.float32) / 127.0
+            matrix = self._encode(matrix)
+
+        self._matrix = matrix
+        self._rows = {vid: row for row, vid in enumerate(self._ids)}
+        self._columns.clear()
+        self._snapshot_mtime = os.stat(self.path).st_mtime_ns
+
+    def _save(self):
+        tmp = f"{self.path}.{os.getpid()}.tmp.npz"
+        np.savez(tmp, matrix=self._matrix,
+                 ids=np.array(self._ids, dtype=object),
+                 metadata=np.array(self._metadata, dtype=object))
+        os.replace(tmp, self.path)
+        self._snapshot_mtime = os.stat(self.path).st_mtime_ns
+
+    def _shared_write(self):
+        return _SharedWrite(self)
+
+
+class _SharedWrite:
+    """Lock (thread + file), reload any newer snapshot, let the caller mutate, save."""
+
+    def __init__(self, index):
+        self.index = index
+        self.lock_file = None
+
+    def __enter__(self):
+        self.index._lock.acquire()
+        if self.index.path:
+            os.makedirs(os.path.dirname(self.index.path), exist_ok=True)
+            self.lock_file = open(f"{self.index.path}.lock", "w")
+            fcntl.flock(self.lock_file, fcntl.LOCK_EX)
+            if os.path.exists(self.index.path) and os.stat(self.index.path).st_mtime_ns != self.index._snapshot_mtime:
+                self.index._load()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if self.index.path and exc_type is None:
+                self.index._save()
+        finally:
+            if self.lock_file:
+                fcntl.flock(self.lock_file, fcntl.LOCK_UN)
+                self.lock_file.close()
+            self.index._lock.release()
+
+
+def get_local_index(name, dimension=384, bootstrap=None):
+    """One shared LocalIndex per index name, snapshotted under SAFENET_STATE_DIR."""
+    with _indexes_lock:
+        if name not in _indexes:
+            path = os.path.join(settings.SAFENET_STATE_DIR, f"local_index_{name}.npz")
+            _indexes[name] = LocalIndex(dimension=dimension, path=path, bootstrap=bootstrap)
+        elif bootstrap and not _indexes[name].bootstrap:
+            _indexes[name].bootstrap = bootstrap
+        return _indexes[name]
@@ -0,0 +1,188 @@
+# ai_models/micro_batcher.py
+import os
+import threading
+import time
+from collections import Counter, deque
+
+# ============================================
+# 🔥 SETTINGS
+# ============================================
+ENABLED = os.getenv("SAFENET_MICROBATCH", "0").lower() in ("1", "true", "yes")
+MAX_BATCH = int(os.getenv("SAFENET_MICROBATCH_MAX_BATCH", "16"))
+MAX_WAIT_MS = float(os.getenv("SAFENET_MICROBATCH_MAX_WAIT_MS", "5"))
+
+_batchers = {}
+_batchers_lock = threading.Lock()
+
+
+class _Request:
+    __slots__ = ("texts", "features", "done", "result", "error", "enqueued_at")
+
+    def __init__(self, texts, features):
+        self.texts = texts
+        self.features = features
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.enqueued_at = time.perf_counter()
+
+
+class MicroBatcher:
+    """
+    Coalesces texts from concurrent callers into one call of `batch_fn`.
+
+    The first queued request opens a window of `max_wait_ms`; everything
+    that arrives before the window closes (or until `max_batch` texts are
+    queued) is scored together and each caller gets back its own slice.
+    """
+
+    def __init__(self, name, batch_fn, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS):
+        self.name = name
+        self.batch_fn = batch_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._queue = deque()
+        self._queued_texts = 0
+        self._cond = threading.Condition()
+        self._worker = None
+        self._worker_pid = None
+
+        self._batch_sizes = Counter()
+        self._queue_depths = Counter()
+        self._waits = deque(maxlen=1000)
+        self._batches = 0
+        self._items = 0
+
+    def submit(self, texts, features=None):
+        """Queue `texts`, block until their batch has run, return their results."""
+        texts = list(texts)
+        if not texts:
+            return []
+
+        features = list(features) if features is not None else [None] * len(texts)
+        req = _Request(texts, features)
+        with self._cond:
+            self._ensure_worker()
+            self._queue.append(req)
+            self._queued_texts += len(texts)
+            self._cond.notify()
+
+        req.done.wait()
+        if req.error is not None:
+            raise req.error
+        return req.result
+
+    def _ensure_worker(self):
+        # Threads do not survive fork — restart the worker in each gunicorn worker
+        if self._worker is not None and self._worker.is_alive() and self._worker_pid == os.getpid():
+            return
+        self._worker_pid = os.getpid()
+        self._worker = threading.Thread(target=self._run, name=f"microbatch-{self.name}", daemon=True)
+        self._worker.start()
+
+    def _next_batch(self):
+        with self._cond:
+            while not self._queue:
+                self._cond.wait()
+
+            deadline = self._queue[0].enqueued_at + self.max_wait
+            while self._queued_texts < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            depth = self._queued_texts
+            batch, size = [], 0
+            while self._queue:
+                nxt = len(self._queue[0].texts)
+                if batch and size + nxt > self.max_batch:
+                    break
+                req = self._queue.popleft()
+                batch.append(req)
+                size += nxt
+            self._queued_texts -= size
+
+        return batch, size, depth
+
+    def _run(self):
+        while True:
+            batch, size, depth = self._next_batch()
+            texts = [t for req in batch for t in req.texts]
+            features = [f for req in batch for f in req.features]
+            started = time.perf_counter()
+
+            try:
+                results = self.batch_fn(texts, features)
+                error = None
+            except Exception as e:
+                results, error = None, e
+
+            with self._cond:
+                self._batches += 1
+                self._items += size
+                self._batch_sizes[size] += 1
+                self._queue_depths[depth] += 1
+                for req in batch:
+                    self._waits.append(started - req.enqueued_at)
+
+            offset = 0
+            for req in batch:
+                if error is not None:
+                    req.error = error
+                else:
+                    req.result = results[offset:offset + len(req.texts)]
+                offset += len(req.texts)
+                req.done.set()
+
+    def stats(self):
+        with self._cond:
+            waits = sorted(self._waits)
+            return {
+                "max_batch": self.max_batch,
+                "max_wait_ms": self.max_wait * 1000.0,
+                "queue_depth": self._queued_texts,
+                "batches": self._batches,
+                "items": self._items,
+                "avg_batch_size": (self._items / self._batches) if self._batches else 0.0,
+                "batch_size_histogram": dict(sorted(self._batch_sizes.items())),
+                "queue_depth_histogram": dict(sorted(self._queue_depths.items())),
+                "wait_ms_p50": _percentile(waits, 0.50) * 1000.0,
+                "wait_ms_p95": _percentile(waits, 0.95) * 1000.0,
+            }
+
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+# ============================================
+# 🔥 SHARED BATCHERS (one per model)
+# ============================================
+def get_batcher(name, batch_fn):
+    with _batchers_lock:
+        if name not in _batchers:
+            _batchers[name] = MicroBatcher(name, batch_fn)
+        return _batchers[name]
+
+
+def run_batched(name, batch_fn, texts, features=None):
+    """
+    Score `texts` with `batch_fn(texts, features)`, coalesced with concurrent
+    callers when enabled. `features` are optional pre-tokenized inputs.
+    """
+    if not ENABLED:
+        return batch_fn(texts, features)
+    return get_batcher(name, batch_fn).submit(texts, features)
+
+
+def batcher_stats():
+    with _batchers_lock:
+        batchers = dict(_batchers)
+    return {
+        "enabled": ENABLED,
+        "models": {name: b.stats() for name, b in batchers.items()},
+    }
@@ -0,0 +1,65 @@
+# ai_models/model_loader.py
+from transformers import AutoTokenizer, AutoModelForSequenceClassification
+from ai_models.hf_settings import HF_TOKEN
+from ai_models import compiled, model_manifest, onnx_backend, precision as precision_modes, shared_weights, threads
+
+
+def load_classifier(label, hf_repo, local_dir,
+                    tokenizer_cls=AutoTokenizer,
+                    model_cls=AutoModelForSequenceClassification,
+                    precision="fp32"):
+    """
+    Load one of the sequence classifiers from its local `saved_*_transformer_best`
+    dir (synced by `manage.py sync_models`). With SAFENET_OFFLINE_MODELS=0,
+    HuggingFace is tried first with the local dir as fallback. Then hand the model to
+    the configured inference backend (see onnx_backend) or convert it to
+    the requested precision (see precision). fp32/bf16 weights are then
+    memory-mapped so all workers share them (see shared_weights), and the
+    model optionally runs through length-bucketed graphs (see compiled).
+    """
+    threads.ensure_applied()
+    # Derived caches are reused only if built from the same checkpoint, which
+    # is known before loading only for a disk load; hub loads check afterwards
+    expected = model_manifest.checkpoint_id(local_dir) if model_manifest.OFFLINE else None
+
+    if onnx_backend.use_onnx() and onnx_backend.has_export(local_dir, expected):
+        print(f"Loading {label} Model from ONNX export…")
+        return onnx_backend.load_export(local_dir)
+
+    if precision == "int8" and precision_modes.has_int8(local_dir, expected):
+        print(f"Loading {label} Model from cached int8 weights…")
+        tokenizer, model = precision_modes.load_int8(local_dir)
+        return tokenizer, compiled.wrap(label, model)
+
+    if model_manifest.OFFLINE:
+        model_manifest.require(local_dir, label)
+        print(f"Loading {label} Model from {local_dir}…")
+        tokenizer = tokenizer_cls.from_pretrained(local_dir, local_files_only=True)
+        model = model_cls.from_pretrained(local_dir, local_files_only=True)
+        checkpoint = model_manifest.checkpoint_id(local_dir)
+    else:
+        try:
+            print(f"Loading {label} Model from HuggingFace…")
+            tokenizer = tokenizer_cls.from_pretrained(hf_repo, use_auth_token=HF_TOKEN)
+            model = model_cls.from_pretrained(hf_repo, use_auth_token=HF_TOKEN)
+            checkpoint = model_manifest.checkpoint_id(model=model)
+        except Exception:
+            print("⚠ HF download failed — using LOCAL model.")
+            tokenizer = tokenizer_cls.from_pretrained(local_dir, local_files_only=True)
+            model = model_cls.from_pretrained(local_dir, local_files_only=True)
+            checkpoint = model_manifest.checkpoint_id(local_dir)
+
+    model.eval()
+
+    if onnx_backend.use_onnx():
+        return onnx_backend.export_and_load(local_dir, tokenizer, model, checkpoint)
+
+    if precision == "int8" and precision_modes.has_int8(local_dir, checkpoint):
+        print(f"Loading {label} Model from cached int8 weights…")
+        tokenizer, model = precision_modes.load_int8(local_dir)
+        return tokenizer, compiled.wrap(label, model)
+
+    tokenizer, model = precision_modes.apply_precision(local_dir, tokenizer, model, precision, checkpoint)
+    if precision != "int8":
+        model = shared_weights.share(model, shared_weights.weights_path(local_dir, precision), checkpoint)
+    return tokenizer, compiled.wrap(label, model)
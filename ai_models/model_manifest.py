@@ -0,0 +1,234 @@
+# ai_models/model_manifest.py
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+
+from ai_models.hf_settings import HF_TOKEN, repo
+
+logger = logging.getLogger(__name__)
+
+BASE = os.path.dirname(__file__)
+
+# ============================================
+# 🔥 SETTINGS
+# ============================================
+# Load models strictly from the local saved_* dirs (no Hugging Face round
+# trip at boot). Artifacts are fetched ahead of time by `manage.py sync_models`.
+OFFLINE = os.getenv("SAFENET_OFFLINE_MODELS", "1").lower() in ("1", "true", "yes")
+MANIFEST_FILE = "safenet_manifest.json"
+# Written into a derived cache dir: the checkpoint_id it was built from
+CHECKPOINT_FILE = "safenet_checkpoint"
+
+MODELS = {
+    "spam": {"repo": repo("spam-transformer-best"), "local_dir": os.path.join(BASE, "saved_spam_transformer_best")},
+    "toxicity": {"repo": repo("toxicity-transformer-best"), "local_dir": os.path.join(BASE, "saved_toxicity_transformer_best")},
+    "phishing": {"repo": repo("phishing-transformer-best"), "local_dir": os.path.join(BASE, "saved_phishing_transformer_best")},
+    "drug": {"repo": repo("drug-transformer-best"), "local_dir": os.path.join(BASE, "saved_drug_transformer_best")},
+    "minilm": {"repo": "sentence-transformers/all-MiniLM-L6-v2", "local_dir": os.path.join(BASE, "saved_minilm_embedder")},
+}
+
+# Other frameworks' weights in the hub repos that we never load
+IGNORE_PATTERNS = ["onnx/*", "openvino/*", "*.h5", "*.msgpack", "*.ot", "tf_model*", "flax_model*", ".gitattributes"]
+# Caches derived from a checkpoint; dropped whenever the checkpoint changes
+DERIVED_SUFFIXES = ("_onnx", "_int8", "_safetensors")
+
+
+class ModelNotAvailable(RuntimeError):
+    pass
+
+
+def _sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _model_files(local_dir):
+    for root, dirs, files in os.walk(local_dir):
+        dirs[:] = [d for d in dirs if not d.startswith(".")]
+        for name in files:
+            if name != MANIFEST_FILE and not name.startswith("."):
+                path = os.path.join(root, name)
+                yield os.path.relpath(path, local_dir), path
+
+
+def read_manifest(local_dir):
+    try:
+        with open(os.path.join(local_dir, MANIFEST_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_manifest(local_dir, repo_id, revision):
+    manifest = {
+        "repo": repo_id,
+        "revision": revision,
+        "synced_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "files": {
+            rel: {"sha256": _sha256(path), "size": os.path.getsize(path)}
+            for rel, path in sorted(_model_files(local_dir))
+        },
+    }
+    with open(os.path.join(local_dir, MANIFEST_FILE), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def verify(local_dir, checksums=False):
+    """
+    Problems with a synced model dir ([] = OK). Sizes are always checked;
+    sha256 only with `checksums` (reads every byte — used by sync_models).
+    """
+    if not os.path.isdir(local_dir):
+        return [f"{local_dir} does not exist"]
+
+    manifest = read_manifest(local_dir)
+    if manifest is None:
+        return [f"no {MANIFEST_FILE} in {local_dir}"]
+
+    problems = []
+    for rel, info in manifest["files"].items():
+        path = os.path.join(local_dir, rel)
+        if not os.path.exists(path):
+            problems.append(f"missing {rel}")
+        elif os.path.getsize(path) != info["size"]:
+            problems.append(f"size mismatch for {rel}")
+        elif checksums and _sha256(path) != info["sha256"]:
+            problems.append(f"checksum mismatch for {rel}")
+    return problems
+
+
+def require(local_dir, label):
+    """
+    Make sure `local_dir` can be loaded from disk. Dirs that predate the
+    manifest are accepted with a warning; missing or damaged ones raise.
+    """
+    if not os.path.isdir(local_dir):
+        raise ModelNotAvailable(
+            f"{label} model not found in {local_dir}. "
+            f"Run `python manage.py sync_models` (or set SAFENET_OFFLINE_MODELS=0)."
+        )
+
+    if read_manifest(local_dir) is None:
+        logger.warning("%s model in %s has no manifest; run sync_models to pin it", label, local_dir)
+        return
+
+    problems = verify(local_dir)
+    if problems:
+        raise ModelNotAvailable(
+            f"{label} model in {local_dir} is damaged ({'; '.join(problems[:3])}). "
+            f"Run `python manage.py sync_models --force {label.lower()}`."
+        )
+
+
+def sync(name, revision=None, force=False):
+    """
+    Download one model from the hub into its local dir, verify it and write
+    its manifest. Returns "up to date" or the synced revision. A local copy
+    that verifies against its manifest is kept without contacting the hub;
+    only `force` or an explicit `revision` look for a newer one.
+    """
+    from huggingface_hub import HfApi, snapshot_download
+
+    spec = MODELS[name]
+    local_dir = spec["local_dir"]
+    manifest = read_manifest(local_dir)
+    if not force and revision is None and manifest and not verify(local_dir, checksums=True):
+        return "up to date"
+
+    resolved = HfApi().model_info(spec["repo"], revision=revision, token=HF_TOKEN).sha
+    if not force and manifest and manifest.get("revision") == resolved and not verify(local_dir, checksums=True):
+        return "up to date"
+
+    # Download next to the live dir and swap it in, so a failed sync never
+    # leaves a half-written model behind
+    tmp_dir = f"{local_dir}.{os.getpid()}.sync"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    snapshot_download(spec["repo"], revision=resolved, local_dir=tmp_dir, token=HF_TOKEN,
+                      ignore_patterns=IGNORE_PATTERNS)
+    shutil.rmtree(os.path.join(tmp_dir, ".cache"), ignore_errors=True)
+    write_manifest(tmp_dir, spec["repo"], resolved)
+
+    old_dir = f"{local_dir}.{os.getpid()}.old"
+    if os.path.isdir(local_dir):
+        os.rename(local_dir, old_dir)
+    os.rename(tmp_dir, local_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+    for suffix in DERIVED_SUFFIXES:
+        shutil.rmtree(local_dir + suffix, ignore_errors=True)
+
+    return resolved
+
+
+def _commit_hash(model):
+    config = getattr(model, "config", None)
+    if config is None:
+        # SentenceTransformer: the HF model is inside its first module
+        try:
+            config = model[0].auto_model.config
+        except (TypeError, IndexError, KeyError, AttributeError):
+            return None
+    return getattr(config, "_commit_hash", None)
+
+
+def checkpoint_id(local_dir=None, model=None):
+    """
+    Identity of the weights a derived cache (mmap file, ONNX export, int8
+    weights) is built from, or None if it cannot be told. Pass `local_dir`
+    for a model loaded from disk (size and mtime of its files, so a re-sync
+    or a hand-replaced dir invalidates the caches), or the hub-loaded
+    `model` (its resolved commit). SAFENET_MODEL_VERSION is part of it too.
+    """
+    if local_dir is not None:
+        if not os.path.isdir(local_dir):
+            return None
+        parts = []
+        for rel, path in sorted(_model_files(local_dir)):
+            st = os.stat(path)
+            parts.append(f"{rel}:{st.st_size}:{st.st_mtime_ns}")
+    else:
+        commit = _commit_hash(model)
+        if not commit:
+            return None
+        parts = [f"commit={commit}"]
+    return hashlib.sha256("|".join([MODEL_VERSION] + parts).encode()).hexdigest()[:16]
+
+
+def read_checkpoint(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, CHECKPOINT_FILE)) as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def write_checkpoint(cache_dir, checkpoint):
+    """Stamp a derived cache dir with the checkpoint_id it was just built from."""
+    path = os.path.join(cache_dir, CHECKPOINT_FILE)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(checkpoint)
+    os.replace(tmp_path, path)
+
+
+def manifest_version():
+    """Short hash of the synced revisions of every model ("1" if none are synced)."""
+    revisions = []
+    for name, spec in sorted(MODELS.items()):
+        manifest = read_manifest(spec["local_dir"])
+        if manifest and manifest.get("revision"):
+            revisions.append(f"{name}={manifest['revision']}")
+    if not revisions:
+        return "1"
+    return hashlib.sha256("|".join(revisions).encode()).hexdigest()[:12]
+
+
+# Bump (or re-sync) when the classifier weights change: invalidates cached verdicts
+MODEL_VERSION = os.getenv("SAFENET_MODEL_VERSION") or manifest_version()
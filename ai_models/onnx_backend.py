@@ -0,0 +1,203 @@
+# ai_models/onnx_backend.py
+import os
+import logging
+import shutil
+from functools import lru_cache
+from importlib.util import find_spec
+from types import SimpleNamespace
+
+import torch
+from transformers import AutoConfig, AutoTokenizer
+
+from ai_models import model_manifest, threads
+from ai_models.model_manifest import MODELS
+
+logger = logging.getLogger(__name__)
+
+# "torch" (default) or "onnx"
+BACKEND = os.getenv("SAFENET_INFERENCE_BACKEND", "torch").lower()
+ONNX_FILE = "model.onnx"
+EMBEDDER_ONNX_DIR = os.path.join(os.path.dirname(__file__), "saved_minilm_embedder_onnx")
+EMBEDDER_DIR = MODELS["minilm"]["local_dir"]
+
+
+def use_onnx():
+    return BACKEND == "onnx" and _onnxruntime_installed()
+
+
+@lru_cache(maxsize=None)
+def _onnxruntime_installed():
+    if find_spec("onnxruntime") is None:
+        logger.error("SAFENET_INFERENCE_BACKEND=onnx but onnxruntime is not installed, using PyTorch")
+        return False
+    return True
+
+
+def active_backend():
+    """The backend models actually load on (what model tags should report)."""
+    return "onnx" if use_onnx() else "torch"
+
+
+def export_dir(local_dir):
+    """ONNX exports live next to the PyTorch checkpoint: saved_x_best -> saved_x_best_onnx."""
+    return local_dir.rstrip(os.sep) + "_onnx"
+
+
+def has_export(local_dir, checkpoint):
+    """True if the export on disk was built from `checkpoint` (see model_manifest.checkpoint_id)."""
+    out_dir = export_dir(local_dir)
+    return (
+        checkpoint is not None
+        and os.path.exists(os.path.join(out_dir, ONNX_FILE))
+        and model_manifest.read_checkpoint(out_dir) == checkpoint
+    )
+
+
+# ============================================
+# 🔥 ONNX RUNTIME MODEL WRAPPER
+# ============================================
+class OnnxSequenceClassifier:
+    """
+    Drop-in for AutoModelForSequenceClassification at inference time:
+    `model(**encoded).logits` returns a torch tensor, `model.config` is the
+    original HF config.
+    """
+
+    def __init__(self, path, config):
+        import onnxruntime as ort
+
+        opts = ort.SessionOptions()
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        opts.intra_op_num_threads = threads.intra_op_threads()
+        opts.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(path, sess_options=opts, providers=["CPUExecutionProvider"])
+        self.input_names = [i.name for i in self.session.get_inputs()]
+        self.config = config
+        self.path = path
+
+    def __call__(self, **inputs):
+        feed = {
+            name: inputs[name].cpu().numpy().astype("int64")
+            for name in self.input_names
+        }
+        logits = self.session.run(["logits"], feed)[0]
+        return SimpleNamespace(logits=torch.from_numpy(logits))
+
+    def eval(self):
+        return self
+
+
+class _LogitsOnly(torch.nn.Module):
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_ids, attention_mask):
+        return self.model(input_ids=input_ids, attention_mask=attention_mask).logits
+
+
+# ============================================
+# 🔥 EXPORT / LOAD
+# ============================================
+def export(local_dir, tokenizer, model, checkpoint):
+    """
+    Export a loaded PyTorch classifier; the tokenizer and config are saved
+    beside it. The dir is stamped with `checkpoint` so has_export() can tell
+    a stale export (None: never reused).
+    """
+    out_dir = export_dir(local_dir)
+    os.makedirs(out_dir, exist_ok=True)
+
+    sample = tokenizer(["warmup text for export"], return_tensors="pt")
+    tmp_path = os.path.join(out_dir, f"{ONNX_FILE}.{os.getpid()}.tmp")
+
+    with torch.no_grad():
+        torch.onnx.export(
+            _LogitsOnly(model),
+            (sample["input_ids"], sample["attention_mask"]),
+            tmp_path,
+            input_names=["input_ids", "attention_mask"],
+            output_names=["logits"],
+            dynamic_axes={
+                "input_ids": {0: "batch", 1: "sequence"},
+                "attention_mask": {0: "batch", 1: "sequence"},
+                "logits": {0: "batch"},
+            },
+            opset_version=17,
+            dynamo=False,
+        )
+
+    tokenizer.save_pretrained(out_dir)
+    model.config.save_pretrained(out_dir)
+    # Atomic rename so concurrent workers never see a half-written file
+    os.replace(tmp_path, os.path.join(out_dir, ONNX_FILE))
+    if checkpoint is not None:
+        model_manifest.write_checkpoint(out_dir, checkpoint)
+    print(f"✅ Exported ONNX model to {out_dir}")
+
+
+def load_export(local_dir):
+    out_dir = export_dir(local_dir)
+    tokenizer = AutoTokenizer.from_pretrained(out_dir, local_files_only=True)
+    config = AutoConfig.from_pretrained(out_dir, local_files_only=True)
+    return tokenizer, OnnxSequenceClassifier(os.path.join(out_dir, ONNX_FILE), config)
+
+
+def export_and_load(local_dir, tokenizer, model, checkpoint):
+    """Export unless `checkpoint` already is, and switch to ONNX Runtime; keep the PyTorch model on any failure."""
+    try:
+        if not has_export(local_dir, checkpoint):
+            export(local_dir, tokenizer, model, checkpoint)
+        return load_export(local_dir)
+    except Exception as e:
+        logger.warning("ONNX backend unavailable for %s, using PyTorch: %s", local_dir, e)
+        return tokenizer, model
+
+
+# ============================================
+# 🔥 SENTENCE EMBEDDER
+# ============================================
+def load_sentence_transformer(name="all-MiniLM-L6-v2"):
+    """SentenceTransformer on the configured backend, cached under saved_minilm_embedder_onnx."""
+    from sentence_transformers import SentenceTransformer
+
+    threads.ensure_applied()
+    if model_manifest.OFFLINE:
+        # Load the synced copy from disk instead of resolving `name` on the hub
+        model_manifest.require(EMBEDDER_DIR, "MiniLM")
+        name = EMBEDDER_DIR
+
+    if not use_onnx():
+        from ai_models import shared_weights
+        model = SentenceTransformer(name)
+        checkpoint = model_manifest.checkpoint_id(name) if name == EMBEDDER_DIR else model_manifest.checkpoint_id(model=model)
+        return shared_weights.share(model, shared_weights.weights_path(EMBEDDER_DIR), checkpoint)
+
+    try:
+        # Only a disk load tells the checkpoint before loading; hub loads skip the cache
+        expected = model_manifest.checkpoint_id(name) if name == EMBEDDER_DIR else None
+        if expected is not None and model_manifest.read_checkpoint(EMBEDDER_ONNX_DIR) == expected:
+            return SentenceTransformer(EMBEDDER_ONNX_DIR, backend="onnx")
+
+        embedder = SentenceTransformer(name, backend="onnx")
+        if expected is not None:
+            _save_embedder(embedder, expected)
+        return embedder
+    except Exception as e:
+        logger.warning("ONNX embedder unavailable, using PyTorch: %s", e)
+        return SentenceTransformer(name)
+
+
+def _save_embedder(embedder, checkpoint):
+    tmp_dir = f"{EMBEDDER_ONNX_DIR}.{os.getpid()}.tmp"
+    old_dir = f"{EMBEDDER_ONNX_DIR}.{os.getpid()}.old"
+    embedder.save(tmp_dir)
+    model_manifest.write_checkpoint(tmp_dir, checkpoint)
+    try:
+        if os.path.isdir(EMBEDDER_ONNX_DIR):
+            os.rename(EMBEDDER_ONNX_DIR, old_dir)
+        os.rename(tmp_dir, EMBEDDER_ONNX_DIR)
+    except OSError:
+        pass  # another worker got there first
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    shutil.rmtree(old_dir, ignore_errors=True)
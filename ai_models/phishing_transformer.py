@@ -1,47 +1,62 @@
-import os
-import torch
 from transformers import DistilBertTokenizerFast, DistilBertForSequenceClassification
-from ai_models.hf_settings import HF_TOKEN, repo
+from ai_models.model_manifest import MODELS
+from ai_models.model_loader import load_classifier
+from ai_models.registry import registry
+from ai_models.batch_inference import predict_proba_batch
+from ai_models.micro_batcher import run_batched
 
-LOCAL_DIR = os.path.join(os.path.dirname(__file__), "saved_phishing_transformer_best")
-HF_REPO = repo("phishing-transformer-best")
+LOCAL_DIR = MODELS["phishing"]["local_dir"]
+HF_REPO = MODELS["phishing"]["repo"]
 
-_tokenizer = None
-_model = None
 
+def _load(precision):
+    return load_classifier("Phishing", HF_REPO, LOCAL_DIR,
+                           tokenizer_cls=DistilBertTokenizerFast,
+                           model_cls=DistilBertForSequenceClassification,
+                           precision=precision)
 
-def load_phishing_model():
-    global _tokenizer, _model
 
-    if _tokenizer and _model:
-        return _tokenizer, _model
+registry.register("phishing", _load)
 
-    try:
-        print("Loading Phishing Model from HuggingFace…")
-        _tokenizer = DistilBertTokenizerFast.from_pretrained(HF_REPO, use_auth_token=HF_TOKEN)
-        _model = DistilBertForSequenceClassification.from_pretrained(HF_REPO, use_auth_token=HF_TOKEN)
-    except Exception:
-        print("⚠ HF download failed — using LOCAL model.")
-        _tokenizer = DistilBertTokenizerFast.from_pretrained(LOCAL_DIR, local_files_only=True)
-        _model = DistilBertForSequenceClassification.from_pretrained(LOCAL_DIR, local_files_only=True)
 
-    _model.eval()
-    return _tokenizer, _model
+def load_phishing_model(precision=None):
+    """precision: "fp32", "int8" or "bf16" (default: SAFENET_PRECISION)."""
+    return registry.get("phishing", precision)
 
 
 def predict_phishing_transformer(text):
-    if not text or not isinstance(text, str):
-        return {"phishing": 0.0, "legitimate": 1.0}
+    return predict_phishing_transformer_batch([text])[0]
 
-    tokenizer, model = load_phishing_model()
 
-    enc = tokenizer(text, return_tensors="pt", truncation=True, padding=True, max_length=256)
-    with torch.no_grad():
-        logits = model(**enc).logits
+def predict_phishing_transformer_batch(texts, features=None):
+    """
+    Score many texts in one padded forward pass. Empty/non-str entries are legitimate.
+    `features`: optional pre-tokenized inputs (batch_inference.tokenize) for the texts.
+    """
+    results = [{"phishing": 0.0, "legitimate": 1.0} for _ in texts]
+    valid = [i for i, t in enumerate(texts) if t and isinstance(t, str)]
+    if not valid:
+        return results
+
+    scored = run_batched(
+        "phishing", _predict_phishing_transformer_batch,
+        [texts[i] for i in valid],
+        [features[i] for i in valid] if features is not None else None,
+    )
+    for i, res in zip(valid, scored):
+        results[i] = res
 
-    probs = torch.softmax(logits, dim=1)[0]
+    return results
 
-    return {
-        "phishing": round(probs[1].item(), 4),
-        "legitimate": round(probs[0].item(), 4)
-    }
+
+def _predict_phishing_transformer_batch(texts, features=None):
+    tokenizer, model = load_phishing_model()
+    probs = predict_proba_batch(tokenizer, model, texts, features=features)
+
+    return [
+        {
+            "phishing": round(p[1].item(), 4),
+            "legitimate": round(p[0].item(), 4)
+        }
+        for p in probs
+    ]
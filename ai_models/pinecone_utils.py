@@ -1,8 +1,9 @@
 # ai_models/pinecone_utils.py
 
-from pinecone import Pinecone, ServerlessSpec
-from sentence_transformers import SentenceTransformer
+from ai_models.local_index import use_local, get_local_index
+from ai_models import embedder
 import os
+import threading
 from dotenv import load_dotenv
 import logging
 
@@ -15,13 +16,19 @@ logger = logging.getLogger(__name__)
 def get_pinecone_index():
     load_dotenv()
 
+    # ALWAYS USE THIS INDEX
+    index_name = os.getenv("PINECONE_INDEX", "safenet-blocklist")
+
+    # SAFENET_VECTOR_BACKEND=local → in-process index, no network round trip
+    if use_local():
+        print(f"✅ Using local vector index: {index_name}")
+        return get_local_index(index_name, bootstrap=bootstrap_from_slang_words)
+
     api_key = os.getenv("PINECONE_API_KEY")
     if not api_key:
         raise ValueError("Missing PINECONE_API_KEY")
 
-    # ALWAYS USE THIS INDEX
-    index_name = os.getenv("PINECONE_INDEX", "safenet-blocklist")
-
+    from pinecone import Pinecone, ServerlessSpec
     pc = Pinecone(api_key=api_key)
 
     # Check existing indexes
@@ -42,23 +49,80 @@ def get_pinecone_index():
     return index
 
 
-# Single global instance
-index = get_pinecone_index()
+def bootstrap_from_slang_words(local_index):
+    """
+    Seed an empty local index from the active rows of the slang_words table.
+    Every module opening the blocklist index passes this, so it is seeded
+    whichever opens it first.
+    """
+    from safenet.supabase_client import supabase
+
+    rows = supabase.from_("slang_words").select("word").eq("is_active", True).execute().data or []
+    words = sorted({r["word"].lower().strip() for r in rows if r.get("word")})
+    if not words:
+        return
+
+    local_index.upsert([
+        {
+            "id": f"slang_{word}",
+            "values": vector,
+            "metadata": {"type": "slang", "word": word, "text": word, "category": "slang"},
+        }
+        for word, vector in zip(words, get_embeddings(words))
+    ])
+    logger.info("Local index seeded with %d slang words", len(words))
+
 
 # ============================================
-# 🔥 LOAD EMBEDDING MODEL
+# 🔥 LAZY SINGLETONS (index + embedding model)
+#    Created on first use, not at import, so Django commands and URL
+#    loading never pay for model loading or network calls.
 # ============================================
-model = SentenceTransformer("all-MiniLM-L6-v2")
+_index = None
+_init_lock = threading.Lock()
+
+
+def get_index():
+    global _index
+    if _index is None:
+        with _init_lock:
+            if _index is None:
+                _index = get_pinecone_index()
+    return _index
+
+
+def get_model():
+    return embedder.get_model()
+
+
+def reset_index():
+    """Drop the index client (e.g. after fork); the next use reconnects."""
+    global _index
+    _index = None
+
+
+def __getattr__(name):
+    # Keep `pinecone_utils.index` / `.model` working for existing callers
+    if name == "index":
+        return get_index()
+    if name == "model":
+        return get_model()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 # ============================================
 # 🔥 EMBEDDING FUNCTION
 # ============================================
 def get_embedding(text: str):
-    vector = model.encode([text])[0].tolist()
+    vector = embedder.encode(text).tolist()
     return vector
 
 
+def get_embeddings(texts):
+    """One encoder call for the uncached texts among many (see embedder.encode_many)."""
+    return embedder.encode_many(texts).tolist()
+
+
 # ============================================
 # 🔥 ADD TEXT → UNIFIED BLOCKLIST
 # ============================================
@@ -79,7 +143,7 @@ def store_text(text: str, added_by: str, category="generic"):
         "added_by": added_by
     }
 
-    response = index.upsert([
+    response = get_index().upsert([
         {"id": vector_id, "values": vector, "metadata": meta}
     ])
 
@@ -89,29 +153,46 @@ def store_text(text: str, added_by: str, category="generic"):
 # ============================================
 # 🔥 CHECK SIMILARITY
 # ============================================
-def check_text(text: str, threshold=0.80, category=None):
-    """
-    category filter optional
-    category="phishing" or "slang" or "drug"
-    """
-
-    vector = get_embedding(text)
-
+def query_nearest(vector, top_k=1, category=None):
+    """Raw nearest-neighbour matches for an embedding (optionally one category)."""
     query_params = {
         "vector": vector,
-        "top_k": 1,
+        "top_k": top_k,
         "include_metadata": True
     }
 
     if category:
         query_params["filter"] = {"category": category}
 
-    result = index.query(**query_params)
+    result = get_index().query(**query_params)
+    return result.get("matches") or []
+
+
+def query_nearest_many(vectors, top_k=1, category=None):
+    """query_nearest for many embeddings; one matrix multiply on the local index."""
+    index = get_index()
+    if hasattr(index, "query_batch"):
+        filter = {"category": category} if category else None
+        return index.query_batch(vectors, top_k=top_k, include_metadata=True, filter=filter)
+    # The Pinecone client wants plain lists
+    return [query_nearest(getattr(v, "tolist", lambda: v)(), top_k=top_k, category=category) for v in vectors]
+
+
+def check_text(text: str, threshold=0.80, category=None, matches=None):
+    """
+    category filter optional
+    category="phishing" or "slang" or "drug"
+
+    `matches` may be a query_nearest() result the caller already has
+    (e.g. from a ModerationContext), which skips the embedding + query.
+    """
+    if matches is None:
+        matches = query_nearest(get_embedding(text), top_k=1, category=category)
 
-    if not result.get("matches"):
+    if not matches:
         return False, 0, None
 
-    match = result["matches"][0]
+    match = matches[0]
     score = match["score"]
     matched_text = match["metadata"].get("text")
 
@@ -126,5 +207,5 @@ def check_text(text: str, threshold=0.80, category=None):
 # ============================================
 def delete_text(text: str, category="generic"):
     vector_id = f"{category}_{text.lower()}"
-    index.delete(ids=[vector_id])
+    get_index().delete(ids=[vector_id])
     return True
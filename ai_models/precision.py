@@ -0,0 +1,107 @@
+# ai_models/precision.py
+import os
+import logging
+from functools import lru_cache
+
+import torch
+from transformers import AutoConfig, AutoTokenizer, AutoModelForSequenceClassification
+
+from ai_models import model_manifest
+
+logger = logging.getLogger(__name__)
+
+# "fp32" (default), "int8" (dynamic quantized Linear layers) or "bf16"
+PRECISION = os.getenv("SAFENET_PRECISION", "fp32").lower()
+PRECISIONS = ("fp32", "int8", "bf16")
+INT8_FILE = "quantized.pt"
+
+
+def resolve_precision(precision=None):
+    """Pick the effective precision: explicit arg, else SAFENET_PRECISION; bf16 only if the CPU has it."""
+    return _resolve((precision or PRECISION).lower())
+
+
+@lru_cache(maxsize=None)
+def _resolve(precision):
+    # Cached: model_tag() asks on every request, and the CPU doesn't change
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown precision {precision!r}, expected one of {PRECISIONS}")
+
+    if precision == "bf16" and not bf16_supported():
+        logger.warning("bf16 not supported on this CPU, using fp32")
+        return "fp32"
+
+    return precision
+
+
+def bf16_supported():
+    try:
+        return bool(torch.ops.mkldnn._is_mkldnn_bf16_supported())
+    except Exception:
+        return False
+
+
+def int8_dir(local_dir):
+    """Quantized weights live next to the fp32 checkpoint: saved_x_best -> saved_x_best_int8."""
+    return local_dir.rstrip(os.sep) + "_int8"
+
+
+def has_int8(local_dir, checkpoint):
+    """True if the cached int8 weights were quantized from `checkpoint` (see model_manifest.checkpoint_id)."""
+    out_dir = int8_dir(local_dir)
+    return (
+        checkpoint is not None
+        and os.path.exists(os.path.join(out_dir, INT8_FILE))
+        and model_manifest.read_checkpoint(out_dir) == checkpoint
+    )
+
+
+def _quantize(model):
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+# ============================================
+# 🔥 APPLY / CACHE
+# ============================================
+def load_int8(local_dir):
+    """Rebuild the quantized module structure from config and load the cached int8 weights."""
+    out_dir = int8_dir(local_dir)
+    tokenizer = AutoTokenizer.from_pretrained(out_dir, local_files_only=True)
+    config = AutoConfig.from_pretrained(out_dir, local_files_only=True)
+
+    model = _quantize(AutoModelForSequenceClassification.from_config(config).eval())
+    model.load_state_dict(torch.load(os.path.join(out_dir, INT8_FILE), map_location="cpu"))
+    return tokenizer, model.eval()
+
+
+def save_int8(local_dir, tokenizer, model, checkpoint):
+    out_dir = int8_dir(local_dir)
+    os.makedirs(out_dir, exist_ok=True)
+
+    tmp_path = os.path.join(out_dir, f"{INT8_FILE}.{os.getpid()}.tmp")
+    torch.save(model.state_dict(), tmp_path)
+    tokenizer.save_pretrained(out_dir)
+    model.config.save_pretrained(out_dir)
+    os.replace(tmp_path, os.path.join(out_dir, INT8_FILE))
+    model_manifest.write_checkpoint(out_dir, checkpoint)
+    print(f"✅ Cached int8 weights in {out_dir}")
+
+
+def apply_precision(local_dir, tokenizer, model, precision, checkpoint=None):
+    """
+    Convert a loaded fp32 classifier to `precision`. int8 weights are cached
+    on disk stamped with `checkpoint`, unless it is unknown (None).
+    """
+    if precision == "int8":
+        model = _quantize(model).eval()
+        if checkpoint is None:
+            return tokenizer, model
+        try:
+            save_int8(local_dir, tokenizer, model, checkpoint)
+        except Exception as e:
+            logger.warning("Could not cache int8 weights for %s: %s", local_dir, e)
+    elif precision == "bf16":
+        # bf16 is a cheap cast at load time, nothing to cache
+        model = model.to(torch.bfloat16).eval()
+
+    return tokenizer, model
@@ -0,0 +1,290 @@
+# ai_models/registry.py
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# ============================================
+# 🔥 SETTINGS
+# ============================================
+# 0 = no limit. Above the budget the least recently used models are
+# unloaded (and transparently reloaded the next time they are needed).
+MEMORY_BUDGET_MB = float(os.getenv("SAFENET_MODEL_MEMORY_BUDGET_MB", "0"))
+# 0 = never. Models unused for this long are unloaded.
+IDLE_SECONDS = float(os.getenv("SAFENET_MODEL_IDLE_SECONDS", "0"))
+SWEEP_INTERVAL = 10.0
+
+
+class _LoadGate:
+    """
+    from_pretrained flips process-global torch state while it runs (default
+    dtype, meta-device weight init), which breaks forward passes running on
+    other threads. Forwards share the gate; a load waits until none are
+    running and holds it alone (new forwards wait behind a pending load).
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._forwards = 0
+        self._loader = None
+        self._pending_loads = 0
+        self._local = threading.local()
+
+    @contextmanager
+    def forward(self):
+        depth = getattr(self._local, "depth", 0)
+        if depth == 0 and self._loader != threading.get_ident():
+            with self._cond:
+                while self._loader is not None or self._pending_loads:
+                    self._cond.wait()
+                self._forwards += 1
+        self._local.depth = depth + 1
+        try:
+            yield
+        finally:
+            self._local.depth = depth
+            if depth == 0 and self._loader != threading.get_ident():
+                with self._cond:
+                    self._forwards -= 1
+                    self._cond.notify_all()
+
+    @contextmanager
+    def load(self):
+        me = threading.get_ident()
+        if self._loader == me:
+            # A loader that needs another model
+            yield
+            return
+        if getattr(self._local, "depth", 0):
+            raise RuntimeError("model loaded from inside a forward pass")
+        with self._cond:
+            self._pending_loads += 1
+            while self._loader is not None or self._forwards:
+                self._cond.wait()
+            self._pending_loads -= 1
+            self._loader = me
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._loader = None
+                self._cond.notify_all()
+
+
+_gate = _LoadGate()
+
+
+def forward_pass():
+    """Context manager around model forwards; keeps them apart from model loads."""
+    return _gate.forward()
+
+
+def _tensor_bytes(obj, seen):
+    import torch
+
+    if isinstance(obj, torch.Tensor):
+        try:
+            key = (obj.untyped_storage().data_ptr(), obj.dtype)
+        except (RuntimeError, NotImplementedError):
+            key = id(obj)
+        if key in seen:
+            return 0
+        seen.add(key)
+        return obj.numel() * obj.element_size()
+    if isinstance(obj, (tuple, list)):
+        return sum(_tensor_bytes(o, seen) for o in obj)
+    return 0
+
+
+def model_nbytes(obj, seen=None):
+    """
+    Approximate bytes held by a loaded model: tensors of nn.Modules (shared
+    tensors counted once), the graph file of ONNX sessions and the arrays of
+    fitted sklearn estimators.
+    """
+    seen = set() if seen is None else seen
+    if obj is None:
+        return 0
+    if isinstance(obj, (tuple, list)):
+        return sum(model_nbytes(o, seen) for o in obj)
+
+    import torch
+
+    if isinstance(obj, torch.nn.Module):
+        return sum(_tensor_bytes(v, seen) for v in obj.state_dict().values())
+
+    path = getattr(obj, "path", None)
+    if isinstance(path, str) and os.path.exists(path):
+        return os.path.getsize(path)
+
+    import numpy as np
+
+    return sum(v.nbytes for v in getattr(obj, "__dict__", {}).values() if isinstance(v, np.ndarray))
+
+
+class _Entry:
+    def __init__(self, name, loader, precision_aware):
+        self.name = name
+        self.loader = loader
+        self.precision_aware = precision_aware
+        self.lock = threading.Lock()
+        self.pins = 0
+        self.value = None
+        self.precision = None
+        self.nbytes = 0
+        self.last_used = 0.0
+        self.uses = 0
+        self.loads = 0
+        self.evictions = 0
+        self.load_seconds = 0.0
+
+
+class ModelRegistry:
+    """
+    One place that owns every loaded model. Each ai_models module registers
+    a loader; get() loads it once under a per-model lock (concurrent callers
+    wait for the same load instead of loading a second copy), records how
+    much memory it holds, and enforces the optional memory budget / idle
+    timeout by unloading the least recently used models. Pinned models are
+    never unloaded.
+    """
+
+    def __init__(self, budget_mb=MEMORY_BUDGET_MB, idle_seconds=IDLE_SECONDS):
+        self.budget_bytes = int(budget_mb * 1024 * 1024)
+        self.idle_seconds = idle_seconds
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._last_sweep = time.monotonic()
+
+    def register(self, name, loader, precision_aware=True):
+        """
+        `loader(precision)` (or `loader()` if not precision_aware) returns the
+        loaded object, e.g. (tokenizer, model). Re-registering keeps any loaded value.
+        """
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None:
+                self._entries[name] = _Entry(name, loader, precision_aware)
+            else:
+                entry.loader, entry.precision_aware = loader, precision_aware
+
+    def pin(self, names):
+        """Exempt `names` from budget / idle eviction until unpin(names)."""
+        with self._lock:
+            for name in names:
+                # Models register when their module is imported, possibly after this
+                entry = self._entries.setdefault(name, _Entry(name, None, True))
+                entry.pins += 1
+
+    def unpin(self, names):
+        with self._lock:
+            for name in names:
+                self._entries[name].pins -= 1
+        # The budget may have been exceeded while they were pinned
+        self._enforce_budget()
+
+    def get(self, name, precision=None):
+        entry = self._entries[name]
+        if entry.precision_aware:
+            from ai_models.precision import resolve_precision
+            precision = resolve_precision(precision)
+
+        value = entry.value
+        if value is None or entry.precision != precision:
+            with entry.lock:
+                if entry.value is None or entry.precision != precision:
+                    self._load(entry, precision)
+                value = entry.value
+
+        entry.last_used = time.monotonic()
+        entry.uses += 1
+        self._maybe_sweep()
+        return value
+
+    def _load(self, entry, precision):
+        # Drop the old copy first so a precision switch never holds two
+        entry.value = None
+        with _gate.load():
+            started = time.perf_counter()
+            value = entry.loader(precision) if entry.precision_aware else entry.loader()
+            entry.load_seconds = time.perf_counter() - started
+
+        try:
+            nbytes = model_nbytes(value)
+        except Exception as e:
+            logger.warning("Could not measure %s: %s", entry.name, e)
+            nbytes = 0
+
+        with self._lock:
+            entry.value, entry.precision, entry.nbytes = value, precision, nbytes
+            entry.loads += 1
+            entry.last_used = time.monotonic()
+        self._enforce_budget(keep=entry.name)
+
+    def unload(self, name):
+        with self._lock:
+            self._unload(self._entries[name])
+
+    def _unload(self, entry):
+        if entry.value is not None:
+            entry.value = None
+            entry.nbytes = 0
+            entry.evictions += 1
+            logger.info("Unloaded model %s", entry.name)
+
+    def _enforce_budget(self, keep=None):
+        if not self.budget_bytes:
+            return
+        with self._lock:
+            loaded = sorted(
+                (e for e in self._entries.values() if e.value is not None and not e.pins and e.name != keep),
+                key=lambda e: e.last_used,
+            )
+            total = sum(e.nbytes for e in self._entries.values() if e.value is not None)
+            for entry in loaded:
+                if total <= self.budget_bytes:
+                    break
+                total -= entry.nbytes
+                self._unload(entry)
+
+    def _maybe_sweep(self):
+        if not self.idle_seconds:
+            return
+        now = time.monotonic()
+        if now - self._last_sweep < SWEEP_INTERVAL:
+            return
+        self._last_sweep = now
+        with self._lock:
+            for entry in self._entries.values():
+                if entry.value is not None and not entry.pins and now - entry.last_used > self.idle_seconds:
+                    self._unload(entry)
+
+    def stats(self):
+        now = time.monotonic()
+        with self._lock:
+            models = {
+                e.name: {
+                    "loaded": e.value is not None,
+                    "pinned": e.pins > 0,
+                    "precision": e.precision,
+                    "mb": round(e.nbytes / (1024 * 1024), 1),
+                    "uses": e.uses,
+                    "loads": e.loads,
+                    "evictions": e.evictions,
+                    "last_load_seconds": round(e.load_seconds, 3),
+                    "idle_seconds": round(now - e.last_used, 1) if e.last_used else None,
+                }
+                for e in self._entries.values()
+            }
+        return {
+            "budget_mb": self.budget_bytes / (1024 * 1024) if self.budget_bytes else None,
+            "idle_seconds": self.idle_seconds or None,
+            "loaded_mb": round(sum(m["mb"] for m in models.values() if m["loaded"]), 1),
+            "models": models,
+        }
+
+
+registry = ModelRegistry()
@@ -0,0 +1,149 @@
+# ai_models/shared_weights.py
+import fcntl
+import json
+import logging
+import mmap
+import os
+import struct
+
+import torch
+from safetensors.torch import save_file
+
+logger = logging.getLogger(__name__)
+
+# ============================================
+# 🔥 SETTINGS
+# ============================================
+# Serve weights from a memory-mapped safetensors file so every worker on
+# the host shares one page-cache copy instead of holding a private one.
+ENABLED = os.getenv("SAFENET_MMAP_WEIGHTS", "1").lower() in ("1", "true", "yes")
+WEIGHTS_FILE = "model.safetensors"
+
+_DTYPES = {
+    "F64": torch.float64, "F32": torch.float32, "F16": torch.float16, "BF16": torch.bfloat16,
+    "I64": torch.int64, "I32": torch.int32, "I16": torch.int16, "I8": torch.int8,
+    "U8": torch.uint8, "BOOL": torch.bool,
+}
+
+
+def weights_path(local_dir, tag="fp32"):
+    return os.path.join(f"{local_dir}_safetensors", tag, WEIGHTS_FILE)
+
+
+def _read_header(f):
+    header_len = struct.unpack("<Q", f.read(8))[0]
+    return header_len, json.loads(f.read(header_len))
+
+
+def _file_checkpoint(path):
+    try:
+        with open(path, "rb") as f:
+            return (_read_header(f)[1].get("__metadata__") or {}).get("checkpoint")
+    except (OSError, ValueError, struct.error):
+        return None
+
+
+def mmap_state_dict(path):
+    """
+    Tensors of a safetensors file as zero-copy views of a private mapping
+    (MAP_PRIVATE): pages come straight from the page cache and stay shared
+    between processes unless someone writes to them.
+    """
+    with open(path, "rb") as f:
+        header_len, header = _read_header(f)
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+
+    metadata = header.pop("__metadata__", None) or {}
+    base = 8 + header_len
+    state = {}
+    for name, info in header.items():
+        dtype = _DTYPES[info["dtype"]]
+        start, end = info["data_offsets"]
+        count = (end - start) // torch.empty((), dtype=dtype).element_size()
+        if count == 0:
+            state[name] = torch.empty(info["shape"], dtype=dtype)
+            continue
+        state[name] = torch.frombuffer(mapped, dtype=dtype, count=count, offset=base + start).view(info["shape"])
+
+    # Tied parameters are stored once; point the aliases at the same tensor
+    for alias, target in json.loads(metadata.get("aliases", "{}")).items():
+        state[alias] = state[target]
+
+    return state, metadata
+
+
+def save_shared(path, module, checkpoint):
+    """Write `module`'s state dict as safetensors (tied tensors stored once), stamped with `checkpoint`."""
+    tensors, aliases, seen = {}, {}, {}
+    for name, tensor in module.state_dict().items():
+        key = (tensor.data_ptr(), tensor.dtype, tuple(tensor.shape))
+        if tensor.numel() and key in seen:
+            aliases[name] = seen[key]
+            continue
+        seen[key] = name
+        tensors[name] = tensor.detach().contiguous()
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    save_file(tensors, tmp_path, metadata={"aliases": json.dumps(aliases), "checkpoint": checkpoint})
+    # Atomic rename so concurrent workers never map a half-written file
+    os.replace(tmp_path, path)
+
+
+def share(module, path, checkpoint):
+    """
+    Swap `module`'s parameters and buffers for memory-mapped ones backed by
+    `path`, (re)writing the file first unless it was written from the same
+    `checkpoint` (see model_manifest.checkpoint_id). Returns the module
+    unchanged if the checkpoint is unknown or anything goes wrong.
+    """
+    if not ENABLED:
+        return module
+    if checkpoint is None:
+        # Can't tell whether the file on disk holds these weights
+        logger.info("Not memory-mapping %s: unknown source checkpoint", path)
+        return module
+
+    try:
+        if _file_checkpoint(path) != checkpoint:
+            # Workers booting together must all map the same file (same inode),
+            # so only one of them writes it
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(f"{path}.lock", "w") as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                if _file_checkpoint(path) != checkpoint:
+                    save_shared(path, module, checkpoint)
+                    print(f"✅ Saved shareable weights to {path}")
+
+        state, _ = mmap_state_dict(path)
+        with torch.no_grad():
+            module.load_state_dict(state, strict=True, assign=True)
+        for p in module.parameters():
+            p.requires_grad_(False)
+    except Exception as e:
+        logger.warning("Could not memory-map weights from %s: %s", path, e)
+
+    return module
+
+
+# ============================================
+# 🔥 MEMORY ACCOUNTING
+# ============================================
+def process_memory(pid="self"):
+    """
+    RSS split for one process, in MiB, from /proc/<pid>/smaps_rollup:
+    `unique` (private pages — what this worker alone costs), `shared`
+    (pages also mapped by other processes) and `pss` (proportional share).
+    """
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].endswith(":") and parts[1].isdigit():
+                fields[parts[0][:-1]] = int(parts[1]) / 1024.0
+
+    return {
+        "rss": round(fields.get("Rss", 0.0), 1),
+        "pss": round(fields.get("Pss", 0.0), 1),
+        "unique": round(fields.get("Private_Clean", 0.0) + fields.get("Private_Dirty", 0.0), 1),
+        "shared": round(fields.get("Shared_Clean", 0.0) + fields.get("Shared_Dirty", 0.0), 1),
+    }
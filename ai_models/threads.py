@@ -0,0 +1,162 @@
+# ai_models/threads.py
+import json
+import logging
+import os
+import threading
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# ============================================
+# 🔥 SETTINGS
+# ============================================
+# Every process's torch defaults to one intra-op thread per core; with
+# several gunicorn workers (and parallel pipeline stages inside each) the
+# CPU ends up oversubscribed. The budget splits the cores between them.
+INTRA_OP = int(os.getenv("SAFENET_TORCH_THREADS", "0"))               # 0 = from the budget
+INTER_OP = int(os.getenv("SAFENET_TORCH_INTEROP_THREADS", "1"))
+# Pin each gunicorn worker to its own slice of cores
+AFFINITY = os.getenv("SAFENET_CPU_AFFINITY", "0").lower() in ("1", "true", "yes")
+# Written by `manage.py autotune_threads`, used when it matches this host
+CONFIG_FILE = "thread_config.json"
+
+_lock = threading.Lock()
+_applied = {}
+
+
+def available_cores():
+    """Cores this process may use: its affinity mask, capped by a cgroup CPU quota."""
+    try:
+        cores = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cores = os.cpu_count() or 1
+
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            cores = min(cores, max(1, int(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return cores
+
+
+def worker_count():
+    return max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+
+
+def config_path():
+    return os.getenv("SAFENET_THREAD_CONFIG") or os.path.join(settings.SAFENET_STATE_DIR, CONFIG_FILE)
+
+
+def read_config():
+    try:
+        with open(config_path()) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_config(config):
+    path = config_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(config, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def plan(workers=None, concurrency=1, cores=None):
+    """
+    Thread settings for one process out of `workers` on this host, each
+    running up to `concurrency` forward passes at once. An autotuned config
+    for the same workers/cores/concurrency wins over the even split;
+    SAFENET_TORCH_THREADS wins over both.
+    """
+    workers = workers or worker_count()
+    cores = cores or available_cores()
+    per_worker = max(1, cores // workers)
+
+    result = {
+        "workers": workers,
+        "cores": cores,
+        "intra_op": max(1, per_worker // max(1, concurrency)),
+        "inter_op": max(1, INTER_OP),
+        "batch_size": None,
+        "source": "budget",
+    }
+
+    config = read_config()
+    if (config and config.get("workers") == workers and config.get("cores") == cores
+            and config.get("concurrency", 1) == concurrency):
+        result.update(intra_op=config["intra_op"], batch_size=config.get("batch_size"), source=config_path())
+
+    if INTRA_OP:
+        result.update(intra_op=INTRA_OP, source="SAFENET_TORCH_THREADS")
+    return result
+
+
+def _cpu_slice(slot, workers):
+    cpus = sorted(os.sched_getaffinity(0))
+    size = max(1, len(cpus) // workers)
+    start = (slot % workers) * size
+    return cpus[start:start + size] or cpus
+
+
+def apply(workers=None, concurrency=1, slot=None):
+    """
+    Set torch's intra-/inter-op threads for this process (and, with
+    SAFENET_CPU_AFFINITY and a worker `slot`, pin it to its core slice).
+    Call again after fork; the settings are per process.
+    """
+    import torch
+    from ai_models import batch_inference
+
+    settings = plan(workers, concurrency)
+
+    with _lock:
+        if AFFINITY and slot is not None and hasattr(os, "sched_setaffinity"):
+            cpus = _cpu_slice(slot, settings["workers"])
+            os.sched_setaffinity(0, cpus)
+            settings["cpus"] = cpus
+
+        torch.set_num_threads(settings["intra_op"])
+        try:
+            torch.set_num_interop_threads(settings["inter_op"])
+        except RuntimeError:
+            # Only settable before the first inter-op work in this process
+            settings["inter_op"] = torch.get_num_interop_threads()
+
+        if settings["batch_size"] and "SAFENET_BATCH_SIZE" not in os.environ:
+            batch_inference.BATCH_SIZE = settings["batch_size"]
+
+        _applied.clear()
+        _applied.update(settings, pid=os.getpid())
+
+    logger.info("Torch threads: %d intra-op, %d inter-op (%s)",
+                settings["intra_op"], settings["inter_op"], settings["source"])
+    return settings
+
+
+def ensure_applied():
+    """
+    apply() once per process unless something already did (the gunicorn
+    hooks do); runserver, management commands and other servers get the
+    same per-stage split of the cores.
+    """
+    if _applied.get("pid") != os.getpid():
+        from moderation import pipeline
+
+        apply(concurrency=pipeline.model_concurrency())
+
+
+def intra_op_threads():
+    """Threads other runtimes (ONNX Runtime) should use for one forward pass."""
+    ensure_applied()
+    return _applied["intra_op"]
+
+
+def stats():
+    with _lock:
+        return dict(_applied)
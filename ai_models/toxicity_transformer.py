@@ -1,43 +1,45 @@
-import os
 import torch
-from transformers import AutoTokenizer, AutoModelForSequenceClassification
-from ai_models.hf_settings import HF_TOKEN, repo
+from ai_models.model_manifest import MODELS
+from ai_models.model_loader import load_classifier
+from ai_models.registry import registry
+from ai_models.batch_inference import predict_proba_batch
+from ai_models.micro_batcher import run_batched
 
-LOCAL_DIR = os.path.join(os.path.dirname(__file__), "saved_toxicity_transformer_best")
-HF_REPO = repo("toxicity-transformer-best")
+LOCAL_DIR = MODELS["toxicity"]["local_dir"]
+HF_REPO = MODELS["toxicity"]["repo"]
 
-_tokenizer = None
-_model = None
 
+def _load(precision):
+    return load_classifier("Toxicity", HF_REPO, LOCAL_DIR, precision=precision)
 
-def load_toxicity_model():
-    global _tokenizer, _model
 
-    if _tokenizer and _model:
-        return _tokenizer, _model
+registry.register("toxicity", _load)
 
-    try:
-        print("Loading Toxicity Model from HuggingFace…")
-        _tokenizer = AutoTokenizer.from_pretrained(HF_REPO, use_auth_token=HF_TOKEN)
-        _model = AutoModelForSequenceClassification.from_pretrained(HF_REPO, use_auth_token=HF_TOKEN)
-    except Exception:
-        print("⚠ HF download failed — using LOCAL model.")
-        _tokenizer = AutoTokenizer.from_pretrained(LOCAL_DIR, local_files_only=True)
-        _model = AutoModelForSequenceClassification.from_pretrained(LOCAL_DIR, local_files_only=True)
 
-    _model.eval()
-    return _tokenizer, _model
+def load_toxicity_model(precision=None):
+    """precision: "fp32", "int8" or "bf16" (default: SAFENET_PRECISION)."""
+    return registry.get("toxicity", precision)
 
 
 def predict_toxicity(text):
-    tokenizer, model = load_toxicity_model()
+    return predict_toxicity_batch([text])[0]
+
 
-    enc = tokenizer(text, return_tensors="pt", truncation=True, padding=True, max_length=256)
+def predict_toxicity_batch(texts, features=None):
+    """
+    Score many texts in one padded forward pass. Returns [(label, confidence), ...].
+    `features`: optional pre-tokenized inputs (batch_inference.tokenize) for the texts.
+    """
+    return run_batched("toxicity", _predict_toxicity_batch, texts, features)
 
-    with torch.no_grad():
-        logits = model(**enc).logits
 
-    probs = torch.softmax(logits, dim=1)[0]
-    label = torch.argmax(probs).item()
+def _predict_toxicity_batch(texts, features=None):
+    tokenizer, model = load_toxicity_model()
+
+    probs = predict_proba_batch(tokenizer, model, texts, features=features)
+    labels = torch.argmax(probs, dim=1)
 
-    return label, float(probs[label].item())
+    return [
+        (label, float(probs[i, label].item()))
+        for i, label in enumerate(labels.tolist())
+    ]
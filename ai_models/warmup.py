@@ -0,0 +1,142 @@
+# ai_models/warmup.py
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# ============================================
+# 🔥 SETTINGS
+# ============================================
+# Token lengths the warmup forwards are run at (short comment → max length)
+WARMUP_LENGTHS = [int(x) for x in os.getenv("SAFENET_WARMUP_LENGTHS", "16,64,256").split(",") if x.strip()]
+WARMUP_BATCH_SIZES = (1, 8)
+
+_lock = threading.Lock()
+_status = {
+    "state": "cold",        # cold → loading → ready | failed
+    "loaded_in_pid": None,
+    "load_seconds": {},
+    "warmup_ms": {},
+    "error": None,
+}
+
+
+def _classifiers():
+    from ai_models import transformer_spam, toxicity_transformer, phishing_transformer, drug_transformer
+
+    # Call the unbatched scorers directly so no micro-batcher thread starts in the master
+    return {
+        "spam": (transformer_spam.load_spam_model, transformer_spam._predict_spam_batch),
+        "toxicity": (toxicity_transformer.load_toxicity_model, toxicity_transformer._predict_toxicity_batch),
+        "phishing": (phishing_transformer.load_phishing_model, phishing_transformer._predict_phishing_transformer_batch),
+        "drug": (drug_transformer.load_drug_model, drug_transformer._predict_drug_transformer_batch),
+    }
+
+
+def _sample_text(n_tokens):
+    return " ".join(["moderation"] * max(1, n_tokens - 2))
+
+
+def warm_up():
+    """
+    Load every classifier, tokenizer and the MiniLM embedder, then run
+    forwards at WARMUP_LENGTHS so the first real comment pays no load or
+    first-call cost. Safe to call more than once (later calls are no-ops).
+    """
+    with _lock:
+        if _status["state"] in ("loading", "ready"):
+            return status()
+        _status["state"] = "loading"
+
+    started = time.perf_counter()
+    try:
+        from ai_models import compiled
+
+        # With a compiled mode, build every bucket's graph before traffic arrives
+        lengths = sorted(set(WARMUP_LENGTHS) | set(compiled.BUCKETS)) if compiled.enabled() else WARMUP_LENGTHS
+
+        for name, (load, predict) in _classifiers().items():
+            t = time.perf_counter()
+            load()
+            _status["load_seconds"][name] = round(time.perf_counter() - t, 3)
+
+            timings = {}
+            for length in lengths:
+                for batch in WARMUP_BATCH_SIZES:
+                    t = time.perf_counter()
+                    predict([_sample_text(length)] * batch)
+                    timings[f"len{length}x{batch}"] = round((time.perf_counter() - t) * 1000, 1)
+            _status["warmup_ms"][name] = timings
+
+        t = time.perf_counter()
+        from ai_models import embedder, pinecone_utils, drug_embeddings
+        embedder.get_model()
+        drug_embeddings.get_classifier()
+        _status["load_seconds"]["embedder"] = round(time.perf_counter() - t, 3)
+
+        t = time.perf_counter()
+        pinecone_utils.get_embeddings([_sample_text(n) for n in WARMUP_LENGTHS])
+        drug_embeddings.cheap_drug_scores([_sample_text(16)])
+        _status["warmup_ms"]["embedder"] = {"all_lengths": round((time.perf_counter() - t) * 1000, 1)}
+
+        _status["state"] = "ready"
+    except Exception as e:
+        logger.exception("model warmup failed")
+        _status["state"] = "failed"
+        _status["error"] = str(e)
+
+    _status["loaded_in_pid"] = os.getpid()
+    _status["load_seconds"]["total"] = round(time.perf_counter() - started, 3)
+    logger.info("Model warmup %s in %.1fs", _status["state"], _status["load_seconds"]["total"])
+    return status()
+
+
+def warm_up_in_background():
+    """
+    Start warm_up() in a thread if nothing has in this process: without
+    gunicorn's preload (SAFENET_PRELOAD=0, runserver) nobody else does.
+    """
+    with _lock:
+        if _status["state"] != "cold":
+            return
+    threading.Thread(target=warm_up, name="safenet-warmup", daemon=True).start()
+
+
+def after_fork():
+    """
+    Re-create network clients in a freshly forked worker: connection pools
+    opened in the master must not be shared between processes. Models and
+    tokenizers stay shared (copy-on-write).
+    """
+    from ai_models import pinecone_utils, drug_embeddings
+
+    # Both reconnect lazily on first use in this worker
+    pinecone_utils.reset_index()
+    drug_embeddings.reset_index()
+
+
+def status():
+    """Load state and warmup timings (served by the readiness endpoint)."""
+    from ai_models.registry import registry
+
+    return {
+        **_status,
+        "load_seconds": dict(_status["load_seconds"]),
+        "warmup_ms": dict(_status["warmup_ms"]),
+        "loaded_mb": registry.stats()["loaded_mb"],
+        "pid": os.getpid(),
+        "preloaded": _status["loaded_in_pid"] is not None and _status["loaded_in_pid"] != os.getpid(),
+    }
+
+
+def is_ready():
+    """Warmed up, or every model has been loaded by traffic (an eviction since then still counts)."""
+    if _status["state"] == "ready":
+        return True
+    from ai_models.model_manifest import MODELS
+    from ai_models.registry import registry
+
+    models = registry.stats()["models"]
+    return all(models.get(name, {}).get("loads") for name in MODELS)
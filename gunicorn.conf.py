@@ -0,0 +1,68 @@
+# gunicorn.conf.py
+#
+# Warm boot: the Django app, every model, tokenizer and the embedder are
+# loaded once in the master before it forks, so workers start ready and
+# share the weights copy-on-write instead of each loading its own copy.
+import gc
+import os
+
+# Forking after the Rust tokenizers have used their thread pool can deadlock
+os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "safenet.settings")
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", "2"))
+preload_app = os.environ.get("SAFENET_PRELOAD", "1").lower() in ("1", "true", "yes")
+# Loading the models can take longer than the default 30s on a cold disk
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "120"))
+accesslog = "-"
+errorlog = "-"
+
+
+def _apply_thread_budget(slot=None):
+    # Split the cores between the workers and the model stages each one
+    # runs concurrently (see ai_models/threads.py)
+    from ai_models import threads
+    from moderation import pipeline
+
+    return threads.apply(workers=workers, concurrency=pipeline.model_concurrency(), slot=slot)
+
+
+def when_ready(server):
+    # Runs in the master after the app is imported and before any worker forks
+    if not preload_app:
+        return
+
+    from ai_models import warmup
+
+    _apply_thread_budget()
+
+    status = warmup.warm_up()
+    server.log.info("Model warmup %s: %s", status["state"], status["load_seconds"])
+
+    # Move everything loaded so far into a permanent generation: the
+    # collector then never touches (and so never dirties) those pages,
+    # which keeps them shared between the forked workers
+    gc.collect()
+    gc.freeze()
+
+
+def pre_fork(server, worker):
+    # Runs in the master. A replacement worker takes the slot (core slice) of
+    # the one it replaces: the lowest slot no live worker holds. worker.age
+    # keeps growing across restarts, so it would land on a sibling's cores.
+    taken = {getattr(w, "safenet_slot", None) for w in server.WORKERS.values()}
+    worker.safenet_slot = next(slot for slot in range(workers + len(taken)) if slot not in taken)
+
+
+def post_fork(server, worker):
+    # Thread counts and CPU affinity are per process
+    settings = _apply_thread_budget(slot=worker.safenet_slot)
+    server.log.info("Worker %s torch threads: %s", worker.pid, settings)
+
+    if not preload_app:
+        return
+
+    from ai_models import warmup
+
+    warmup.after_fork()
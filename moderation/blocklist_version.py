@@ -0,0 +1,39 @@
+# moderation/blocklist_version.py
+import os
+import time
+
+from django.conf import settings
+
+VERSION_FILE = "blocklist.version"
+
+_cached = {"mtime": None, "version": "0"}
+
+
+def _path():
+    return os.path.join(settings.SAFENET_STATE_DIR, VERSION_FILE)
+
+
+def current_version():
+    """
+    Version stamp of the slang/blocklist, shared by every worker on the host.
+    Costs one stat() per call; the file is only re-read when it changes.
+    """
+    try:
+        mtime = os.stat(_path()).st_mtime_ns
+    except FileNotFoundError:
+        return "0"
+
+    if mtime != _cached["mtime"]:
+        with open(_path()) as f:
+            _cached["version"] = f.read().strip() or "0"
+        _cached["mtime"] = mtime
+
+    return _cached["version"]
+
+
+def bump_version():
+    """Call after any blocklist add/delete so cached verdicts are re-scored."""
+    tmp = f"{_path()}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        f.write(str(time.time_ns()))
+    os.replace(tmp, _path())
@@ -0,0 +1,60 @@
+# moderation/cascade.py
+import os
+import re
+import threading
+
+# ============================================
+# 🔥 SETTINGS
+# ============================================
+# Off by default: the cheap tier only sees drug signals (keywords, sale
+# language, the MiniLM logistic head), so turning it on trades some
+# spam/toxicity/phishing recall for CPU on clearly benign traffic.
+ENABLED = os.getenv("SAFENET_CASCADE", "0").lower() in ("1", "true", "yes")
+SAFE_BELOW = float(os.getenv("SAFENET_CASCADE_SAFE_BELOW", "0.10"))
+UNSAFE_ABOVE = float(os.getenv("SAFENET_CASCADE_UNSAFE_ABOVE", "0.90"))
+
+# The cheap tier cannot judge links — always escalate them to the phishing model
+LINK_RE = re.compile(r"(https?://|www\.|\b[\w.-]+\.(com|net|org|io|ru|xyz|ly)\b|@\w+\.\w+)", re.I)
+
+_lock = threading.Lock()
+_counters = {"total": 0, "cheap_safe": 0, "cheap_unsafe": 0, "escalated": 0}
+
+
+def triage(texts, embeddings=None):
+    """
+    Run the cheap tier over `texts` (with their MiniLM embeddings, if known).
+    Returns a list of (decision, score) where decision is "safe", "unsafe"
+    or None (ambiguous — escalate to the transformers).
+    """
+    from ai_models.drug_embeddings import cheap_drug_scores
+
+    scores = cheap_drug_scores(texts, embeddings)
+    decisions = []
+    for text, score in zip(texts, scores):
+        if score >= UNSAFE_ABOVE:
+            decision = "unsafe"
+        elif score < SAFE_BELOW and not LINK_RE.search(text):
+            decision = "safe"
+        else:
+            decision = None
+        decisions.append((decision, score))
+
+    with _lock:
+        _counters["total"] += len(decisions)
+        for decision, _ in decisions:
+            key = {"safe": "cheap_safe", "unsafe": "cheap_unsafe"}.get(decision, "escalated")
+            _counters[key] += 1
+
+    return decisions
+
+
+def stats():
+    with _lock:
+        total = _counters["total"]
+        return {
+            "enabled": ENABLED,
+            "safe_below": SAFE_BELOW,
+            "unsafe_above": UNSAFE_ABOVE,
+            **_counters,
+            "escalation_rate": (_counters["escalated"] / total) if total else 0.0,
+        }
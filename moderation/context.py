@@ -0,0 +1,102 @@
+# moderation/context.py
+import threading
+
+from ai_models import pinecone_utils
+from moderation.verdict_cache import text_key
+
+
+def tokenize(tokenizer, texts):
+    # batch_inference pulls in torch — import it on first use, not with the engine
+    from ai_models.batch_inference import tokenize as batch_tokenize
+    return batch_tokenize(tokenizer, texts)
+
+
+def tokenizer_key(tokenizer):
+    from ai_models.batch_inference import tokenizer_signature
+    return tokenizer_signature(tokenizer)
+
+
+# Model stages run concurrently; the ones sharing a tokenizer wait for
+# whichever tokenizes first instead of repeating the work
+_feature_locks = {}
+_feature_locks_guard = threading.Lock()
+
+
+def _feature_lock(key):
+    with _feature_locks_guard:
+        return _feature_locks.setdefault(key, threading.Lock())
+
+
+class ModerationContext:
+    """
+    Per-comment scratchpad threaded through the engine. Every expensive
+    artifact (embedding, blocklist neighbours, tokenizations, text hash)
+    is computed lazily on first use and then reused for the rest of the
+    request, so each one is produced at most once per comment.
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self.text_clean = text.strip()
+        self._hash = None
+        self._embedding = None
+        self._neighbours = {}
+        self._features = {}
+
+    @property
+    def text_hash(self):
+        if self._hash is None:
+            self._hash = text_key(self.text_clean)
+        return self._hash
+
+    @property
+    def embedding(self):
+        if self._embedding is None:
+            self._embedding = pinecone_utils.get_embedding(self.text_clean)
+        return self._embedding
+
+    def nearest(self, top_k=1, category=None):
+        """Blocklist neighbours for this comment, queried once per (top_k, category)."""
+        key = (top_k, category)
+        if key not in self._neighbours:
+            self._neighbours[key] = pinecone_utils.query_nearest(self.embedding, top_k=top_k, category=category)
+        return self._neighbours[key]
+
+    def check_blocklist(self, threshold, category=None):
+        """Same contract as pinecone_utils.check_text, reusing the cached neighbours."""
+        return pinecone_utils.check_text(
+            self.text_clean, threshold=threshold, category=category,
+            matches=self.nearest(top_k=1, category=category),
+        )
+
+    def features(self, tokenizer):
+        """
+        Unpadded tokenization for this comment, computed once per distinct
+        tokenizer: classifiers whose tokenizers share a vocabulary and
+        settings get the same features.
+        """
+        key = tokenizer_key(tokenizer)
+        if key not in self._features:
+            self._features[key] = tokenize(tokenizer, [self.text_clean])[0]
+        return self._features[key]
+
+
+def prefetch_embeddings(contexts):
+    """Fill in the embeddings of many contexts with one batched encoder call."""
+    missing = [ctx for ctx in contexts if ctx._embedding is None]
+    if not missing:
+        return
+    for ctx, vector in zip(missing, pinecone_utils.get_embeddings([ctx.text_clean for ctx in missing])):
+        ctx._embedding = vector
+
+
+def prefetch_features(contexts, tokenizer):
+    """Tokenize many contexts for one tokenizer in a single call."""
+    key = tokenizer_key(tokenizer)
+    if any(key not in ctx._features for ctx in contexts):
+        with _feature_lock(key):
+            missing = [ctx for ctx in contexts if key not in ctx._features]
+            if missing:
+                for ctx, feats in zip(missing, tokenize(tokenizer, [ctx.text_clean for ctx in missing])):
+                    ctx._features[key] = feats
+    return [ctx._features[key] for ctx in contexts]
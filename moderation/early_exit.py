@@ -0,0 +1,62 @@
+# moderation/early_exit.py
+import os
+import threading
+
+# ============================================
+# 🔥 SETTINGS
+# ============================================
+# Off by default: skipped models report 0.0 in the stored per-model scores
+ENABLED = os.getenv("SAFENET_EARLY_EXIT", "0").lower() in ("1", "true", "yes")
+EWMA_ALPHA = 0.05
+
+# Priors until enough history has been observed (seconds per text, |score - 0.5| * 2)
+_DEFAULT_COST = 0.02
+_DEFAULT_DECISIVENESS = 0.5
+
+_lock = threading.Lock()
+_history = {}
+_skips = {}
+
+
+def record(name, seconds_per_text, scores):
+    """Fold one batch of observations for a model into its running cost/decisiveness."""
+    if not scores:
+        return
+    decisiveness = sum(abs(s - 0.5) * 2 for s in scores) / len(scores)
+
+    with _lock:
+        h = _history.setdefault(name, {"cost": seconds_per_text, "decisiveness": decisiveness, "batches": 0})
+        h["cost"] += EWMA_ALPHA * (seconds_per_text - h["cost"])
+        h["decisiveness"] += EWMA_ALPHA * (decisiveness - h["decisiveness"])
+        h["batches"] += 1
+
+
+def record_skips(skipped):
+    """skipped: iterable of model names skipped for one text."""
+    with _lock:
+        for name in skipped:
+            _skips[name] = _skips.get(name, 0) + 1
+
+
+def model_order(weights):
+    """
+    Models sorted by how much they are expected to tighten the score bound
+    per second of CPU: weight * decisiveness / cost. Heavy, cheap, usually
+    extreme models run first; the rest often never need to run.
+    """
+    with _lock:
+        def priority(name):
+            h = _history.get(name, {})
+            cost = max(h.get("cost", _DEFAULT_COST), 1e-6)
+            return weights[name] * h.get("decisiveness", _DEFAULT_DECISIVENESS) / cost
+
+        return sorted(weights, key=priority, reverse=True)
+
+
+def stats():
+    with _lock:
+        return {
+            "enabled": ENABLED,
+            "models": {name: dict(h) for name, h in _history.items()},
+            "skipped": dict(_skips),
+        }
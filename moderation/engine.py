@@ -1,8 +1,26 @@
-from ai_models.transformer_spam import predict_spam
-from ai_models.toxicity_transformer import predict_toxicity
-from ai_models.drug_transformer import predict_drug_transformer
-from ai_models.phishing_transformer import predict_phishing_transformer
-from ai_models.pinecone_utils import check_text
+import time
+from functools import partial
+
+import numpy as np
+
+from ai_models.micro_batcher import batcher_stats
+from ai_models.model_manifest import MODEL_VERSION
+from ai_models.registry import registry
+from ai_models import embedder, threads
+from moderation.verdict_cache import text_key, verdict_cache, ENABLED as VERDICT_CACHE_ENABLED
+from moderation.verdict_store import verdict_store, ENABLED as VERDICT_STORE_ENABLED
+from moderation.blocklist_version import current_version as blocklist_version
+from moderation import cascade, early_exit, lexical_blocklist, near_duplicates, pipeline, spans
+from moderation.pipeline import Pipeline, Stage
+from moderation.context import ModerationContext, prefetch_embeddings, prefetch_features
+
+# Weighted fusion of model scores into an unsafe score
+FULL_WEIGHTS = {"spam": 0.20, "phishing": 0.25, "toxic": 0.25, "drug": 0.30}
+SHORT_WEIGHTS = {"toxic": 0.40, "drug": 0.60}
+
+UNSAFE_BELOW = 0.35
+REVIEW_BELOW = 0.75
+SHORT_TEXT_LEN = 15
 
 
 def predict_all(text):
@@ -14,158 +32,554 @@ def predict_all(text):
         - Review     : 0.35 <= safe_score < 0.75
         - Safe       : safe_score >= 0.75
     """
+    return predict_all_batch([text])[0]
+
+
+def predict_all_batch(texts):
+    """
+    Batched version of predict_all: returns one result dict per text, in order.
+
+    Each transformer runs once over every text that needs it (one padded
+    forward pass per chunk) instead of once per comment, and the score
+    fusion / labelling is done with vectorized operations over the batch.
+
+    Texts seen recently (same normalized text, same blocklist and model
+    version) are answered from the verdict cache without any inference.
+    """
+    if not VERDICT_CACHE_ENABLED:
+        return _score_batch(texts)
+    tag = verdict_tag()
+    if not near_duplicates.ENABLED:
+        return verdict_cache.get_or_compute_many(texts, tag, _score_batch)
+
+    # Exact repeats are answered here and never reach the near-duplicate
+    # stage, so they are counted toward their campaign separately
+    scored = set()
+
+    def score(batch):
+        scored.update(text_key(t) for t in batch)
+        return _score_batch(batch)
+
+    results = verdict_cache.get_or_compute_many(texts, tag, score)
+    repeats = []
+    for i, text in enumerate(texts):
+        key = text_key(text)
+        if key in scored:
+            scored.discard(key)     # the engine counted its first occurrence
+        else:
+            repeats.append(i)
+    near_duplicates.observe([texts[i] for i in repeats], [results[i] for i in repeats], tag)
+    return results
+
+
+def verdict_tag():
+    """Everything a cached verdict depends on besides the text itself."""
+    return f"blocklist={blocklist_version()}|model={model_tag()}"
+
+
+def model_tag():
+    from ai_models.batch_inference import window_tag
+    from ai_models.onnx_backend import active_backend
+    from ai_models.precision import resolve_precision
+    return f"{MODEL_VERSION}/{active_backend()}/{resolve_precision()}/{window_tag()}"
+
+
+def _score_batch(texts):
+    # One context per comment: embedding, neighbours, tokenizations and the
+    # text hash are computed at most once each and shared by every stage
+    contexts = [ModerationContext(t) for t in texts]
+    texts_clean = [ctx.text_clean for ctx in contexts]
+    n = len(texts_clean)
+    results = [None] * n
+    copies = set()      # texts that take a near-duplicate's verdict
+    pinned = ["minilm"]  # registry entries held loaded for this run
+    short = np.array([len(t) < SHORT_TEXT_LEN for t in texts_clean], dtype=bool)
+
+    # ----------------------------------------------------------------------
+    # Stage graph. Stages only write results[i] for texts they decide, and
+    # the classifiers depend on the cheap lexical check alone, so with the
+    # pipeline on they run concurrently with each other and with the
+    # embedding + blocklist queries. (A text the blocklist bans meanwhile
+    # keeps its blocklist verdict; its model scores are dropped.)
+    # ----------------------------------------------------------------------
+    stages = [
+        Stage("lexical", lambda: _lexical_stage(texts_clean, results)),
+        Stage("blocklist", lambda _: _blocklist_stage(contexts, results, short), deps=["lexical"]),
+    ]
+    gate = "lexical"
+    if cascade.ENABLED:
+        # The cheap tier exists to skip transformers, so they wait for it
+        stages.append(Stage("cascade", lambda _: _cascade_stage(contexts, results), deps=["blocklist"]))
+        gate = "cascade"
+    if near_duplicates.ENABLED:
+        # Needs only the text, so it overlaps the blocklist queries unless the cascade runs
+        stages.append(Stage("near_duplicates", lambda _: _near_duplicate_stage(contexts, results, copies), deps=[gate]))
+        gate = "near_duplicates"
+    stages.append(Stage("route", lambda _: _route_stage(results, copies, short, pinned), deps=[gate]))
+
+    if early_exit.ENABLED:
+        # Early exit decides model by model, so the models run in sequence
+        stages.append(Stage("models", lambda pending: _early_exit_stage(contexts, pending, short), deps=["route"]))
+    else:
+        for name in FULL_WEIGHTS:
+            stages.append(Stage(name, partial(_model_stage, name, contexts, short), deps=["route"], fallback=None))
+
+    # Keep what this request uses loaded while its stages are in flight: with
+    # a memory budget, one model's load would otherwise evict another mid-run
+    # (the route stage adds the classifiers it sends texts to)
+    registry.pin(pinned)
+    try:
+        run = Pipeline(stages).run()
+    finally:
+        registry.unpin(pinned)
+    lexical_hits = run["lexical"].value
+
+    # ----------------------------------------------------------------------
+    # 3) VECTORIZED FUSION + LABELS
+    # ----------------------------------------------------------------------
+    scored = np.flatnonzero(run["route"].value & np.array([r is None for r in results], dtype=bool))
+
+    scores = {name: np.zeros(n) for name in FULL_WEIGHTS}
+    ran = {name: np.zeros(n, dtype=bool) for name in FULL_WEIGHTS}
+    timed_out = []
+    if early_exit.ENABLED:
+        scores, ran = run["models"].value
+    else:
+        for name in FULL_WEIGHTS:
+            stage = run[name]
+            if stage.status == "failed":
+                raise stage.error
+            if stage.status == "timed_out":
+                timed_out.append(name)
+                continue
+            idx, model_scores = stage.value
+            scores[name][idx] = model_scores
+            ran[name][idx] = True
+
+    full_unsafe = sum(scores[name] * w for name, w in FULL_WEIGHTS.items())
+    short_unsafe = sum(scores[name] * w for name, w in SHORT_WEIGHTS.items())
+    safe_scores = 1 - np.where(short, short_unsafe, full_unsafe)
+    labels = _labels(safe_scores)
+
+    for i in scored:
+        applicable = SHORT_WEIGHTS if short[i] else FULL_WEIGHTS
+        skipped = [name for name in FULL_WEIGHTS if not ran[name][i] and name not in timed_out]
+        if early_exit.ENABLED:
+            early_exit.record_skips(name for name in skipped if name in applicable)
+        if short[i]:
+            results[i] = _short_result(scores, i, safe_scores[i], labels[i], skipped)
+        else:
+            results[i] = _full_result(scores, i, safe_scores[i], labels[i], skipped)
+
+        missing = [name for name in timed_out if name in applicable]
+        if missing:
+            _mark_timed_out(results[i], missing)
+
+    if near_duplicates.ENABLED and run["near_duplicates"].value:
+        near_duplicates.settle(run["near_duplicates"].value, results)
 
-    text_clean = text.strip()
+    # Near-exact lexical hits are too fuzzy to ban on, but moderators should see them
+    for i, hit in enumerate(lexical_hits):
+        if hit and hit[1] == "near":
+            results[i]["reasons"].append(f"Possible obfuscated blocklisted term: '{hit[0]}'")
 
+    return results
+
+
+# ----------------------------------------------------------------------
+# Stages
+# ----------------------------------------------------------------------
+def _lexical_stage(texts_clean, results):
+    """0a) LEXICAL BLOCKLIST — normalized exact hits ban without any embedding."""
+    lexical_hits = [None] * len(texts_clean)
+    if lexical_blocklist.ENABLED:
+        try:
+            lexical_hits = lexical_blocklist.find_many(texts_clean)
+        except Exception as e:
+            print("Lexical blocklist error:", e)
+
+    for i, hit in enumerate(lexical_hits):
+        if hit and hit[1] == "exact":
+            print("\n🚨 LEXICAL BLOCKLIST MATCH — AUTO BAN")
+            print(f"Matched: {hit[0]}\n")
+            results[i] = _blocklist_result(hit[0], phishing=1.0)
+    return lexical_hits
+
+
+def _blocklist_stage(contexts, results, short):
     # ----------------------------------------------------------------------
-    # 0) STRICT BLOCKLIST CHECK (Pinecone)
+    # 0b) STRICT BLOCKLIST CHECK (Pinecone)
     # ----------------------------------------------------------------------
     try:
-        is_match, similarity, matched_text = check_text(text_clean, threshold=0.80)
+        prefetch_embeddings([ctx for ctx, r in zip(contexts, results) if r is None])
     except Exception as e:
-        print("Pinecone error:", e)
-        is_match, similarity, matched_text = False, 0.0, None
-
-    # Strong match threshold for banning
-    if is_match and matched_text and similarity >= 0.95:
-        print("\n🚨 STRICT BLOCKLIST MATCH — AUTO BAN")
-        print(f"Matched: {matched_text} (sim={similarity:.2f})\n")
-
-        return {
-            "spam": 0.0,
-            "toxic": 0.0,
-            "phishing": 1.0,
-            "drug": 0.0,
-            "safe_score": 0.0,
-            "final_label": "unsafe",
-            "reasons": [f"Blocklisted term detected: '{matched_text}'"],
-            "safe": False,
-        }
+        print("Embedding error:", e)
+
+    for i, ctx in enumerate(contexts):
+        if results[i] is not None:
+            continue
+        try:
+            is_match, similarity, matched_text = ctx.check_blocklist(threshold=0.80)
+        except Exception as e:
+            print("Pinecone error:", e)
+            is_match, similarity, matched_text = False, 0.0, None
+
+        # Strong match threshold for banning
+        if is_match and matched_text and similarity >= 0.95:
+            print("\n🚨 STRICT BLOCKLIST MATCH — AUTO BAN")
+            print(f"Matched: {matched_text} (sim={similarity:.2f})\n")
+            results[i] = _blocklist_result(matched_text, phishing=1.0)
+
+    # ----------------------------------------------------------------------
+    # 0c) SPAN CHECK — blocklisted words inside longer comments, which the
+    #     whole-comment embedding dilutes (optional)
+    # ----------------------------------------------------------------------
+    if spans.ENABLED:
+        long_texts = [i for i, r in enumerate(results) if r is None and not short[i]]
+        try:
+            span_hits = spans.find_blocklisted_spans([contexts[i] for i in long_texts], threshold=0.95)
+        except Exception as e:
+            print("Span check error:", e)
+            span_hits = [None] * len(long_texts)
+
+        for i, hit in zip(long_texts, span_hits):
+            if hit and hit[2]:
+                span, similarity, matched_text = hit
+                print("\n🚨 BLOCKLISTED SPAN MATCH — AUTO BAN")
+                print(f"Matched: {matched_text} in '{span}' (sim={similarity:.2f})\n")
+                results[i] = _blocklist_result(matched_text, phishing=1.0)
 
     # ----------------------------------------------------------------------
     # 1) SHORT TEXT RULE – ONLY TOXICITY & DRUG (under 15 chars)
     # ----------------------------------------------------------------------
-    if len(text_clean) < 15:
+    for i in np.flatnonzero(short):
+        if results[i] is not None:
+            continue
+
         print("\n⚠️ SHORT TEXT — LIMITED ANALYSIS (Toxicity + Drug Only)\n")
 
         # Re-check Pinecone with a slightly lower threshold on short text
+        # (same neighbours as above — no second embedding or query)
         try:
-            short_match, sim2, short_matched = check_text(text_clean, threshold=0.75)
+            short_match, sim2, short_matched = contexts[i].check_blocklist(threshold=0.75)
         except:
             short_match = False
 
         if short_match:
             print("\n🚨 SHORT TEXT BLOCKLIST MATCH — AUTO BAN\n")
-            return {
-                "spam": 0.0,
-                "toxic": 0.0,
-                "phishing": 0.0,
-                "drug": 1.0,
-                "safe_score": 0.0,
-                "final_label": "unsafe",
-                "reasons": [f"Blocklisted term detected: '{short_matched}'"],
-                "safe": False,
-            }
-
-        # Toxicity
-        tox_res = predict_toxicity(text_clean)
-        if isinstance(tox_res, dict):
-            toxic = float(tox_res.get("toxic", 0.0))
-        else:
-            t_label, t_conf = tox_res
-            toxic = float(t_conf) if t_label == 1 else (1 - float(t_conf))
+            results[i] = _blocklist_result(short_matched, drug=1.0)
 
-        # Drug
-        try:
-            drug = float(predict_drug_transformer(text_clean).get("drug", 0.0))
-        except:
-            drug = 0.0
 
-        # Scoring for short messages
-        unsafe_score = (toxic * 0.40) + (drug * 0.60)
-        safe_score = 1 - unsafe_score
+def _cascade_stage(contexts, results):
+    """1b) CHEAP TIER — keywords + embedding logistic head (optional cascade)."""
+    undecided = [i for i, r in enumerate(results) if r is None]
+    if not undecided:
+        return
+    try:
+        decisions = cascade.triage(
+            [contexts[i].text_clean for i in undecided],
+            [contexts[i].embedding for i in undecided],
+        )
+    except Exception as e:
+        print("Cascade error:", e)
+        decisions = [(None, 0.0)] * len(undecided)
 
-        # --- Apply Universal Rules (Same as full text) ---
-        if safe_score < 0.35:
-            final_label = "unsafe"
-        elif safe_score < 0.75:
-            final_label = "review"
-        else:
-            final_label = "safe"
-
-        reasons = ["Short text: spam/phishing skipped"]
-        if drug > 0.7:
-            reasons.append(f"High drug content ({drug:.2f})")
-        if toxic > 0.7:
-            reasons.append(f"High toxicity ({toxic:.2f})")
-
-        print("\n=== DEBUG (SHORT TEXT) ===")
-        print("Toxic:", toxic)
-        print("Drug:", drug)
-        print("Safe Score:", safe_score)
-        print("==========================\n")
-
-        return {
-            "spam": 0.0,
-            "toxic": toxic,
-            "phishing": 0.0,
-            "drug": drug,
-            "safe_score": safe_score,
-            "final_label": final_label,
-            "reasons": reasons,
-            "safe": final_label == "safe",
-        }
+    for i, (decision, cheap_score) in zip(undecided, decisions):
+        if decision:
+            results[i] = _cheap_result(decision, cheap_score)
+
+
+def _route_stage(results, copies, short, pinned):
+    """Texts the models still have to score; pins the models they need."""
+    pending = np.array([r is None and i not in copies for i, r in enumerate(results)], dtype=bool)
+    needed = set()
+    if pending.any():
+        needed.update(SHORT_WEIGHTS)
+        if (pending & ~short).any():
+            needed.update(FULL_WEIGHTS)
+    names = [REGISTRY_NAMES[name] for name in FULL_WEIGHTS if name in needed]
+    registry.pin(names)
+    pinned.extend(names)
+    return pending
+
+
+def _near_duplicate_stage(contexts, results, copies):
+    """1c) NEAR-DUPLICATES — copies of a recently scored comment reuse its verdict."""
+    pending = [i for i, r in enumerate(results) if r is None]
+    try:
+        batch = near_duplicates.lookup([contexts[i].text_clean for i in pending], verdict_tag(), pending)
+    except Exception as e:
+        print("Near-duplicate check error:", e)
+        return None
+    copies.update(batch.handled())
+    return batch
+
+
+def _model_stage(name, contexts, short, pending):
+    """2) One batched forward pass of one model over the texts it applies to."""
+    weight = np.where(short, SHORT_WEIGHTS.get(name, 0.0), FULL_WEIGHTS[name])
+    idx = np.flatnonzero(pending & (weight > 0))
+    if not len(idx):
+        return idx, []
+    return idx, _model_scores(name, [contexts[i] for i in idx])
 
+
+def _early_exit_stage(contexts, pending, short):
     # ----------------------------------------------------------------------
-    # 2) FULL PIPELINE FOR NORMAL TEXT
+    # 2) MODEL SCORING WITH EARLY EXIT
+    #
+    # Each model adds weight * score to the unsafe score, so after some
+    # models have run the final safe_score lies in
+    #     [1 - partial - remaining_weight, 1 - partial].
+    # A text stops as soon as both ends of that range give the same label;
+    # the models it did not need are skipped.
     # ----------------------------------------------------------------------
+    n = len(contexts)
+    scores = {name: np.zeros(n) for name in FULL_WEIGHTS}
+    ran = {name: np.zeros(n, dtype=bool) for name in FULL_WEIGHTS}
+    partial = np.zeros(n)
+    remaining = np.where(short, sum(SHORT_WEIGHTS.values()), sum(FULL_WEIGHTS.values()))
+    active = pending.copy()
 
-    # Spam
-    s_label, s_conf = predict_spam(text_clean)
-    try:
-        spam = max(0.0, min(1.0, float(s_conf)))
-    except:
-        spam = 0.0
+    for name in early_exit.model_order(FULL_WEIGHTS):
+        weight = np.where(short, SHORT_WEIGHTS.get(name, 0.0), FULL_WEIGHTS[name])
+        idx = np.flatnonzero(active & (weight > 0))
+        if len(idx):
+            scores[name][idx] = _model_scores(name, [contexts[i] for i in idx])
+            ran[name][idx] = True
+            partial[idx] += weight[idx] * scores[name][idx]
+            remaining[idx] -= weight[idx]
+
+        active &= _labels(1 - partial) != _labels(1 - partial - remaining)
+
+    return scores, ran
 
-    # Toxicity
-    tox_res = predict_toxicity(text_clean)
-    if isinstance(tox_res, dict):
-        toxic = float(tox_res.get("toxic", 0.0))
-    else:
-        t_label, t_conf = tox_res
-        toxic = float(t_conf) if t_label == 1 else (1 - float(t_conf))
 
-    # Phishing
+def engine_stats():
+    """Runtime counters for the moderation engine (served by engine_stats_view)."""
+    from ai_models import compiled
+
+    return {
+        "micro_batching": batcher_stats(),
+        "verdict_cache": verdict_cache.stats(),
+        "verdict_store": verdict_store.stats(),
+        "lexical_blocklist": lexical_blocklist.stats(),
+        "spans": spans.stats(),
+        "cascade": cascade.stats(),
+        "early_exit": early_exit.stats(),
+        "near_duplicates": near_duplicates.stats(),
+        "pipeline": pipeline.stats(),
+        "models": registry.stats(),
+        "embedder": embedder.stats(),
+        "threads": threads.stats(),
+        "compiled": compiled.stats(),
+    }
+
+
+# ----------------------------------------------------------------------
+# Model score helpers
+# ----------------------------------------------------------------------
+def _model_scores(name, contexts):
+    """Scores for one model; phishing/drug failures score 0.0 as before."""
     try:
-        phishing = float(predict_phishing_transformer(text_clean).get("phishing", 0.0))
+        return _stored_scores(name, contexts)
     except:
-        phishing = 0.0
+        if name in FAIL_SAFE_MODELS:
+            return [0.0] * len(contexts)
+        raise
 
-    # Drug
+
+def _stored_scores(name, contexts):
+    """Reuse scores from the on-disk verdict store; run the model only for the rest."""
+    if not VERDICT_STORE_ENABLED:
+        return _infer(name, contexts)
+
+    version = model_tag()
+    hashes = [ctx.text_hash for ctx in contexts]
     try:
-        drug = float(predict_drug_transformer(text_clean).get("drug", 0.0))
-    except:
-        drug = 0.0
-
-    # Weighted unsafe calculation
-    unsafe_score = (
-        (spam * 0.20)
-        + (phishing * 0.25)
-        + (toxic * 0.25)
-        + (drug * 0.30)
+        found = verdict_store.get_many(name, version, hashes)
+    except Exception as e:
+        print("Verdict store error:", e)
+        found = {}
+
+    missing = [i for i, h in enumerate(hashes) if h not in found]
+    if missing:
+        fresh = dict(zip(
+            (hashes[i] for i in missing),
+            _infer(name, [contexts[i] for i in missing]),
+        ))
+        try:
+            verdict_store.put_many(name, version, fresh)
+        except Exception as e:
+            print("Verdict store error:", e)
+        found.update(fresh)
+
+    return [found[h] for h in hashes]
+
+
+def _infer(name, contexts):
+    started = time.perf_counter()
+    model_scores = MODEL_SCORERS[name](contexts)
+    early_exit.record(name, (time.perf_counter() - started) / len(contexts), model_scores)
+    return model_scores
+
+
+def _inputs(contexts, load_model):
+    """Texts plus their (memoized) tokenization for one model's tokenizer."""
+    tokenizer, _ = load_model()
+    return [ctx.text_clean for ctx in contexts], prefetch_features(contexts, tokenizer)
+
+
+# The transformer modules import torch/transformers, so they are imported
+# on first scoring call rather than when Django loads the URLconf.
+def _spam_scores(contexts):
+    from ai_models.transformer_spam import predict_spam_batch, load_spam_model
+
+    spam = []
+    for s_label, s_conf in predict_spam_batch(*_inputs(contexts, load_spam_model)):
+        try:
+            spam.append(max(0.0, min(1.0, float(s_conf))))
+        except:
+            spam.append(0.0)
+    return spam
+
+
+def _toxicity_scores(contexts):
+    from ai_models.toxicity_transformer import predict_toxicity_batch, load_toxicity_model
+
+    toxic = []
+    for tox_res in predict_toxicity_batch(*_inputs(contexts, load_toxicity_model)):
+        if isinstance(tox_res, dict):
+            toxic.append(float(tox_res.get("toxic", 0.0)))
+        else:
+            t_label, t_conf = tox_res
+            toxic.append(float(t_conf) if t_label == 1 else (1 - float(t_conf)))
+    return toxic
+
+
+def _phishing_scores(contexts):
+    from ai_models.phishing_transformer import predict_phishing_transformer_batch, load_phishing_model
+
+    results = predict_phishing_transformer_batch(*_inputs(contexts, load_phishing_model))
+    return [float(r.get("phishing", 0.0)) for r in results]
+
+
+def _drug_scores(contexts):
+    from ai_models.drug_transformer import predict_drug_transformer_batch, load_drug_model
+
+    results = predict_drug_transformer_batch(*_inputs(contexts, load_drug_model))
+    return [float(r.get("drug", 0.0)) for r in results]
+
+
+MODEL_SCORERS = {
+    "spam": _spam_scores,
+    "toxic": _toxicity_scores,
+    "phishing": _phishing_scores,
+    "drug": _drug_scores,
+}
+FAIL_SAFE_MODELS = ("phishing", "drug")
+# Registry entry behind each score
+REGISTRY_NAMES = {"spam": "spam", "toxic": "toxicity", "phishing": "phishing", "drug": "drug"}
+
+
+def _labels(safe_scores):
+    return np.select(
+        [safe_scores < UNSAFE_BELOW, safe_scores < REVIEW_BELOW],
+        ["unsafe", "review"],
+        default="safe",
     )
-    safe_score = 1 - unsafe_score
 
-    # Final label
-    if safe_score < 0.35:
-        final_label = "unsafe"
-    elif safe_score < 0.75:
-        final_label = "review"
-    else:
-        final_label = "safe"
+
+# ----------------------------------------------------------------------
+# Result builders
+# ----------------------------------------------------------------------
+def _blocklist_result(matched_text, phishing=0.0, drug=0.0):
+    return {
+        "spam": 0.0,
+        "toxic": 0.0,
+        "phishing": phishing,
+        "drug": drug,
+        "safe_score": 0.0,
+        "final_label": "unsafe",
+        "reasons": [f"Blocklisted term detected: '{matched_text}'"],
+        "safe": False,
+        "skipped_models": list(FULL_WEIGHTS),
+    }
+
+
+def _cheap_result(decision, cheap_score):
+    # The cascade bands decide the label; safe_score is kept for display
+    safe_score = 1 - cheap_score
+    final_label = decision
+
+    return {
+        "spam": 0.0,
+        "toxic": 0.0,
+        "phishing": 0.0,
+        "drug": cheap_score,
+        "safe_score": safe_score,
+        "final_label": final_label,
+        "reasons": [f"Cheap tier: confidently {decision} ({cheap_score:.2f}), transformers skipped"],
+        "safe": final_label == "safe",
+        "skipped_models": list(FULL_WEIGHTS),
+    }
+
+
+def _mark_timed_out(result, models):
+    # The score is missing those models' weight, so never call it safe
+    result["skipped_models"] = result["skipped_models"] + models
+    result["reasons"].append(f"Timed out: {', '.join(models)} not scored")
+    if result["final_label"] == "safe":
+        result["final_label"] = "review"
+        result["safe"] = False
+
+
+def _short_result(scores, i, safe_score, final_label, skipped):
+    toxic = float(scores["toxic"][i])
+    drug = float(scores["drug"][i])
+    safe_score = float(safe_score)
+    final_label = str(final_label)
+
+    reasons = ["Short text: spam/phishing skipped"]
+    settled_early = [name for name in skipped if name in SHORT_WEIGHTS]
+    if settled_early:
+        reasons.append(f"Score settled early: {', '.join(settled_early)} skipped")
+    if drug > 0.7:
+        reasons.append(f"High drug content ({drug:.2f})")
+    if toxic > 0.7:
+        reasons.append(f"High toxicity ({toxic:.2f})")
+
+    print("\n=== DEBUG (SHORT TEXT) ===")
+    print("Toxic:", toxic)
+    print("Drug:", drug)
+    print("Safe Score:", safe_score)
+    print("==========================\n")
+
+    return {
+        "spam": 0.0,
+        "toxic": toxic,
+        "phishing": 0.0,
+        "drug": drug,
+        "safe_score": safe_score,
+        "final_label": final_label,
+        "reasons": reasons,
+        "safe": final_label == "safe",
+        "skipped_models": skipped,
+    }
+
+
+def _full_result(scores, i, safe_score, final_label, skipped):
+    spam = float(scores["spam"][i])
+    toxic = float(scores["toxic"][i])
+    phishing = float(scores["phishing"][i])
+    drug = float(scores["drug"][i])
+    safe_score = float(safe_score)
+    final_label = str(final_label)
 
     # Build reasons
     reasons = []
+    if skipped:
+        reasons.append(f"Score settled early: {', '.join(skipped)} skipped")
     if spam > 0.7:
         reasons.append(f"High spam ({spam:.2f})")
     if toxic > 0.7:
@@ -192,4 +606,5 @@ def predict_all(text):
         "final_label": final_label,
         "reasons": reasons,
         "safe": final_label == "safe",
+        "skipped_models": skipped,
     }
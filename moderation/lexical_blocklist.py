@@ -0,0 +1,223 @@
+# moderation/lexical_blocklist.py
+import logging
+import os
+import re
+import threading
+import time
+import unicodedata
+
+from moderation.blocklist_version import current_version as blocklist_version
+
+logger = logging.getLogger(__name__)
+
+# ============================================
+# 🔥 SETTINGS
+# ============================================
+ENABLED = os.getenv("SAFENET_LEXICAL_BLOCKLIST", "1").lower() in ("1", "true", "yes")
+# Also report terms one edit away ("cocain", "heroiin") — only for terms of 5+ letters.
+# Near hits are too fuzzy to auto-ban, so they only add a reason to the verdict.
+NEAR_MATCH = os.getenv("SAFENET_LEXICAL_NEAR_MATCH", "1").lower() in ("1", "true", "yes")
+NEAR_MIN_LEN = 5
+# How many adjacent tokens may be glued together to undo spacing tricks ("co caine").
+# Glued runs can also span real words ("the hero in" → "heroin"), so a term
+# found only across tokens is a near hit, never an exact one.
+MAX_JOIN = 4
+RETRY_SECONDS = 60
+
+# ============================================
+# 🔥 NORMALIZATION
+# ============================================
+# Cyrillic / Greek letters that render like Latin ones
+_CONFUSABLES = str.maketrans({
+    "а": "a", "в": "b", "е": "e", "к": "k", "м": "m", "н": "h", "о": "o",
+    "р": "p", "с": "c", "т": "t", "у": "y", "х": "x", "і": "i", "ј": "j", "ѕ": "s",
+    "α": "a", "β": "b", "ε": "e", "ι": "i", "κ": "k", "ν": "v", "ο": "o",
+    "ρ": "p", "τ": "t", "υ": "u", "χ": "x",
+})
+_LEET = str.maketrans({
+    "0": "o", "1": "i", "3": "e", "4": "a", "5": "s", "7": "t", "8": "b",
+})
+# Symbols are ordinary punctuation too ("weed!!", "|weed|"), so they only
+# stand for a letter inside a word ("k!ll"); "@$€" also at the start of one ("$peed")
+_LEET_SYMBOLS = {"@": "a", "$": "s", "!": "i", "|": "l", "€": "e"}
+_LEET_SYMBOL_RE = re.compile(r"(?<=\w)[@$!|€](?=\w)|(?<!\S)[@$€](?=\w)")
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_REPEAT_RE = re.compile(r"(.)\1+")
+_STRETCHED_RE = re.compile(r"(.)\1\1")
+
+
+def _fold(text):
+    # NFKC first (full-width letters, ligatures), then drop accents and
+    # format characters (zero-width spaces / joiners are category Cf)
+    text = unicodedata.normalize("NFKC", text).casefold().translate(_CONFUSABLES)
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in text if unicodedata.category(c) not in ("Mn", "Cf"))
+    text = _LEET_SYMBOL_RE.sub(lambda m: _LEET_SYMBOLS[m.group()], text)
+    return text.translate(_LEET)
+
+
+def _squash(token):
+    """Collapse repeated letters: 'weeeed' and 'weed' both become 'wed'."""
+    return _REPEAT_RE.sub(r"\1", token)
+
+
+def tokens(text):
+    """Normalized word tokens; runs of single letters ('w e e d') are joined."""
+    out, letters = [], []
+    for tok in _TOKEN_RE.findall(_fold(text)):
+        if len(tok) == 1:
+            letters.append(tok)
+            continue
+        if len(letters) > 1:
+            out.append("".join(letters))
+        elif letters:
+            out.append(letters[0])
+        letters = []
+        out.append(tok)
+    if len(letters) > 1:
+        out.append("".join(letters))
+    elif letters:
+        out.append(letters[0])
+    return out
+
+
+def skeleton(text):
+    """Canonical form used as the lookup key for a blocklist term."""
+    return "".join(tokens(text))
+
+
+def _deletes(key):
+    return {key[:i] + key[i + 1:] for i in range(len(key))}
+
+
+# ============================================
+# 🔥 MATCHER
+# ============================================
+class LexicalBlocklist:
+    """
+    Hash-set matcher over normalized skeletons of blocklist terms.
+
+    Every token of a comment is looked up after normalization, which
+    catches leetspeak, accents, look-alike letters, zero-width characters
+    and spaced-out letters ("w e e d", joined by tokens()); those are exact
+    hits. Runs of 2..MAX_JOIN adjacent tokens are glued together and looked
+    up as well ("co caine"), but only reported as near hits, since ordinary
+    words glue into terms too ("hero in", "me th"). Runs that contain
+    a letter repeated 3+ times are also compared with repeats collapsed
+    ("weeeed" → "weed", while "wed" stays clean). With NEAR_MATCH, longer
+    terms are also indexed by their single-character deletions (SymSpell
+    style) so one typo, insertion or deletion is reported as a near hit.
+    """
+
+    def __init__(self, terms=()):
+        self.exact = {}
+        self.stretched = {}
+        self.near = {}
+        self.max_len = 0
+        for term in terms:
+            key = skeleton(term)
+            if len(key) < 2:
+                continue
+            self.exact.setdefault(key, term)
+            self.stretched.setdefault(_squash(key), term)
+            self.max_len = max(self.max_len, len(key))
+            if NEAR_MATCH and len(key) >= NEAR_MIN_LEN:
+                for d in _deletes(key):
+                    self.near.setdefault(d, term)
+
+    def __len__(self):
+        return len(self.exact)
+
+    def find(self, text):
+        """First hit as (term, kind) with kind "exact" or "near", else None."""
+        if not self.exact:
+            return None
+
+        toks = tokens(text)
+        near_hit = None
+        for i in range(len(toks)):
+            joined = ""
+            for j in range(i, min(i + MAX_JOIN, len(toks))):
+                joined += toks[j]
+                if len(joined) > 2 * self.max_len:
+                    break
+                key = joined
+                term = self.exact.get(key)
+                if term is None and _STRETCHED_RE.search(key):
+                    key = _squash(key)
+                    term = self.stretched.get(key)
+                if term is not None:
+                    if j == i:
+                        return term, "exact"
+                    if near_hit is None:
+                        near_hit = (term, "near")
+                    continue
+
+                if near_hit is None and self.near and NEAR_MIN_LEN <= len(key) <= self.max_len + 1:
+                    term = self.near.get(key)
+                    if term is None:
+                        deletes = _deletes(key)
+                        term = next((self.near[d] for d in deletes if d in self.near), None)
+                        if term is None:
+                            term = next((self.exact[d] for d in deletes if d in self.exact), None)
+                    if term is not None:
+                        near_hit = (term, "near")
+
+        return near_hit
+
+
+# ============================================
+# 🔥 SHARED INSTANCE (rebuilt on blocklist version change)
+# ============================================
+_lock = threading.Lock()
+_state = {"matcher": LexicalBlocklist(), "version": None, "retry_at": 0.0}
+_counters = {"checked": 0, "exact_hits": 0, "near_hits": 0}
+
+
+def _load_terms():
+    from safenet.supabase_client import supabase
+
+    rows = supabase.from_("slang_words").select("word").eq("is_active", True).execute().data or []
+    return [r["word"] for r in rows if r.get("word")]
+
+
+def get_matcher():
+    """The current matcher, rebuilt from slang_words whenever the blocklist version changes."""
+    version = blocklist_version()
+    if version == _state["version"] or time.monotonic() < _state["retry_at"]:
+        return _state["matcher"]
+
+    with _lock:
+        if version != _state["version"] and time.monotonic() >= _state["retry_at"]:
+            try:
+                _state["matcher"] = LexicalBlocklist(_load_terms())
+                _state["version"] = version
+                logger.info("Lexical blocklist built with %d terms", len(_state["matcher"]))
+            except Exception:
+                # Keep the previous matcher; do not hit the database on every comment
+                logger.exception("lexical blocklist rebuild failed")
+                _state["retry_at"] = time.monotonic() + RETRY_SECONDS
+    return _state["matcher"]
+
+
+def find_many(texts):
+    """Lexical hit (term, kind) or None for each text."""
+    matcher = get_matcher()
+    hits = [matcher.find(t) for t in texts]
+    with _lock:
+        _counters["checked"] += len(hits)
+        for hit in hits:
+            if hit:
+                _counters[f"{hit[1]}_hits"] += 1
+    return hits
+
+
+def stats():
+    with _lock:
+        return {
+            "enabled": ENABLED,
+            "near_match": NEAR_MATCH,
+            "terms": len(_state["matcher"]),
+            "version": _state["version"],
+            **_counters,
+        }
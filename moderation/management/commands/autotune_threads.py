@@ -0,0 +1,136 @@
+import multiprocessing
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ai_models import threads
+from moderation import pipeline
+
+MODELS = ["spam", "toxicity", "phishing", "drug"]
+
+
+def _loader(name):
+    from ai_models import warmup
+    return warmup._classifiers()[name][0]
+
+
+def _sample_texts(n):
+    # Mix of comment lengths, like real traffic (mostly short, some long)
+    from ai_models import warmup
+    lengths = [8, 16, 16, 24, 32, 48, 64, 128, 256]
+    return [warmup._sample_text(lengths[i % len(lengths)]) for i in range(n)]
+
+
+def _bench_worker(models, intra_op, concurrency, batch_size, texts, repeat, barrier, results):
+    import torch
+    from ai_models.batch_inference import predict_proba_batch
+
+    torch.set_num_threads(intra_op)
+    loaded = [_loader(name)() for name in models]
+    # Like the engine's pipeline: every model scores the batch, up to `concurrency` at once
+    pool = ThreadPoolExecutor(max_workers=concurrency)
+
+    barrier.wait()
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for i in range(0, len(texts), batch_size):
+            t = time.perf_counter()
+            batch = texts[i:i + batch_size]
+            for future in [pool.submit(predict_proba_batch, tok, model, batch, batch_size=batch_size)
+                           for tok, model in loaded]:
+                future.result()
+            latencies.append(time.perf_counter() - t)
+    results.put((time.perf_counter() - started, latencies))
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the local models across torch thread counts and batch sizes; write the best to the thread config'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=threads.worker_count(),
+                            help='Worker processes to run side by side (default: WEB_CONCURRENCY)')
+        parser.add_argument('--threads', type=int, nargs='*', help='Intra-op thread counts to try (default: 1, 2, 4 … up to cores / workers)')
+        parser.add_argument('--concurrency', type=int, default=pipeline.model_concurrency(),
+                            help='Models run side by side per batch, as the engine pipeline does (default: from SAFENET_PIPELINE*)')
+        parser.add_argument('--batch-sizes', type=int, nargs='*', default=[8, 16, 32, 64])
+        parser.add_argument('--models', nargs='*', choices=MODELS, default=MODELS)
+        parser.add_argument('--texts', type=int, default=64, help='Sample comments per batch round')
+        parser.add_argument('--repeat', type=int, default=3)
+        parser.add_argument('--objective', choices=['throughput', 'latency'], default='throughput',
+                            help='Maximize comments/s across all workers, or minimize p95 batch latency')
+        parser.add_argument('--dry-run', action='store_true', help="Print the results, don't write the config")
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        concurrency = max(1, options['concurrency'])
+        cores = threads.available_cores()
+        per_stage = max(1, cores // workers // concurrency)
+        thread_counts = options['threads'] or [t for t in (1, 2, 4, 8, 16, 32) if t <= per_stage]
+        if not thread_counts:
+            raise CommandError("No thread counts to try")
+
+        # Load once in this process so every forked benchmark worker shares the weights
+        for name in options['models']:
+            _loader(name)()
+        texts = _sample_texts(options['texts'])
+
+        self.stdout.write(f"{cores} cores, {workers} workers × {concurrency} concurrent models → trying {thread_counts} threads × "
+                          f"{options['batch_sizes']} batch sizes on {', '.join(options['models'])}\n")
+        self.stdout.write(f"{'threads':>8} {'batch':>6} {'comments/s':>11} {'p95 batch ms':>13}")
+
+        rows = []
+        for intra_op in thread_counts:
+            for batch_size in options['batch_sizes']:
+                throughput, p95 = self._run(workers, options['models'], intra_op, concurrency, batch_size, texts,
+                                            options['repeat'])
+                rows.append((intra_op, batch_size, throughput, p95))
+                self.stdout.write(f"{intra_op:>8} {batch_size:>6} {throughput:>11.1f} {p95:>13.2f}")
+
+        if options['objective'] == 'latency':
+            best = min(rows, key=lambda r: (r[3], -r[2]))
+        else:
+            best = max(rows, key=lambda r: (r[2], -r[3]))
+
+        config = {
+            "workers": workers,
+            "cores": cores,
+            "concurrency": concurrency,
+            "intra_op": best[0],
+            "batch_size": best[1],
+            "objective": options['objective'],
+            "comments_per_second": round(best[2], 1),
+            "p95_batch_ms": round(best[3], 2),
+            "tuned_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        }
+        self.stdout.write(self.style.SUCCESS(
+            f"\nBest: {best[0]} threads, batch {best[1]} ({best[2]:.1f} comments/s, p95 {best[3]:.2f} ms)"
+        ))
+        if options['dry_run']:
+            return
+        threads.write_config(config)
+        self.stdout.write(f"Wrote {threads.config_path()} (used by workers on this host with {workers} workers "
+                          f"running {concurrency} models at once)")
+
+    def _run(self, workers, models, intra_op, concurrency, batch_size, texts, repeat):
+        # Real side-by-side processes, so oversubscription shows up in the numbers
+        ctx = multiprocessing.get_context("fork")
+        barrier = ctx.Barrier(workers)
+        results = ctx.Queue()
+        procs = [
+            ctx.Process(target=_bench_worker, args=(models, intra_op, concurrency, batch_size, texts, repeat, barrier, results))
+            for _ in range(workers)
+        ]
+        for p in procs:
+            p.start()
+        measured = [results.get() for _ in procs]
+        for p in procs:
+            p.join()
+
+        wall = max(seconds for seconds, _ in measured)
+        latencies = sorted(l for _, lat in measured for l in lat)
+        # Every comment goes through all the models
+        comments = workers * repeat * len(texts)
+        p95 = latencies[int(0.95 * (len(latencies) - 1))] * 1000 if latencies else 0.0
+        return comments / wall, p95
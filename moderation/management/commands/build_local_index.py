@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from ai_models.local_index import use_local
+from moderation.blocklist_version import bump_version as bump_blocklist_version
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the slang vectors of the local vector index (SAFENET_VECTOR_BACKEND=local) from the slang_words table'
+
+    def handle(self, *args, **options):
+        if not use_local():
+            self.stdout.write(self.style.WARNING("SAFENET_VECTOR_BACKEND is not 'local' — nothing to do."))
+            return
+
+        from ai_models import pinecone_utils
+
+        index = pinecone_utils.index
+        # Only the slang rows: drug_* vectors and other categories are not in slang_words
+        for ids in list(index.list(prefix="slang_")):
+            index.delete(ids=ids)
+        pinecone_utils.bootstrap_from_slang_words(index)
+        # Cached and stored verdicts were scored against the old index
+        bump_blocklist_version()
+
+        count = index.describe_index_stats()["total_vector_count"]
+        self.stdout.write(self.style.SUCCESS(f"Local index rebuilt with {count} vectors."))
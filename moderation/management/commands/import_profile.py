@@ -0,0 +1,60 @@
+import os
+import subprocess
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+DEFAULT_MODULES = ["safenet.urls", "moderation.views", "moderation.engine"]
+# Modules that should only ever be imported on first inference, never at startup
+HEAVY_MODULES = ["torch", "transformers", "sentence_transformers", "onnxruntime", "pinecone", "joblib", "sklearn"]
+
+
+def _parse_importtime(stderr):
+    """[(name, self_us, cumulative_us, depth)] from `python -X importtime` output."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+class Command(BaseCommand):
+    help = 'Import-time profile: which modules Django startup and URL loading pay for'
+
+    def add_arguments(self, parser):
+        parser.add_argument('modules', nargs='*', help=f"Modules to import after django.setup() (default: {' '.join(DEFAULT_MODULES)})")
+        parser.add_argument('--top', type=int, default=15, help='How many of the slowest imports to list')
+
+    def handle(self, *args, **options):
+        modules = options['modules'] or DEFAULT_MODULES
+        code = "import django; django.setup(); " + "; ".join(f"import {m}" for m in modules)
+        env = {**os.environ, "DJANGO_SETTINGS_MODULE": os.environ.get("DJANGO_SETTINGS_MODULE", "safenet.settings")}
+
+        # Fresh interpreter so nothing is already imported
+        started = time.perf_counter()
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                              env=env, capture_output=True, text=True)
+        wall = time.perf_counter() - started
+        if proc.returncode != 0:
+            raise CommandError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "import failed")
+
+        rows = _parse_importtime(proc.stderr)
+        total_ms = sum(cum for _, _, cum, depth in rows if depth == 0) / 1000.0
+
+        self.stdout.write(f"Imported {', '.join(modules)} in {total_ms:.0f} ms ({wall:.2f}s wall incl. interpreter start)\n")
+
+        self.stdout.write(f"{'cumulative ms':>14} {'self ms':>9}  module")
+        top_level = sorted((r for r in rows if r[3] == 0), key=lambda r: -r[2])
+        for name, self_us, cum_us, _ in top_level[:options['top']]:
+            self.stdout.write(f"{cum_us / 1000:>14.1f} {self_us / 1000:>9.1f}  {name}")
+
+        loaded = {name for name, _, _, _ in rows}
+        heavy = [m for m in HEAVY_MODULES if m in loaded]
+        if heavy:
+            self.stdout.write(self.style.WARNING(f"\nHeavy modules imported at startup: {', '.join(heavy)}"))
+        else:
+            self.stdout.write(self.style.SUCCESS("\nNo model / ML framework modules imported at startup."))
@@ -0,0 +1,86 @@
+import multiprocessing
+import os
+
+from django.core.management.base import BaseCommand
+
+from ai_models.shared_weights import process_memory
+
+
+def _gunicorn_pids():
+    pids = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit() or int(entry) == os.getpid():
+            continue
+        try:
+            with open(f"/proc/{entry}/cmdline", "rb") as f:
+                cmdline = f.read().replace(b"\0", b" ").decode(errors="replace")
+        except OSError:
+            continue
+        if "gunicorn" in cmdline and "memory_report" not in cmdline:
+            pids.append(int(entry))
+    return sorted(pids)
+
+
+def _simulated_worker(barrier, results):
+    # Load and run everything a worker needs (weights are only resident once
+    # touched), then measure while all siblings are alive
+    from ai_models import warmup
+    for load, predict in warmup._classifiers().values():
+        load()
+        predict([warmup._sample_text(64)])
+    from ai_models import pinecone_utils
+    pinecone_utils.get_embeddings([warmup._sample_text(64)])
+
+    barrier.wait()
+    results.put((os.getpid(), process_memory()))
+    barrier.wait()
+
+
+class Command(BaseCommand):
+    help = 'Per-worker unique vs shared RSS (MiB) of the gunicorn workers, or of N simulated workers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pids', nargs='*', type=int, help='Processes to report (default: all gunicorn processes)')
+        parser.add_argument('--simulate', type=int, metavar='N',
+                            help='Fork N workers that each load every model, and report them '
+                                 '(run with SAFENET_MMAP_WEIGHTS=0 and =1 to compare)')
+
+    def handle(self, *args, **options):
+        if options['simulate']:
+            rows = self._simulate(options['simulate'])
+        else:
+            pids = options['pids'] or _gunicorn_pids()
+            if not pids:
+                self.stdout.write(self.style.WARNING("No gunicorn processes found — pass --pids or --simulate N."))
+                return
+            rows = []
+            for pid in pids:
+                try:
+                    rows.append((pid, process_memory(pid)))
+                except OSError as e:
+                    self.stdout.write(self.style.WARNING(f"Skipping {pid}: {e}"))
+
+        self.stdout.write(f"{'pid':>8} {'rss':>9} {'unique':>9} {'shared':>9} {'pss':>9}")
+        for pid, mem in rows:
+            self.stdout.write(f"{pid:>8} {mem['rss']:>9.1f} {mem['unique']:>9.1f} {mem['shared']:>9.1f} {mem['pss']:>9.1f}")
+
+        total_unique = sum(mem['unique'] for _, mem in rows)
+        total_pss = sum(mem['pss'] for _, mem in rows)
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(rows)} processes: {total_unique:.1f} MiB unique, {total_pss:.1f} MiB proportional total"
+        ))
+
+    def _simulate(self, n):
+        ctx = multiprocessing.get_context("fork")
+        barrier = ctx.Barrier(n + 1)
+        results = ctx.Queue()
+        workers = [ctx.Process(target=_simulated_worker, args=(barrier, results)) for _ in range(n)]
+        for w in workers:
+            w.start()
+
+        barrier.wait()
+        rows = [results.get() for _ in workers]
+        barrier.wait()
+        for w in workers:
+            w.join()
+        return sorted(rows)
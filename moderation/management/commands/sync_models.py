@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ai_models import model_manifest
+
+
+class Command(BaseCommand):
+    help = 'Downloads and verifies the model artifacts so the app can load them offline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('models', nargs='*', help=f"Models to sync (default: all of {', '.join(model_manifest.MODELS)})")
+        parser.add_argument('--revision', help='Hub revision (branch, tag or commit) to pin')
+        parser.add_argument('--force', action='store_true', help='Re-download (latest revision) even if the local copy verifies')
+        parser.add_argument('--verify', action='store_true', help='Only check the local copies against their manifests')
+
+    def handle(self, *args, **options):
+        names = options['models'] or list(model_manifest.MODELS)
+        unknown = [n for n in names if n not in model_manifest.MODELS]
+        if unknown:
+            raise CommandError(f"Unknown model(s): {', '.join(unknown)}")
+
+        failed = []
+        for name in names:
+            local_dir = model_manifest.MODELS[name]['local_dir']
+
+            if options['verify']:
+                problems = model_manifest.verify(local_dir, checksums=True)
+                if problems:
+                    failed.append(name)
+                    self.stdout.write(self.style.ERROR(f"{name}: {'; '.join(problems)}"))
+                else:
+                    revision = model_manifest.read_manifest(local_dir)['revision']
+                    self.stdout.write(self.style.SUCCESS(f"{name}: OK ({revision})"))
+                continue
+
+            try:
+                result = model_manifest.sync(name, revision=options['revision'], force=options['force'])
+            except Exception as e:
+                failed.append(name)
+                self.stdout.write(self.style.ERROR(f"{name}: sync failed — {e}"))
+                continue
+            self.stdout.write(self.style.SUCCESS(f"{name}: {result}"))
+
+        if failed:
+            raise CommandError(f"{len(failed)} model(s) not usable offline: {', '.join(failed)}")
+        self.stdout.write(self.style.SUCCESS(f"Model version: {model_manifest.manifest_version()}"))
@@ -0,0 +1,339 @@
+# moderation/near_duplicates.py
+import copy
+import itertools
+import os
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict, deque
+
+import numpy as np
+
+# ============================================
+# 🔥 SETTINGS
+# ============================================
+# Off by default: a comment within THRESHOLD of a recently scored one takes
+# its verdict without running the transformers, so a copy that changes the
+# few words that mattered inherits the original's label. The lexical and
+# Pinecone blocklist checks still run on every comment.
+ENABLED = os.getenv("SAFENET_NEAR_DUP", "0").lower() in ("1", "true", "yes")
+# Estimated Jaccard similarity of the two comments' character shingles
+THRESHOLD = float(os.getenv("SAFENET_NEAR_DUP_THRESHOLD", "0.8"))
+WINDOW_SECONDS = float(os.getenv("SAFENET_NEAR_DUP_WINDOW", "600"))
+MAX_SIZE = int(os.getenv("SAFENET_NEAR_DUP_SIZE", "50000"))
+# Copies of one message within the window that make it a campaign: all of
+# them get at least "review" (0 = never escalate)
+CAMPAIGN_SIZE = int(os.getenv("SAFENET_NEAR_DUP_CAMPAIGN", "20"))
+
+# Shorter comments ("nice post!", "thanks a lot") are too alike to compare
+MIN_CHARS = 24
+SHINGLE = 4
+# 16 bands of 4 rows: pairs at THRESHOLD 0.8 share a band with p > 0.999
+BANDS, ROWS = 16, 4
+# Copies this close to an indexed comment are counted but not indexed
+# themselves, so a flood of identical variants doesn't grow the buckets
+INDEX_BELOW = 0.9
+
+CAMPAIGN_REASON = "Part of a near-duplicate campaign"
+
+_PRIME = (1 << 61) - 1
+# Fixed seed: signatures stay comparable across workers and restarts
+_rng = np.random.RandomState(1337)
+_A = _rng.randint(1, 1 << 31, BANDS * ROWS).astype(np.uint64)
+_B = _rng.randint(0, 1 << 31, BANDS * ROWS).astype(np.uint64)
+
+_CLEAN_RE = re.compile(r"[^\w\s]+")
+
+
+def normalize(text):
+    # Case, punctuation and spacing are the cheapest things to mutate
+    return " ".join(_CLEAN_RE.sub(" ", text.lower()).split())
+
+
+def signature(text):
+    """MinHash of the text's character shingles, or None if it is too short to compare."""
+    text = normalize(text)
+    if len(text) < MIN_CHARS:
+        return None
+    shingles = {zlib.crc32(text[i:i + SHINGLE].encode("utf-8")) for i in range(len(text) - SHINGLE + 1)}
+    x = np.fromiter(shingles, dtype=np.uint64, count=len(shingles))
+    return ((_A[:, None] * x[None, :] + _B[:, None]) % _PRIME).min(axis=1)
+
+
+def similarity(a, b):
+    return float(np.mean(a == b))
+
+
+def _band_keys(sig):
+    return [(band, sig[band * ROWS:(band + 1) * ROWS].tobytes()) for band in range(BANDS)]
+
+
+def _closest(sig, buckets, signatures, accept=None):
+    """First indexed signature sharing a band with `sig` and within THRESHOLD: (key, similarity)."""
+    checked = set()
+    for key in _band_keys(sig):
+        for candidate in buckets.get(key, ()):
+            if candidate in checked:
+                continue
+            checked.add(candidate)
+            if accept is not None and not accept(candidate):
+                continue
+            sim = similarity(sig, signatures[candidate])
+            if sim >= THRESHOLD:
+                return candidate, sim
+    return None, None
+
+
+# ============================================
+# 🔥 ROLLING LSH INDEX
+# ============================================
+class _Cluster:
+    __slots__ = ("result", "tag", "entries", "seen")
+
+    def __init__(self, result, tag):
+        self.result = result
+        self.tag = tag
+        self.entries = 0
+        self.seen = deque()     # monotonic times its comments were scored or matched
+
+
+class NearDuplicateIndex:
+    """
+    Signatures of comments scored in the last WINDOW_SECONDS, bucketed by
+    LSH band. Near-duplicates join the cluster of the comment they matched
+    and share its verdict; the cluster's rolling count of copies is what
+    marks a campaign. Each cluster carries the verdict tag (blocklist +
+    model version) it was scored under; a tag mismatch is never a match.
+    """
+
+    def __init__(self, max_size=MAX_SIZE, window=WINDOW_SECONDS):
+        self.max_size = max_size
+        self.window = window
+        self._entries = OrderedDict()   # entry id -> (cluster id, expires_at)
+        self._signatures = {}           # entry id -> signature
+        self._buckets = {}              # band key -> set of entry ids
+        self._clusters = {}             # cluster id -> _Cluster
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+
+    def _expire(self, now):
+        while self._entries:
+            entry_id, (_, expires_at) = next(iter(self._entries.items()))
+            if expires_at > now and len(self._entries) <= self.max_size:
+                break
+            self._remove(entry_id)
+
+    def _remove(self, entry_id):
+        cluster_id, _ = self._entries.pop(entry_id)
+        for key in _band_keys(self._signatures.pop(entry_id)):
+            bucket = self._buckets[key]
+            bucket.discard(entry_id)
+            if not bucket:
+                del self._buckets[key]
+        cluster = self._clusters[cluster_id]
+        cluster.entries -= 1
+        if cluster.entries <= 0:
+            del self._clusters[cluster_id]
+
+    def find(self, sig, tag):
+        """(cluster id, verdict, similarity) of a recent near-duplicate of `sig`, or None."""
+        with self._lock:
+            self._expire(time.monotonic())
+            entry_id, sim = _closest(sig, self._buckets, self._signatures,
+                                     accept=lambda e: self._clusters[self._entries[e][0]].tag == tag)
+            if entry_id is None:
+                return None
+            cluster_id = self._entries[entry_id][0]
+            return cluster_id, self._clusters[cluster_id].result, sim
+
+    def add(self, sig, result, tag, cluster_id=None, sim=None):
+        """
+        Record a scored comment in `cluster_id` (matched with similarity
+        `sim`), or as the first of a new cluster with verdict `result` if it
+        matched nothing or that cluster has expired. Returns the cluster id.
+        """
+        with self._lock:
+            now = time.monotonic()
+            cluster = self._clusters.get(cluster_id)
+            if cluster is None:
+                cluster_id, sim = next(self._ids), None
+                cluster = self._clusters[cluster_id] = _Cluster(copy.deepcopy(result), tag)
+
+            cluster.seen.append(now)
+            if sim is None or sim < INDEX_BELOW:
+                entry_id = next(self._ids)
+                self._entries[entry_id] = (cluster_id, now + self.window)
+                self._signatures[entry_id] = sig
+                for key in _band_keys(sig):
+                    self._buckets.setdefault(key, set()).add(entry_id)
+                cluster.entries += 1
+
+            self._expire(now)
+            return cluster_id
+
+    def cluster_size(self, cluster_id):
+        """Comments in the cluster within the window (0 once it has expired)."""
+        with self._lock:
+            cluster = self._clusters.get(cluster_id)
+            if cluster is None:
+                return 0
+            cutoff = time.monotonic() - self.window
+            while cluster.seen and cluster.seen[0] <= cutoff:
+                cluster.seen.popleft()
+            return len(cluster.seen)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._signatures.clear()
+            self._buckets.clear()
+            self._clusters.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"size": len(self._entries), "max_size": self.max_size, "clusters": len(self._clusters)}
+
+
+index = NearDuplicateIndex()
+_lock = threading.Lock()
+_counters = {"checked": 0, "recent_copies": 0, "batch_copies": 0, "cached_repeats": 0, "campaign_escalations": 0}
+
+
+# ============================================
+# 🔥 ENGINE HOOKS
+# ============================================
+class Lookup:
+    """Near-duplicate matches for one batch of comments (see lookup / settle)."""
+
+    def __init__(self, positions, tag):
+        self.positions = positions
+        self.tag = tag
+        self.signatures = []
+        self.clusters = []      # cluster of a recent near-duplicate, or None
+        self.reused = []        # that cluster's verdict
+        self.leaders = []       # earlier comment of this batch it copies, or None
+        self.similarity = []
+
+    def handled(self):
+        """Positions that take another comment's verdict instead of being scored."""
+        return {
+            pos for pos, reused, leader in zip(self.positions, self.reused, self.leaders)
+            if reused is not None or leader is not None
+        }
+
+
+def lookup(texts, tag, positions=None):
+    """
+    Match each text against the index and against the texts before it in
+    the batch. Nothing is written yet: settle() does that once the
+    remaining texts have been scored.
+    """
+    batch = Lookup(list(range(len(texts))) if positions is None else list(positions), tag)
+    local = {}      # band key -> earlier texts of this batch
+
+    for k, text in enumerate(texts):
+        sig = signature(text)
+        cluster_id = reused = leader = sim = None
+        if sig is not None:
+            hit = index.find(sig, tag)
+            if hit:
+                cluster_id, reused, sim = hit
+            else:
+                leader, sim = _closest(sig, local, batch.signatures)
+            if sim is None or sim < INDEX_BELOW:
+                for key in _band_keys(sig):
+                    local.setdefault(key, []).append(k)
+
+        batch.signatures.append(sig)
+        batch.clusters.append(cluster_id)
+        batch.reused.append(reused)
+        batch.leaders.append(leader)
+        batch.similarity.append(sim)
+
+    with _lock:
+        _counters["checked"] += len(texts)
+        _counters["recent_copies"] += sum(1 for r in batch.reused if r is not None)
+        _counters["batch_copies"] += sum(1 for l in batch.leaders if l is not None)
+    return batch
+
+
+def settle(batch, results):
+    """
+    Fill in the copies' verdicts, index the batch, and escalate the
+    comments of every cluster that has reached CAMPAIGN_SIZE. `results` is
+    the engine's full result list; a copy the blocklist banned meanwhile
+    keeps its ban.
+    """
+    clusters = {}
+    for k, pos in enumerate(batch.positions):
+        leader = batch.leaders[k]
+        if results[pos] is None:
+            if batch.reused[k] is not None:
+                results[pos] = _copy(batch.reused[k], batch.similarity[k], "a recently scored comment")
+            elif leader is not None:
+                results[pos] = _copy(results[batch.positions[leader]], batch.similarity[k], "another comment in this batch")
+
+        if batch.signatures[k] is None:
+            continue
+        cluster_id = batch.clusters[k] if leader is None else clusters.get(leader)
+        clusters[k] = index.add(batch.signatures[k], results[pos], batch.tag, cluster_id, batch.similarity[k])
+
+    if not CAMPAIGN_SIZE:
+        return
+    sizes = {cluster_id: index.cluster_size(cluster_id) for cluster_id in set(clusters.values())}
+    for k, cluster_id in clusters.items():
+        if sizes[cluster_id] >= CAMPAIGN_SIZE:
+            _escalate(results[batch.positions[k]], sizes[cluster_id])
+
+
+def observe(texts, results, tag):
+    """
+    Count comments answered by the verdict cache (exact repeats, which
+    never reach the engine) toward their cluster, and escalate `results`
+    in place if that makes a campaign. Identical floods are the most
+    common campaign.
+    """
+    for text, result in zip(texts, results):
+        sig = signature(text)
+        if sig is None:
+            continue
+        cluster_id, _, sim = index.find(sig, tag) or (None, None, None)
+        cluster_id = index.add(sig, result, tag, cluster_id, sim)
+        with _lock:
+            _counters["cached_repeats"] += 1
+        if CAMPAIGN_SIZE:
+            size = index.cluster_size(cluster_id)
+            if size >= CAMPAIGN_SIZE:
+                _escalate(result, size)
+
+
+def _copy(result, sim, source):
+    result = copy.deepcopy(result)
+    result["reasons"].append(f"Near-duplicate of {source} ({sim:.2f} similar), models skipped")
+    return result
+
+
+def _escalate(result, size):
+    minutes = WINDOW_SECONDS / 60
+    # A cached or copied verdict may already carry an older count
+    result["reasons"] = [r for r in result["reasons"] if not r.startswith(CAMPAIGN_REASON)]
+    result["reasons"].append(f"{CAMPAIGN_REASON} ({size} copies in {minutes:g} min)")
+    if result["final_label"] == "safe":
+        result["final_label"] = "review"
+        result["safe"] = False
+        with _lock:
+            _counters["campaign_escalations"] += 1
+
+
+def stats():
+    with _lock:
+        counters = dict(_counters)
+    return {
+        "enabled": ENABLED,
+        "threshold": THRESHOLD,
+        "window_seconds": WINDOW_SECONDS,
+        "campaign_size": CAMPAIGN_SIZE,
+        **index.stats(),
+        **counters,
+    }
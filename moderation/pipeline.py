@@ -0,0 +1,241 @@
+# moderation/pipeline.py
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+# ============================================
+# 🔥 SETTINGS
+# ============================================
+# Run independent engine stages (blocklist lookups, the four classifiers)
+# concurrently. PyTorch releases the GIL inside forward passes, so a
+# request costs roughly its slowest model instead of the sum of all four.
+ENABLED = os.getenv("SAFENET_PIPELINE", "1").lower() in ("1", "true", "yes")
+WORKERS = int(os.getenv("SAFENET_PIPELINE_WORKERS", "4"))
+# Per-stage limit in seconds (0 = none), counted from when the stage starts
+# running, not from when it is queued; see Stage.timeout
+STAGE_TIMEOUT = float(os.getenv("SAFENET_STAGE_TIMEOUT", "0"))
+# Timed-out calls keep their pool thread until they finish. Past this many,
+# runs go inline instead of queueing behind them.
+MAX_ABANDONED = max(1, WORKERS // 2)
+# How often queued stages are checked for having started (their deadline
+# only begins then)
+POLL_SECONDS = 0.05
+
+REQUIRED = object()
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+_stats_lock = threading.Lock()
+_stats = {}
+_abandoned = 0
+
+
+class StageTimeout(TimeoutError):
+    pass
+
+
+class Stage:
+    """
+    One node of the graph. `fn` is called with the values of `deps`, in
+    order, once all of them have finished. If it raises or runs past
+    `timeout` seconds, the stage takes `fallback` as its value, or fails the
+    whole run if it has none (REQUIRED). A timed-out call is abandoned, not
+    interrupted: its thread finishes in the background and the result is
+    dropped.
+    """
+
+    def __init__(self, name, fn, deps=(), timeout=None, fallback=REQUIRED):
+        self.name = name
+        self.fn = fn
+        self.deps = tuple(deps)
+        self.timeout = timeout
+        self.fallback = fallback
+
+
+class StageResult:
+    __slots__ = ("value", "status", "seconds", "error")
+
+    def __init__(self, value, status, seconds, error=None):
+        self.value = value
+        self.status = status        # ok | failed | timed_out
+        self.seconds = seconds
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.status == "ok"
+
+
+class Pipeline:
+    """A DAG of stages; run() executes it and returns {name: StageResult}."""
+
+    def __init__(self, stages):
+        self.stages = {}
+        for stage in stages:
+            if stage.name in self.stages:
+                raise ValueError(f"duplicate stage {stage.name!r}")
+            self.stages[stage.name] = stage
+        self.order = self._toposort()
+
+    def _toposort(self):
+        order, state = [], {}
+
+        def visit(name, path):
+            if state.get(name) == "done":
+                return
+            if state.get(name) == "visiting":
+                raise ValueError(f"cycle in pipeline: {' -> '.join(path + [name])}")
+            if name not in self.stages:
+                raise ValueError(f"unknown stage {name!r} (needed by {path[-1]!r})")
+            state[name] = "visiting"
+            for dep in self.stages[name].deps:
+                visit(dep, path + [name])
+            state[name] = "done"
+            order.append(name)
+
+        for name in self.stages:
+            visit(name, [])
+        return order
+
+    def run(self, parallel=None):
+        if parallel is None:
+            parallel = ENABLED and WORKERS > 1 and _abandoned < MAX_ABANDONED
+        results = self._run_parallel() if parallel else self._run_inline()
+        _record(results)
+        return results
+
+    def _args(self, stage, results):
+        return [results[dep].value for dep in stage.deps]
+
+    def _fallback(self, stage, error, status, seconds, running=()):
+        if stage.fallback is REQUIRED:
+            # The run is failing: don't start anything that is still queued
+            for future in running:
+                future.cancel()
+            raise error
+        return StageResult(stage.fallback, status, seconds, error)
+
+    def _run_inline(self):
+        # Same semantics, in the caller's thread (timeouts are only reported)
+        results = {}
+        for name in self.order:
+            stage = self.stages[name]
+            started = time.perf_counter()
+            try:
+                value = stage.fn(*self._args(stage, results))
+            except Exception as e:
+                results[name] = self._fallback(stage, e, "failed", time.perf_counter() - started)
+                continue
+            results[name] = StageResult(value, "ok", time.perf_counter() - started)
+        return results
+
+    def _run_parallel(self):
+        executor = get_executor()
+        results = {}
+        running = {}            # future -> (stage, started, timeout); started is filled in by _call
+        waiting = list(self.order)
+
+        while waiting or running:
+            for name in list(waiting):
+                stage = self.stages[name]
+                if all(dep in results for dep in stage.deps):
+                    waiting.remove(name)
+                    timeout = stage.timeout if stage.timeout is not None else (STAGE_TIMEOUT or None)
+                    started = []
+                    future = executor.submit(_call, started, stage.fn, self._args(stage, results))
+                    running[future] = (stage, started, timeout)
+
+            # Deadlines of the stages that have started; queued ones are polled
+            deadlines = [s[0] + t for _, s, t in running.values() if t and s]
+            budget = max(0.0, min(deadlines) - time.perf_counter()) if deadlines else None
+            if any(t and not s for _, s, t in running.values()):
+                budget = POLL_SECONDS if budget is None else min(budget, POLL_SECONDS)
+            done, _ = wait(running, timeout=budget, return_when=FIRST_COMPLETED)
+
+            now = time.perf_counter()
+            for future in done:
+                stage, started, _ = running.pop(future)
+                seconds = now - started[0] if started else 0.0
+                try:
+                    results[stage.name] = StageResult(future.result(), "ok", seconds)
+                except Exception as e:
+                    results[stage.name] = self._fallback(stage, e, "failed", seconds, running)
+
+            for future, (stage, started, timeout) in list(running.items()):
+                if timeout and started and now >= started[0] + timeout:
+                    running.pop(future)
+                    _abandon(future)
+                    error = StageTimeout(f"stage {stage.name!r} timed out after {now - started[0]:.2f}s")
+                    results[stage.name] = self._fallback(stage, error, "timed_out", now - started[0], running)
+
+        return results
+
+
+def _call(started, fn, args):
+    started.append(time.perf_counter())
+    return fn(*args)
+
+
+def _abandon(future):
+    global _abandoned
+    with _stats_lock:
+        _abandoned += 1
+    future.add_done_callback(_release)
+
+
+def _release(_future):
+    global _abandoned
+    with _stats_lock:
+        _abandoned -= 1
+
+
+def model_concurrency():
+    """Forward passes one request runs at once: the model stages side by side, bounded by the pool."""
+    from moderation import early_exit
+    return min(WORKERS, 4) if ENABLED and WORKERS > 1 and not early_exit.ENABLED else 1
+
+
+def get_executor():
+    """Bounded pool shared by every request in this process (recreated after fork)."""
+    global _executor, _executor_pid
+    if _executor is None or _executor_pid != os.getpid():
+        with _executor_lock:
+            if _executor is None or _executor_pid != os.getpid():
+                _executor = ThreadPoolExecutor(max_workers=max(1, WORKERS), thread_name_prefix="safenet-stage")
+                _executor_pid = os.getpid()
+    return _executor
+
+
+def _record(results):
+    with _stats_lock:
+        for name, result in results.items():
+            s = _stats.setdefault(name, {"runs": 0, "total_ms": 0.0, "failed": 0, "timed_out": 0})
+            s["runs"] += 1
+            s["total_ms"] += result.seconds * 1000
+            if result.status == "failed":
+                s["failed"] += 1
+            elif result.status == "timed_out":
+                s["timed_out"] += 1
+
+
+def stats():
+    with _stats_lock:
+        stages = {
+            name: {
+                "runs": s["runs"],
+                "avg_ms": round(s["total_ms"] / s["runs"], 2) if s["runs"] else 0.0,
+                "failed": s["failed"],
+                "timed_out": s["timed_out"],
+            }
+            for name, s in _stats.items()
+        }
+    return {
+        "enabled": ENABLED,
+        "workers": WORKERS,
+        "stage_timeout": STAGE_TIMEOUT or None,
+        "abandoned": _abandoned,
+        "stages": stages,
+    }
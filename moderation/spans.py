@@ -0,0 +1,89 @@
+# moderation/spans.py
+import os
+import re
+import threading
+
+from ai_models import embedder, pinecone_utils
+
+# ============================================
+# 🔥 SETTINGS
+# ============================================
+# Off by default: with the Pinecone backend every distinct span is one
+# network query (the local index answers all spans in one matrix multiply).
+ENABLED = os.getenv("SAFENET_SPAN_BLOCKLIST", "0").lower() in ("1", "true", "yes")
+MAX_NGRAM = int(os.getenv("SAFENET_SPAN_MAX_NGRAM", "3"))
+MAX_SPANS = int(os.getenv("SAFENET_SPAN_MAX_SPANS", "64"))
+EMBED_CACHE_SIZE = int(os.getenv("SAFENET_SPAN_EMBED_CACHE", "20000"))
+MIN_SPAN_CHARS = 3
+
+WORD_RE = re.compile(r"[\w'$@]+")
+
+# Own LRU so span n-grams don't push whole-comment embeddings out of the shared one
+_cache = embedder.EmbeddingCache(EMBED_CACHE_SIZE)
+_counters_lock = threading.Lock()
+_counters = {"comments": 0, "spans": 0, "hits": 0}
+
+
+def candidate_spans(text, max_ngram=MAX_NGRAM, max_spans=MAX_SPANS):
+    """
+    Distinct lowercase word n-grams (1..max_ngram words) of `text`, in
+    order of first appearance. The whole text is left out — the caller
+    has already checked it.
+    """
+    words = WORD_RE.findall(text.lower())
+    whole = " ".join(words)
+    spans, seen = [], set()
+    for n in range(1, max_ngram + 1):
+        for i in range(len(words) - n + 1):
+            span = " ".join(words[i:i + n])
+            if len(span) < MIN_SPAN_CHARS or span == whole or span in seen:
+                continue
+            seen.add(span)
+            spans.append(span)
+            if len(spans) >= max_spans:
+                return spans
+    return spans
+
+
+def find_blocklisted_spans(contexts, threshold=0.95, category=None):
+    """
+    Best blocklist hit inside each comment, as (span, similarity,
+    matched_text), or None. Spans of the whole batch are deduplicated,
+    embedded in one call and queried in one batched lookup.
+    """
+    per_context = [candidate_spans(ctx.text_clean) for ctx in contexts]
+    distinct = list(dict.fromkeys(s for spans in per_context for s in spans))
+
+    best = {}
+    if distinct:
+        matches = pinecone_utils.query_nearest_many(embedder.encode_many(distinct, cache=_cache), top_k=1, category=category)
+        for span, span_matches in zip(distinct, matches):
+            if span_matches:
+                best[span] = span_matches[0]
+
+    hits = []
+    for spans in per_context:
+        hit = None
+        for span in spans:
+            match = best.get(span)
+            if match and match["score"] >= threshold and (hit is None or match["score"] > hit[1]):
+                hit = (span, match["score"], match["metadata"].get("text") or match["metadata"].get("word"))
+        hits.append(hit)
+
+    with _counters_lock:
+        _counters["comments"] += len(contexts)
+        _counters["spans"] += len(distinct)
+        _counters["hits"] += sum(1 for h in hits if h)
+
+    return hits
+
+
+def stats():
+    with _counters_lock:
+        counters = dict(_counters)
+    return {
+        "enabled": ENABLED,
+        "max_ngram": MAX_NGRAM,
+        "embed_cache": _cache.stats(),
+        **counters,
+    }
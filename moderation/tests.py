@@ -1,3 +1,532 @@
-from django.test import TestCase
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
 
-# Create your tests here.
+from django.test import SimpleTestCase
+
+from moderation import lexical_blocklist
+from moderation.lexical_blocklist import LexicalBlocklist
+
+
+class LexicalBlocklistTests(SimpleTestCase):
+    def setUp(self):
+        self.matcher = LexicalBlocklist(["heroin", "meth", "speed", "weed", "cocaine"])
+
+    def test_obfuscated_single_tokens_are_exact(self):
+        for text in ["selling w e e d today", "got h3r0in", "weeeed for sale", "c\u200bocaine", "m\u0435th"]:
+            self.assertEqual(self.matcher.find(text)[1], "exact", text)
+
+    def test_trailing_punctuation_is_not_leet(self):
+        for text in ["selling meth!!", "WEED!!!", "buy weed!", "|weed|", "$peed for sale"]:
+            self.assertEqual(self.matcher.find(text)[1], "exact", text)
+
+    def test_words_that_glue_into_a_term_never_ban(self):
+        for text in ["He was the hero in this story, great read", "call me th ursday", "I sp eed up"]:
+            hit = self.matcher.find(text)
+            self.assertNotEqual(hit and hit[1], "exact", text)
+
+    def test_split_fragments_are_near(self):
+        self.assertEqual(self.matcher.find("fresh co caine here"), ("cocaine", "near"))
+
+    def test_clean_text(self):
+        self.assertIsNone(self.matcher.find("we went to the wedding"))
+
+    def test_engine_does_not_ban_glued_words(self):
+        from moderation import engine
+
+        texts = ["He was the hero in this story, great read", "buy heroin"]
+        results = [None, None]
+        with mock.patch.object(lexical_blocklist, "get_matcher", return_value=self.matcher):
+            hits = engine._lexical_stage(texts, results)
+        self.assertIsNone(results[0])
+        self.assertEqual(hits[0], ("heroin", "near"))
+        self.assertEqual(results[1]["final_label"], "unsafe")
+
+
+class VerdictCacheTests(SimpleTestCase):
+    def setUp(self):
+        from moderation.verdict_cache import VerdictCache
+
+        self.cache = VerdictCache(max_size=64, ttl=60)
+        self.calls = []
+
+    def _score(self, texts):
+        self.calls.append(list(texts))
+        return [{"text": t, "reasons": []} for t in texts]
+
+    def test_hits_skip_scoring_and_copies_are_independent(self):
+        first = self.cache.get_or_compute_many(["hello  world", "spam"], "v1", self._score)
+        second = self.cache.get_or_compute_many(["hello world", "spam", "new"], "v1", self._score)
+        self.assertEqual(self.calls, [["hello  world", "spam"], ["new"]])
+        self.assertEqual(second[0], first[0])
+
+        second[1]["reasons"].append("mutated")
+        self.assertEqual(self.cache.get_or_compute_many(["spam"], "v1", self._score)[0]["reasons"], [])
+
+    def test_tag_mismatch_is_a_miss(self):
+        self.cache.get_or_compute_many(["hello"], "v1", self._score)
+        self.cache.get_or_compute_many(["hello"], "v2", self._score)
+        self.assertEqual(len(self.calls), 2)
+        self.assertEqual(self.cache.stats()["stale"], 1)
+
+    def test_concurrent_misses_score_once(self):
+        started, release = threading.Event(), threading.Event()
+
+        def slow(texts):
+            started.set()
+            release.wait(5)
+            return self._score(texts)
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            leader = pool.submit(self.cache.get_or_compute_many, ["hot"], "v1", slow)
+            started.wait(5)
+            follower = pool.submit(self.cache.get_or_compute_many, ["hot"], "v1", slow)
+            for _ in range(100):
+                if self.cache.stats()["singleflight_waits"]:
+                    break
+                time.sleep(0.01)
+            release.set()
+            self.assertEqual(leader.result(), follower.result())
+        self.assertEqual(self.calls, [["hot"]])
+
+
+class EarlyExitTests(SimpleTestCase):
+    def test_labels_match_full_scoring(self):
+        import numpy as np
+        from moderation import engine
+
+        rng = np.random.RandomState(0)
+        n = 300
+        short = rng.rand(n) < 0.3
+        # Mostly decisive scores, so many texts can stop early
+        table = {name: np.where(rng.rand(n) < 0.7, rng.choice([0.02, 0.98], n), rng.rand(n)) for name in engine.FULL_WEIGHTS}
+
+        def model_scores(name, contexts):
+            return table[name][contexts]
+
+        with mock.patch.object(engine, "_model_scores", side_effect=model_scores):
+            scores, ran = engine._early_exit_stage(list(range(n)), np.ones(n, dtype=bool), short)
+
+        def safe(values):
+            full = sum(values[name] * w for name, w in engine.FULL_WEIGHTS.items())
+            short_unsafe = sum(values[name] * w for name, w in engine.SHORT_WEIGHTS.items())
+            return 1 - np.where(short, short_unsafe, full)
+
+        exact, partial = safe(table), safe(scores)
+        # Skipped models count as 0, so the partial score is the upper end of the bound
+        self.assertTrue(np.all(exact <= partial + 1e-9))
+        self.assertEqual(list(engine._labels(partial)), list(engine._labels(exact)))
+        self.assertGreater(sum(int((~ran[name]).sum()) for name in engine.FULL_WEIGHTS), 0)
+        for name in set(engine.FULL_WEIGHTS) - set(engine.SHORT_WEIGHTS):
+            self.assertFalse(ran[name][short].any())
+
+    def test_model_order_prefers_decisive_cheap_models(self):
+        from moderation import early_exit
+
+        weights = {"a": 0.5, "b": 0.5}
+        with mock.patch.dict(early_exit._history, clear=True):
+            early_exit.record("a", 0.01, [0.1, 0.9])
+            early_exit.record("b", 0.01, [0.0, 1.0])
+            self.assertEqual(early_exit.model_order(weights), ["b", "a"])
+            # b turns slow: its decisiveness no longer pays for its cost
+            early_exit.record("b", 10.0, [0.0, 1.0])
+            self.assertEqual(early_exit.model_order(weights), ["a", "b"])
+
+
+class LocalIndexTests(SimpleTestCase):
+    def _vectors(self):
+        import numpy as np
+
+        rng = np.random.RandomState(0)
+        return {f"{kind}_{k}": rng.randn(16) for kind in ("slang", "drug") for k in range(20)}
+
+    def _index(self, **kwargs):
+        from ai_models.local_index import LocalIndex
+
+        index = LocalIndex(dimension=16, **kwargs)
+        index.upsert([
+            {"id": vid, "values": values, "metadata": {"category": vid.split("_")[0]}}
+            for vid, values in self._vectors().items()
+        ])
+        return index
+
+    def test_query_and_metadata_filter(self):
+        index = self._index()
+        vectors = self._vectors()
+
+        match = index.query(vector=vectors["drug_3"], top_k=1, include_metadata=True)["matches"][0]
+        self.assertEqual(match["id"], "drug_3")
+        self.assertAlmostEqual(match["score"], 1.0, places=5)
+        self.assertEqual(match["metadata"], {"category": "drug"})
+
+        matches = index.query(vector=vectors["drug_3"], top_k=5, filter={"category": {"$eq": "slang"}})["matches"]
+        self.assertEqual(len(matches), 5)
+        self.assertTrue(all(m["id"].startswith("slang_") for m in matches))
+
+    def test_delete(self):
+        index = self._index()
+        vectors = self._vectors()
+
+        for ids in list(index.list(prefix="slang_")):
+            index.delete(ids=ids)
+        self.assertEqual(index.describe_index_stats()["total_vector_count"], 20)
+        self.assertNotEqual(index.query(vector=vectors["slang_3"], top_k=1)["matches"][0]["id"], "slang_3")
+
+        index.delete(filter={"category": "drug"})
+        self.assertEqual(index.query(vector=vectors["drug_3"], top_k=1)["matches"], [])
+
+    def test_int8_snapshot_round_trip(self):
+        import tempfile
+        from ai_models.local_index import LocalIndex
+
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        path = os.path.join(tmp_dir, "index.npz")
+        vectors = self._vectors()
+
+        int8 = self._index(dtype="int8", path=path)
+        for dtype in ("int8", "float32"):
+            reloaded = LocalIndex(dimension=16, dtype=dtype, path=path)
+            self.assertEqual(reloaded.describe_index_stats()["total_vector_count"], 40)
+            for vid in ("slang_0", "drug_7"):
+                match = reloaded.query(vector=vectors[vid], top_k=1)["matches"][0]
+                self.assertEqual(match["id"], vid)
+                self.assertAlmostEqual(match["score"], 1.0, delta=0.02)
+        self.assertEqual(int8._matrix.dtype.name, "int8")
+
+
+class KeywordMatcherTests(SimpleTestCase):
+    def setUp(self):
+        from ai_models.keyword_matcher import KeywordMatcher
+
+        self.matcher = KeywordMatcher({"pot": 0.5, "buy pot": 0.9, "molly": 0.8, "dm me": 0.6})
+
+    def test_word_boundaries(self):
+        self.assertFalse(self.matcher.contains_any("what a spot, potato salad and a jackpot"))
+        self.assertEqual(self.matcher.max_weight("smoking POT again"), 0.5)
+
+    def test_multi_word_phrases(self):
+        matches = self.matcher.matches("wanna  buy pot? DM me")
+        self.assertEqual(sorted(m[0] for m in matches), ["buy pot", "dm me", "pot"])
+        phrase = next(m for m in matches if m[0] == "buy pot")
+        self.assertEqual("wanna  buy pot? DM me"[phrase[2]:phrase[3]], "buy pot")
+        self.assertFalse(self.matcher.contains_any("dm for details, me too"))
+
+    def test_strongest_weight_wins(self):
+        self.assertEqual(self.matcher.max_weight("buy pot and molly"), 0.9)
+        self.assertEqual(self.matcher.max_weight("nothing here"), 0.0)
+
+        self.matcher.add({"Buy  Pot": 0.3})
+        self.assertEqual(self.matcher.max_weight("buy pot"), 0.5)
+
+
+class VerdictStoreTests(SimpleTestCase):
+    def setUp(self):
+        import tempfile
+        from moderation.verdict_store import VerdictStore
+
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        self.store = VerdictStore(path=os.path.join(tmp_dir, "verdicts.sqlite3"))
+
+    def test_get_put(self):
+        self.store.put_many("spam", "v1", {"h1": 0.25, "h2": 0.75})
+        self.assertEqual(self.store.get_many("spam", "v1", ["h1", "h2", "h3", "h1"]), {"h1": 0.25, "h2": 0.75})
+        self.assertEqual(self.store.get_many("toxic", "v1", ["h1"]), {})
+        self.assertEqual(self.store.stats()["hits"], 2)
+
+        self.store.put_many("spam", "v1", {"h1": 0.5})
+        self.assertEqual(self.store.get_many("spam", "v1", ["h1"]), {"h1": 0.5})
+
+    def test_version_mismatch_is_a_miss(self):
+        self.store.put_many("spam", "v1", {"h1": 0.25})
+        self.assertEqual(self.store.get_many("spam", "v2", ["h1"]), {})
+
+    def test_compaction_drops_old_rows(self):
+        self.store.put_many("spam", "v1", {"h1": 0.25, "h2": 0.75})
+        self.assertEqual(self.store.compact(max_age=3600), 0)
+        with mock.patch("time.time", return_value=time.time() + 7200):
+            self.assertEqual(self.store.compact(max_age=3600), 2)
+        self.assertEqual(self.store.get_many("spam", "v1", ["h1", "h2"]), {})
+
+
+class EmbedderTests(SimpleTestCase):
+    def setUp(self):
+        import numpy as np
+        from ai_models import embedder
+
+        self.embedder = embedder
+        self.encoded = []
+
+        class Model:
+            def encode(model, texts):
+                self.encoded.append(list(texts))
+                return [np.full(embedder.DIMENSION, len(t), dtype=np.float32) for t in texts]
+
+        patcher = mock.patch.object(embedder, "get_model", return_value=Model())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_dedupes_normalized_texts(self):
+        cache = self.embedder.EmbeddingCache(max_size=10)
+        vectors = self.embedder.encode_many(["Hello  World", "hello world", "bye"], cache=cache)
+        self.assertEqual(self.encoded, [["hello world", "bye"]])
+        self.assertEqual(vectors.shape, (3, self.embedder.DIMENSION))
+        self.assertTrue((vectors[0] == vectors[1]).all())
+        self.assertEqual(self.embedder.encode_many([], cache=cache).shape, (0, self.embedder.DIMENSION))
+
+    def test_lru_cache(self):
+        cache = self.embedder.EmbeddingCache(max_size=2)
+        self.embedder.encode_many(["a", "b"], cache=cache)
+        self.embedder.encode_many(["a"], cache=cache)         # hit; "b" is now least recent
+        self.embedder.encode_many(["c"], cache=cache)         # evicts "b"
+        self.embedder.encode_many(["a", "b"], cache=cache)
+        self.assertEqual(self.encoded, [["a", "b"], ["c"], ["b"]])
+        self.assertEqual(cache.stats()["size"], 2)
+
+
+class LongTextTests(SimpleTestCase):
+    class Tokenizer:
+        """Fast-tokenizer stand-in: text "n" overflows into n windows whose input_ids are [0]..[n-1]."""
+        is_fast = True
+
+        def __call__(self, texts, **kwargs):
+            rows = [(i, w) for i, text in enumerate(texts) for w in range(int(text))]
+            return {
+                "input_ids": [[w] for _, w in rows],
+                "attention_mask": [[1] for _ in rows],
+                "overflow_to_sample_mapping": [i for i, _ in rows],
+            }
+
+    def test_window_selection_keeps_first_and_last(self):
+        from ai_models import batch_inference
+
+        with mock.patch.object(batch_inference, "LONG_TEXT", True), \
+                mock.patch.object(batch_inference, "MAX_WINDOWS", 4):
+            short, few, many = batch_inference.tokenize(self.Tokenizer(), ["1", "3", "10"])
+
+        self.assertEqual(short, {"input_ids": [0], "attention_mask": [1]})
+        self.assertEqual([w["input_ids"][0] for w in few], [0, 1, 2])
+        self.assertEqual([w["input_ids"][0] for w in many], [0, 3, 6, 9])
+
+    def test_pooling(self):
+        import torch
+        from ai_models import batch_inference
+
+        # Column 0 is the benign class; the second window is the harmful one
+        probs = torch.tensor([[0.9, 0.1], [0.2, 0.8], [0.6, 0.4]])
+        with mock.patch.object(batch_inference, "WINDOW_POOLING", "max"):
+            self.assertEqual(batch_inference._pool(probs).tolist(), probs[1].tolist())
+        with mock.patch.object(batch_inference, "WINDOW_POOLING", "attention"):
+            pooled = batch_inference._pool(probs)
+        self.assertAlmostEqual(float(pooled.sum()), 1.0, places=5)
+        self.assertLess(float(pooled[0]), 0.3)
+        self.assertGreater(float(pooled[0]), 0.2)
+
+
+class PipelineTests(SimpleTestCase):
+    def _run(self, stages, workers=4):
+        from moderation import pipeline
+
+        executor = ThreadPoolExecutor(max_workers=workers)
+        self.addCleanup(executor.shutdown)
+        with mock.patch.object(pipeline, "get_executor", return_value=executor):
+            return pipeline.Pipeline(stages).run(parallel=True)
+
+    def test_dependencies_and_inline_match(self):
+        from moderation.pipeline import Pipeline, Stage
+
+        stages = [
+            Stage("a", lambda: 2),
+            Stage("b", lambda a: a * 3, deps=["a"]),
+            Stage("c", lambda a, b: a + b, deps=["a", "b"]),
+        ]
+        parallel = self._run(stages)
+        inline = Pipeline(stages).run(parallel=False)
+        self.assertEqual(parallel["c"].value, 8)
+        self.assertEqual({k: r.value for k, r in parallel.items()}, {k: r.value for k, r in inline.items()})
+
+    def test_required_stage_failure_raises(self):
+        from moderation.pipeline import Stage
+
+        def boom():
+            raise RuntimeError("down")
+
+        with self.assertRaises(RuntimeError):
+            self._run([Stage("a", boom)])
+
+    def test_queue_time_does_not_count_toward_timeout(self):
+        from moderation.pipeline import Stage
+
+        # One thread: "quick" waits 0.3s behind "slow" but runs well within its limit
+        results = self._run([
+            Stage("slow", lambda: time.sleep(0.3) or "slow"),
+            Stage("quick", lambda: time.sleep(0.02) or "quick", timeout=0.2, fallback=None),
+        ], workers=1)
+        self.assertEqual(results["quick"].status, "ok")
+        self.assertEqual(results["quick"].value, "quick")
+
+    def test_timed_out_stage_takes_fallback(self):
+        from moderation import pipeline
+        from moderation.pipeline import Stage
+
+        release = threading.Event()
+        results = self._run([Stage("stuck", release.wait, timeout=0.05, fallback="fallback")])
+        self.assertEqual(results["stuck"].status, "timed_out")
+        self.assertEqual(results["stuck"].value, "fallback")
+        self.assertEqual(pipeline.stats()["abandoned"], 1)
+        release.set()
+        for _ in range(100):
+            if not pipeline.stats()["abandoned"]:
+                break
+            time.sleep(0.01)
+        self.assertEqual(pipeline.stats()["abandoned"], 0)
+
+
+class RegistryTests(SimpleTestCase):
+    def _registry(self):
+        import numpy as np
+        from ai_models.registry import ModelRegistry
+
+        class Model:
+            def __init__(self):
+                self.weights = np.zeros(512 * 1024, dtype=np.uint8)  # 0.5 MB
+
+        registry = ModelRegistry(budget_mb=1.2)
+        for name in ("a", "b", "c"):
+            registry.register(name, Model, precision_aware=False)
+        return registry
+
+    def test_budget_evicts_least_recently_used(self):
+        registry = self._registry()
+        for name in ("a", "b", "c"):
+            registry.get(name)
+        loaded = {name for name, m in registry.stats()["models"].items() if m["loaded"]}
+        self.assertEqual(loaded, {"b", "c"})
+
+    def test_pinned_models_are_not_evicted(self):
+        registry = self._registry()
+        registry.pin(["a"])
+        for name in ("a", "b", "c"):
+            registry.get(name)
+        loaded = {name for name, m in registry.stats()["models"].items() if m["loaded"]}
+        self.assertEqual(loaded, {"a", "c"})
+
+        registry.unpin(["a"])
+        self.assertFalse(registry.stats()["models"]["a"]["pinned"])
+
+
+class NearDuplicateTests(SimpleTestCase):
+    BASE = "Get FREE followers now!!! visit my profile for the best deal on followers"
+
+    def setUp(self):
+        from moderation import near_duplicates
+        from moderation.near_duplicates import NearDuplicateIndex
+
+        self.nd = near_duplicates
+        patcher = mock.patch.object(near_duplicates, "index", NearDuplicateIndex())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _result(self, label="safe"):
+        return {"final_label": label, "safe": label == "safe", "reasons": []}
+
+    def test_signature_similarity(self):
+        sig = self.nd.signature(self.BASE)
+        self.assertGreaterEqual(self.nd.similarity(sig, self.nd.signature(self.BASE.replace("FREE", "fr ee"))), 0.8)
+        self.assertLess(self.nd.similarity(sig, self.nd.signature("a totally unrelated comment about cooking pasta")), 0.2)
+        self.assertIsNone(self.nd.signature("nice post!"))
+
+    def test_index_matches_only_same_tag(self):
+        sig = self.nd.signature(self.BASE)
+        cluster_id = self.nd.index.add(sig, self._result(), "v1")
+        self.assertEqual(self.nd.index.find(self.nd.signature(self.BASE + " !!"), "v1")[0], cluster_id)
+        self.assertIsNone(self.nd.index.find(sig, "v2"))
+
+    def test_batch_copies_reuse_the_first_verdict(self):
+        texts = [self.BASE, self.BASE.lower() + " 1", "a totally unrelated comment about cooking pasta"]
+        batch = self.nd.lookup(texts, "v1")
+        self.assertEqual(batch.handled(), {1})
+
+        results = [self._result("unsafe"), None, self._result()]
+        self.nd.settle(batch, results)
+        self.assertEqual(results[1]["final_label"], "unsafe")
+        self.assertEqual(self.nd.lookup([self.BASE + "?"], "v1").handled(), {0})
+
+    def test_cached_repeats_escalate_a_campaign(self):
+        from moderation import engine
+        from moderation.verdict_cache import VerdictCache
+
+        def score(texts):
+            # Like the engine: scored comments are recorded by settle()
+            batch = self.nd.lookup(texts, "v1")
+            results = [None if i in batch.handled() else self._result() for i in range(len(texts))]
+            self.nd.settle(batch, results)
+            return results
+
+        with mock.patch.object(self.nd, "ENABLED", True), \
+                mock.patch.object(self.nd, "CAMPAIGN_SIZE", 3), \
+                mock.patch.object(engine, "VERDICT_CACHE_ENABLED", True), \
+                mock.patch.object(engine, "verdict_cache", VerdictCache()), \
+                mock.patch.object(engine, "verdict_tag", return_value="v1"), \
+                mock.patch.object(engine, "_score_batch", side_effect=score):
+            labels = [engine.predict_all_batch([self.BASE])[0]["final_label"] for _ in range(4)]
+            repeated = engine.predict_all_batch([self.BASE, self.BASE])
+
+        self.assertEqual(labels, ["safe", "safe", "review", "review"])
+        self.assertEqual([r["final_label"] for r in repeated], ["review", "review"])
+        self.assertEqual(sum(r.startswith(self.nd.CAMPAIGN_REASON) for r in repeated[0]["reasons"]), 1)
+
+
+class ModelManifestTests(SimpleTestCase):
+    def test_verified_copy_is_kept_without_the_hub(self):
+        import tempfile
+        from ai_models import model_manifest
+
+        local_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, local_dir)
+        with open(os.path.join(local_dir, "config.json"), "w") as f:
+            f.write("{}")
+        model_manifest.write_manifest(local_dir, "org/model", "abc123")
+
+        models = {"spam": {"repo": "org/model", "local_dir": local_dir}}
+        with mock.patch.dict(model_manifest.MODELS, models), \
+                mock.patch("huggingface_hub.HfApi", side_effect=AssertionError("hub contacted")) as hub:
+            self.assertEqual(model_manifest.sync("spam"), "up to date")
+            with open(os.path.join(local_dir, "config.json"), "w") as f:
+                f.write("{} ")
+            with self.assertRaises(AssertionError):
+                model_manifest.sync("spam")
+        self.assertEqual(hub.call_count, 1)
+
+
+class ReadinessTests(SimpleTestCase):
+    def setUp(self):
+        from ai_models import warmup
+
+        self.warmup = warmup
+        patcher = mock.patch.dict(warmup._status, {"state": "cold"})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_cold_process_warms_up_in_background(self):
+        with mock.patch.object(self.warmup, "warm_up") as warm_up:
+            self.warmup.warm_up_in_background()
+            for _ in range(100):
+                if warm_up.called:
+                    break
+                time.sleep(0.01)
+        warm_up.assert_called_once_with()
+
+    def test_ready_once_traffic_has_loaded_every_model(self):
+        from ai_models.model_manifest import MODELS
+        from ai_models.registry import registry
+
+        models = {name: {"loads": 1, "loaded": False} for name in MODELS}
+        with mock.patch.object(registry, "stats", return_value={"models": models}):
+            self.assertTrue(self.warmup.is_ready())
+            models["drug"]["loads"] = 0
+            self.assertFalse(self.warmup.is_ready())
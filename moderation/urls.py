@@ -10,6 +10,8 @@ from .views import (
     review_content_view,
     manage_slang_words,
     delete_slang_word,
+    engine_stats_view,
+    readiness_view,
 )
 
 urlpatterns = [
@@ -22,4 +24,7 @@ urlpatterns = [
 
     path('slang-words/', manage_slang_words, name='manage_slang'),
     path('slang-words/<uuid:word_id>/delete/', delete_slang_word, name='delete_slang_word'),
+
+    path('engine-stats/', engine_stats_view, name='engine_stats'),
+    path('ready/', readiness_view, name='ready'),
 ]
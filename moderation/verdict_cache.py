@@ -0,0 +1,195 @@
+# moderation/verdict_cache.py
+import copy
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# ============================================
+# 🔥 SETTINGS
+# ============================================
+ENABLED = os.getenv("SAFENET_VERDICT_CACHE", "1").lower() in ("1", "true", "yes")
+MAX_SIZE = int(os.getenv("SAFENET_VERDICT_CACHE_SIZE", "10000"))
+TTL_SECONDS = float(os.getenv("SAFENET_VERDICT_CACHE_TTL", "600"))
+
+
+def normalize(text):
+    """Whitespace-insensitive form used for cache keys."""
+    return " ".join(text.split())
+
+
+def text_key(text):
+    return hashlib.sha256(normalize(text).encode("utf-8")).hexdigest()
+
+
+# ============================================
+# 🔥 FREQUENCY SKETCH (TinyLFU admission)
+# ============================================
+class _FrequencySketch:
+    """Count-min sketch with periodic halving, so popularity decays over time."""
+
+    def __init__(self, width, depth=4):
+        self.width = max(64, width)
+        self.depth = depth
+        self.rows = [[0] * self.width for _ in range(depth)]
+        self.additions = 0
+        self.sample_size = 10 * self.width
+
+    def _slots(self, key):
+        h = int(key[:16], 16)
+        for d in range(self.depth):
+            yield d, ((h >> (d * 16)) ^ (h * (d + 1))) % self.width
+
+    def add(self, key):
+        for d, i in self._slots(key):
+            self.rows[d][i] += 1
+        self.additions += 1
+        if self.additions >= self.sample_size:
+            self._age()
+
+    def estimate(self, key):
+        return min(self.rows[d][i] for d, i in self._slots(key))
+
+    def _age(self):
+        for row in self.rows:
+            for i in range(self.width):
+                row[i] >>= 1
+        self.additions //= 2
+
+
+class _Flight:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+# ============================================
+# 🔥 VERDICT CACHE
+# ============================================
+class VerdictCache:
+    """
+    Bounded LRU + TTL cache of predict_all results keyed by a hash of the
+    normalized text. Each entry carries a tag (blocklist + model version);
+    a tag mismatch is treated as a miss. New keys only displace the LRU
+    victim when the sketch says they are at least as popular (TinyLFU),
+    so one-off comments cannot flush out the hot spam texts.
+    """
+
+    def __init__(self, max_size=MAX_SIZE, ttl=TTL_SECONDS):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()   # key -> (tag, expires_at, result)
+        self._flights = {}              # key -> _Flight
+        self._sketch = _FrequencySketch(max_size)
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stale": 0, "evictions": 0,
+                       "rejected": 0, "singleflight_waits": 0}
+
+    def _lookup(self, key, tag, now):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        entry_tag, expires_at, result = entry
+        if entry_tag != tag or expires_at <= now:
+            del self._entries[key]
+            self._stats["stale"] += 1
+            return None
+        self._entries.move_to_end(key)
+        return result
+
+    def _store(self, key, tag, result, now):
+        if key not in self._entries and len(self._entries) >= self.max_size:
+            victim = next(iter(self._entries))
+            if self._sketch.estimate(key) < self._sketch.estimate(victim):
+                self._stats["rejected"] += 1
+                return
+            del self._entries[victim]
+            self._stats["evictions"] += 1
+        self._entries[key] = (tag, now + self.ttl, result)
+        self._entries.move_to_end(key)
+
+    def get_or_compute_many(self, texts, tag, compute_many):
+        """
+        Return one result per text. Hits come from the cache; misses are
+        scored with a single `compute_many(texts)` call. Texts already being
+        scored by another thread are waited on instead of scored again.
+        """
+        keys = [text_key(t) for t in texts]
+        found, lead, wait = {}, OrderedDict(), {}
+
+        with self._lock:
+            now = time.monotonic()
+            for key, text in zip(keys, texts):
+                if key in found or key in lead or key in wait:
+                    continue
+                self._sketch.add(key)
+                result = self._lookup(key, tag, now)
+                if result is not None:
+                    found[key] = result
+                    self._stats["hits"] += 1
+                elif key in self._flights:
+                    wait[key] = (self._flights[key], text)
+                    self._stats["singleflight_waits"] += 1
+                else:
+                    self._flights[key] = _Flight()
+                    lead[key] = text
+                    self._stats["misses"] += 1
+
+        if lead:
+            self._lead(lead, tag, compute_many, found)
+
+        retry = OrderedDict()
+        for key, (flight, text) in wait.items():
+            flight.done.wait()
+            if flight.error is None:
+                found[key] = flight.result
+            else:
+                retry[key] = text
+        if retry:
+            for key, result in zip(retry, compute_many(list(retry.values()))):
+                found[key] = result
+
+        return [copy.deepcopy(found[key]) for key in keys]
+
+    def _lead(self, lead, tag, compute_many, found):
+        try:
+            results = compute_many(list(lead.values()))
+        except Exception as e:
+            with self._lock:
+                for key in lead:
+                    flight = self._flights.pop(key)
+                    flight.error = e
+                    flight.done.set()
+            raise
+
+        with self._lock:
+            now = time.monotonic()
+            for key, result in zip(lead, results):
+                self._store(key, tag, result, now)
+                flight = self._flights.pop(key)
+                flight.result = result
+                flight.done.set()
+                found[key] = result
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                "enabled": ENABLED,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl,
+                "hit_ratio": (self._stats["hits"] / lookups) if lookups else 0.0,
+                **self._stats,
+            }
+
+
+verdict_cache = VerdictCache()
@@ -0,0 +1,144 @@
+# moderation/verdict_store.py
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# ============================================
+# 🔥 SETTINGS
+# ============================================
+ENABLED = os.getenv("SAFENET_VERDICT_STORE", "1").lower() in ("1", "true", "yes")
+DB_FILE = "verdicts.sqlite3"
+MAX_AGE_SECONDS = float(os.getenv("SAFENET_VERDICT_STORE_MAX_AGE", str(14 * 24 * 3600)))
+COMPACT_INTERVAL_SECONDS = float(os.getenv("SAFENET_VERDICT_STORE_COMPACT_INTERVAL", "3600"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS model_scores (
+    text_hash     TEXT NOT NULL,
+    model         TEXT NOT NULL,
+    model_version TEXT NOT NULL,
+    score         REAL NOT NULL,
+    created_at    REAL NOT NULL,
+    PRIMARY KEY (text_hash, model, model_version)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS model_scores_created_at ON model_scores (created_at);
+"""
+
+
+class VerdictStore:
+    """
+    Per-model scores persisted in SQLite under SAFENET_STATE_DIR, shared by
+    every worker on the host and kept across restarts and deploys.
+    """
+
+    def __init__(self, path=None):
+        self._path = path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._lookups = 0
+        self._hits = 0
+        self._latencies = deque(maxlen=1000)
+        self._compactor_pid = None
+
+    @property
+    def path(self):
+        return self._path or os.path.join(settings.SAFENET_STATE_DIR, DB_FILE)
+
+    def _conn(self):
+        # One connection per thread and per process (connections must not cross a fork)
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        self._ensure_compactor()
+        return conn
+
+    # ------------------------------------------------------------------
+    # Lookups / writes
+    # ------------------------------------------------------------------
+    def get_many(self, model, model_version, text_hashes):
+        """Return {text_hash: score} for the hashes already scored by this model version."""
+        if not text_hashes:
+            return {}
+
+        started = time.perf_counter()
+        unique = list(dict.fromkeys(text_hashes))
+        found = {}
+        conn = self._conn()
+        for start in range(0, len(unique), 500):
+            chunk = unique[start:start + 500]
+            rows = conn.execute(
+                "SELECT text_hash, score FROM model_scores "
+                f"WHERE model = ? AND model_version = ? AND text_hash IN ({','.join('?' * len(chunk))})",
+                [model, model_version, *chunk],
+            ).fetchall()
+            found.update(rows)
+
+        with self._lock:
+            self._lookups += len(unique)
+            self._hits += len(found)
+            self._latencies.append(time.perf_counter() - started)
+        return found
+
+    def put_many(self, model, model_version, scores):
+        """scores: {text_hash: score}"""
+        if not scores:
+            return
+        now = time.time()
+        self._conn().executemany(
+            "INSERT OR REPLACE INTO model_scores VALUES (?, ?, ?, ?, ?)",
+            [(h, model, model_version, float(s), now) for h, s in scores.items()],
+        )
+
+    # ------------------------------------------------------------------
+    # Background compaction
+    # ------------------------------------------------------------------
+    def _ensure_compactor(self):
+        if self._compactor_pid == os.getpid():
+            return
+        self._compactor_pid = os.getpid()
+        threading.Thread(target=self._compact_loop, name="verdict-store-compactor", daemon=True).start()
+
+    def _compact_loop(self):
+        while True:
+            time.sleep(COMPACT_INTERVAL_SECONDS)
+            try:
+                self.compact()
+            except Exception:
+                logger.exception("verdict store compaction failed")
+
+    def compact(self, max_age=MAX_AGE_SECONDS):
+        """Drop entries older than max_age and checkpoint the WAL. Returns rows removed."""
+        conn = self._conn()
+        removed = conn.execute(
+            "DELETE FROM model_scores WHERE created_at < ?", (time.time() - max_age,)
+        ).rowcount
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return removed
+
+    def stats(self):
+        with self._lock:
+            latencies = sorted(self._latencies)
+            return {
+                "enabled": ENABLED,
+                "lookups": self._lookups,
+                "hits": self._hits,
+                "hit_ratio": (self._hits / self._lookups) if self._lookups else 0.0,
+                "lookup_ms_avg": (sum(latencies) / len(latencies) * 1000.0) if latencies else 0.0,
+                "lookup_ms_p95": (latencies[int(0.95 * (len(latencies) - 1))] * 1000.0) if latencies else 0.0,
+            }
+
+
+verdict_store = VerdictStore()
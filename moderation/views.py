@@ -13,9 +13,11 @@ from django.views.decorators.http import require_POST
 from .forms import ContentForm, FeedbackForm, SlangWordForm
 from .models import ModerationResult  # kept for typing / local read-only model if needed
 from dashboard.models import AuditLog as AuditLogModel  # only for naming / not used for writes
-from ai_models.drug_embeddings import get_embedding, index as pinecone_index, EMBEDDER
+from ai_models import drug_embeddings
 
-from moderation.engine import predict_all
+from moderation.engine import predict_all, engine_stats
+from ai_models import warmup
+from moderation.blocklist_version import bump_version as bump_blocklist_version
 
 # Supabase client (must be created in safenet/supabase_client.py)
 from safenet.supabase_client import supabase
@@ -119,8 +121,8 @@ def manage_slang_words(request):
                 return redirect("dashboard_home")
 
             # Pinecone embed + upsert
-            embedding = get_embedding(word)
-            pinecone_index.upsert(vectors=[{
+            embedding = drug_embeddings.get_embedding(word)
+            drug_embeddings.get_index().upsert(vectors=[{
                 "id": f"slang_{word}",
                 "values": embedding,
                 "metadata": {"type": "slang", "word": word, "added_by": request.user.username}
@@ -133,6 +135,8 @@ def manage_slang_words(request):
                 "added_by": profile_id,
                 "is_active": True
             }).execute()
+            # After the row exists, so the lexical blocklist rebuild sees it
+            bump_blocklist_version()
 
             messages.success(request, f'Successfully added "{word}" to restricted words.')
 
@@ -142,10 +146,11 @@ def manage_slang_words(request):
                 return redirect("dashboard_home")
 
             # Pinecone delete
-            pinecone_index.delete(ids=[f"slang_{word}"])
+            drug_embeddings.get_index().delete(ids=[f"slang_{word}"])
 
             # Supabase delete
             supabase.from_("slang_words").delete().eq("word", word).execute()
+            bump_blocklist_version()
 
             messages.success(request, f'Successfully removed "{word}" from restricted words.')
 
@@ -530,10 +535,11 @@ def delete_slang_word(request, word_id):
         word = sel.data[0]["word"]
 
         # Delete from Pinecone
-        pinecone_index.delete(ids=[f"slang_{word}"])
+        drug_embeddings.get_index().delete(ids=[f"slang_{word}"])
 
         # Delete from Supabase
         supabase.from_("slang_words").delete().eq("id", str(word_id)).execute()
+        bump_blocklist_version()
 
         messages.success(request, f"Removed '{word}'")
     except Exception as e:
@@ -542,6 +548,26 @@ def delete_slang_word(request, word_id):
 
     return redirect("dashboard_home")
 
+
+# ------------------------
+# Engine stats (JSON)
+# ------------------------
+@login_required
+@user_passes_test(lambda u: u.role in ["admin", "moderator"])
+def engine_stats_view(request):
+    return JsonResponse(engine_stats())
+
+
+# ------------------------
+# Readiness probe (no login — polled by the load balancer)
+# ------------------------
+def readiness_view(request):
+    ready = warmup.is_ready()
+    if not ready:
+        # No-op once a warmup has run or started (e.g. the gunicorn preload)
+        warmup.warm_up_in_background()
+    return JsonResponse(warmup.status(), status=200 if ready else 503)
+
 # ------------------------
 # Quick review (AJAX)
 # # ------------------------
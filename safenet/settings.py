@@ -134,6 +134,11 @@ SESSION_ENGINE = 'django.contrib.sessions.backends.file'  # Use file-based sessi
 SESSION_FILE_PATH = os.path.join(BASE_DIR, 'sessions')  # Directory to store session files
 os.makedirs(SESSION_FILE_PATH, exist_ok=True)  # Ensure the directory exists
 
+# Moderation engine runtime state shared by all workers on the host
+# (blocklist version stamp, verdict store)
+SAFENET_STATE_DIR = os.environ.get('SAFENET_STATE_DIR', os.path.join(BASE_DIR, 'var'))
+os.makedirs(SAFENET_STATE_DIR, exist_ok=True)
+
 # Static files
 STATIC_URL = '/static/'
 # This path is where 'collectstatic' will place all static files in production.